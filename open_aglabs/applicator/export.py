@@ -0,0 +1,212 @@
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from open_aglabs.applicator.lookup import RxLookup
+from open_aglabs.applicator.models import ApplicatorRx
+from open_aglabs.core.gis import METERS_PER_DEGREE_LAT, transform_geometries
+from open_aglabs.core.units import UNITS, UNIT_DEFINITIONS, MASS_PER_AREA
+
+# File suffix -> OGR driver of the vector formats.
+RX_DRIVERS = {
+    ".gpkg": "GPKG",
+    ".shp": "ESRI Shapefile",
+}
+
+EXPORT_FORMATS = ("gpkg", "shp", "isoxml")
+
+# ISO 11783-10 setpoint DDIs, rates are written in mg/m2 and mm3/m2, both 100 times kg/ha and l/ha.
+ISOXML_MASS_RATE_DDI = "0006"
+ISOXML_VOLUME_RATE_DDI = "0001"
+ISOXML_RATE_SCALE = 100.0
+
+
+def rx_frame(rxs: Iterable[ApplicatorRx], crs: str = "EPSG:4326") -> gpd.GeoDataFrame:
+    """
+    One row per zone of every prescription, with the zones of all of them parsed and reprojected to crs in bulk.
+    """
+    rows = {"rx_id": [], "zone_id": [], "rate": [], "units": [], "tank_id": [], "tank_mix": []}
+    geometries = []
+    for rx in rxs:
+        zones = shapely.from_wkt([z.geometry for z in rx.zones])
+        geometries.append(transform_geometries(zones, rx.crs, crs))
+        rows["rx_id"] += [rx.id] * len(rx.zones)
+        rows["zone_id"] += [z.id for z in rx.zones]
+        rows["rate"] += [z.rate for z in rx.zones]
+        rows["units"] += [rx.units] * len(rx.zones)
+        rows["tank_id"] += [z.tank_id for z in rx.zones]
+        rows["tank_mix"] += [z.tank_mix for z in rx.zones]
+
+    geometry = np.concatenate(geometries) if len(geometries) > 0 else np.empty(0, dtype=object)
+    return gpd.GeoDataFrame(rows, geometry=geometry, crs=crs)
+
+
+def write_rx(rxs: Union[ApplicatorRx, Iterable[ApplicatorRx]],
+             path: Union[str, Path],
+             crs: str = "EPSG:4326",
+             batch_size: int = 500,
+             layer: Optional[str] = None) -> int:
+    """
+    Writes the zones of one or many prescriptions to a GeoPackage or Shapefile (by the suffix of path) and returns
+    the number of zones written. rxs can be a generator: prescriptions are turned into frames batch_size at a time
+    and every batch is written with one geopandas call, appending to the file after the first. The rx ids must be
+    unique, a batch repeating an id is not written.
+    """
+    path = Path(path)
+    driver = RX_DRIVERS.get(path.suffix.lower())
+    if driver is None:
+        raise ValueError(f"Unknown prescription file type {path.suffix}, the known types are {list(RX_DRIVERS)}")
+
+    rxs = iter([rxs] if isinstance(rxs, ApplicatorRx) else rxs)
+    seen = set()
+    written = 0
+    mode = "w"
+    while True:
+        batch = list(islice(rxs, batch_size))
+        if len(batch) == 0:
+            return written
+
+        ids = [rx.id for rx in batch]
+        duplicates = sorted({i for i in ids if i in seen or ids.count(i) > 1})
+        if len(duplicates) > 0:
+            raise ValueError(f"The prescriptions {duplicates} are written to {path} more than once")
+        seen.update(ids)
+
+        frame = rx_frame(batch, crs=crs)
+        frame.to_file(path, driver=driver, layer=layer, mode=mode, promote_to_multi=True)
+        written += len(frame)
+        mode = "a"
+
+
+def isoxml_rate_grid(rx: ApplicatorRx, cell_size_m: float = 5.0):
+    """
+    Rasterizes a prescription onto a north up WGS 84 grid of about cell_size_m cells with RxLookup at the cell
+    centers. Returns the rates in ISOXML units as int32 rows from south to north, the grid origin (south west
+    corner) and the cell sizes in degrees.
+    """
+    zones = transform_geometries(shapely.from_wkt([z.geometry for z in rx.zones]), rx.crs, "EPSG:4326")
+    lon_min, lat_min, lon_max, lat_max = shapely.total_bounds(zones)
+
+    cell_lat = cell_size_m / METERS_PER_DEGREE_LAT
+    cell_lon = cell_lat / np.cos(np.radians((lat_min + lat_max) / 2.0))
+    rows = max(int(np.ceil((lat_max - lat_min) / cell_lat)), 1)
+    cols = max(int(np.ceil((lon_max - lon_min) / cell_lon)), 1)
+
+    lon = lon_min + (np.arange(cols) + 0.5) * cell_lon
+    lat = lat_min + (np.arange(rows) + 0.5) * cell_lat
+    lon, lat = np.meshgrid(lon, lat)
+    # a one off rasterization, a coarse lookup grid is cheaper to build than it costs in slower queries
+    rates = RxLookup(rx, cells=64).query(lon.ravel(), lat.ravel())["rate"].to_numpy()
+
+    base = "kg/ha" if UNIT_DEFINITIONS[rx.units][0] == MASS_PER_AREA else "l/ha"
+    values = np.nan_to_num(UNITS.convert(rates, rx.units, base) * ISOXML_RATE_SCALE, nan=0.0)
+    return np.round(values).astype("<i4").reshape(rows, cols), (lat_min, lon_min), (cell_lat, cell_lon)
+
+
+def write_isoxml(rxs: Union[ApplicatorRx, Iterable[ApplicatorRx]],
+                 out_dir: Union[str, Path],
+                 cell_size_m: float = 5.0,
+                 software_version: str = "0.1.0") -> Path:
+    """
+    Writes an ISO 11783-10 TaskData set: TASKDATA.XML with one task per prescription and a type 2 grid of rates
+    per task in a GRDnnnnn.BIN file next to it. Every task has one product (the tank mix when all its zones share
+    one) and its rate setpoint DDI follows the Rx units. Returns the path of TASKDATA.XML.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rxs = [rxs] if isinstance(rxs, ApplicatorRx) else rxs
+
+    root = ET.Element("ISO11783_TaskData", {
+        "VersionMajor": "4",
+        "VersionMinor": "3",
+        "ManagementSoftwareManufacturer": "open_aglabs",
+        "ManagementSoftwareVersion": software_version,
+        "DataTransferOrigin": "1",
+    })
+    products = {}
+    for n, rx in enumerate(rxs, start=1):
+        mixes = {z.tank_mix for z in rx.zones}
+        product_name = mixes.pop() if len(mixes) == 1 else rx.id
+        if product_name not in products:
+            products[product_name] = f"PDT{len(products) + 1}"
+            ET.SubElement(root, "PDT", {"A": products[product_name], "B": product_name})
+
+        values, (lat_min, lon_min), (cell_lat, cell_lon) = isoxml_rate_grid(rx, cell_size_m=cell_size_m)
+        grid_name = f"GRD{n:05d}"
+        values.tofile(out_dir / f"{grid_name}.BIN")
+
+        ddi = ISOXML_MASS_RATE_DDI if UNIT_DEFINITIONS[rx.units][0] == MASS_PER_AREA else ISOXML_VOLUME_RATE_DDI
+        task = ET.SubElement(root, "TSK", {"A": f"TSK{n}", "B": rx.id, "G": "1"})
+        zone = ET.SubElement(task, "TZN", {"A": "1", "B": "Rx rates"})
+        ET.SubElement(zone, "PDV", {"A": ddi, "B": "0", "C": products[product_name]})
+        ET.SubElement(task, "GRD", {
+            "A": f"{lat_min:.9f}",
+            "B": f"{lon_min:.9f}",
+            "C": f"{cell_lat:.9f}",
+            "D": f"{cell_lon:.9f}",
+            "E": str(values.shape[1]),
+            "F": str(values.shape[0]),
+            "G": grid_name,
+            "I": "2",
+            "J": "1",
+        })
+
+    path = out_dir / "TASKDATA.XML"
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+    return path
+
+
+def export_rx(rx: ApplicatorRx, out_dir: Union[str, Path], fmt: str = "gpkg", **kwargs) -> Path:
+    """
+    Exports one prescription to out_dir as <rx id>.gpkg, <rx id>.shp or an ISOXML TaskData folder <rx id>/.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt}, the known formats are {list(EXPORT_FORMATS)}")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if fmt == "isoxml":
+        return write_isoxml(rx, out_dir / rx.id, **kwargs)
+
+    path = out_dir / f"{rx.id}.{fmt}"
+    write_rx(rx, path, **kwargs)
+    return path
+
+
+def _export_one(args) -> str:
+    rx, out_dir, fmt, kwargs = args
+    return str(export_rx(ApplicatorRx.model_validate(rx), out_dir, fmt=fmt, **kwargs))
+
+
+def export_fields(rxs: Iterable[ApplicatorRx],
+                  out_dir: Union[str, Path],
+                  fmt: str = "gpkg",
+                  processes: Optional[int] = None,
+                  chunksize: int = 4,
+                  **kwargs) -> List[Path]:
+    """
+    Exports every prescription (EX: one per field) to its own file with export_rx, spread over a process pool.
+    Prescriptions are sent to the workers as plain dicts, a few at a time, and the paths come back in order.
+    processes=1 runs everything in this process. Files are named by rx id, so repeated ids are rejected before
+    anything is written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt}, the known formats are {list(EXPORT_FORMATS)}")
+
+    rxs = list(rxs)
+    unique, counts = np.unique(np.array([rx.id for rx in rxs], dtype=str), return_counts=True)
+    if np.any(counts > 1):
+        raise ValueError(f"The prescriptions {unique[counts > 1].tolist()} would overwrite each other in {out_dir}")
+
+    jobs = ((rx.model_dump(), str(out_dir), fmt, kwargs) for rx in rxs)
+    if processes == 1:
+        return [Path(p) for p in map(_export_one, jobs)]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return [Path(p) for p in pool.map(_export_one, jobs, chunksize=chunksize)]
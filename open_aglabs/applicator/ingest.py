@@ -0,0 +1,194 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Union
+
+import numpy as np
+import pandas as pd
+
+from open_aglabs.applicator.models import ApplicationEvent
+from open_aglabs.core.base_models import Location
+from open_aglabs.core.constants import AMOUNT_UNITS, RATE_UNITS
+from open_aglabs.core.points import CategoryCodes, PointStoreWriter, read_point_chunks, read_point_store_meta
+from open_aglabs.core.units import UNITS, UNIT_DEFINITIONS, MASS_PER_AREA, normalize_unit
+
+# Output name -> column name in the as-applied log. rate is in the rate unit of the log, speed in m/s, swath in m and
+# the optional interval in s. product names the product (or mix) applied at each point.
+APPLIED_POINT_COLUMNS = {
+    "lat": "lat",
+    "lon": "lon",
+    "rate": "rate",
+    "product": "product",
+    "speed": "speed",
+    "swath": "swath",
+    "interval": "interval",
+}
+
+APPLIED_POINT_DTYPES = {
+    "lat": "float64",
+    "lon": "float64",
+    "rate": "float32",
+    "speed": "float32",
+    "swath": "float32",
+    "interval": "float32",
+}
+
+
+def rate_unit(unit: str) -> str:
+    """
+    Normalizes a rate unit (EX: 'L/ha', 'gal/acre') and checks it is one of RATE_UNITS.
+    """
+    unit = normalize_unit(unit)
+    if unit not in RATE_UNITS:
+        raise ValueError(f"{unit} is not an application rate unit, the rate units are {list(RATE_UNITS)}")
+    return unit
+
+
+class AsAppliedAccumulator:
+    """
+    Keeps running totals per product over chunks of as-applied points. Rates are converted to the base unit of their
+    dimension (kg/ha or l/ha) with one multiply per chunk and products are mapped to integer codes, so every chunk is
+    reduced with np.bincount.
+    """
+
+    def __init__(self, log_rate_unit: str, interval_s: float = 1.0):
+        self.log_rate_unit = rate_unit(log_rate_unit)
+        self.base_rate_unit = "kg/ha" if UNIT_DEFINITIONS[self.log_rate_unit][0] == MASS_PER_AREA else "l/ha"
+        self.to_base = UNITS.factor(self.log_rate_unit, self.base_rate_unit)
+        self.interval_s = interval_s
+        self.products = CategoryCodes()
+        self.area_m2 = np.zeros(0)
+        self.amount = np.zeros(0)
+        self.points = np.zeros(0, dtype=np.int64)
+
+    def update(self, chunk: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Adds a chunk and returns the product codes of its points.
+        """
+        product = chunk["product"] if "product" in chunk else np.full(len(chunk["rate"]), None)
+        codes = self.products.encode(product)
+
+        interval = chunk.get("interval")
+        interval = self.interval_s if interval is None else np.asarray(interval, dtype=np.float64)
+        area = np.asarray(chunk["speed"], dtype=np.float64) * interval * np.asarray(chunk["swath"], dtype=np.float64)
+        rate = np.asarray(chunk["rate"], dtype=np.float64) * self.to_base
+        valid = np.isfinite(area) & np.isfinite(rate) & (area >= 0) & (rate >= 0)
+
+        n = len(self.products)
+        for name in ("area_m2", "amount", "points"):
+            current = getattr(self, name)
+            if len(current) < n:
+                setattr(self, name, np.concatenate([current, np.zeros(n - len(current), dtype=current.dtype)]))
+
+        c = codes[valid]
+        self.points += np.bincount(c, minlength=n)
+        self.area_m2 += np.bincount(c, weights=area[valid], minlength=n)
+        self.amount += np.bincount(c, weights=(rate * area)[valid] / 10000.0, minlength=n)
+        return codes
+
+    @property
+    def amount_units(self) -> str:
+        """
+        The AMOUNT_UNITS spelling of the amount unit of the base rate unit, EX: 'Kg' for kg/ha.
+        """
+        base = self.base_rate_unit.split("/")[0]
+        return next(u for u in AMOUNT_UNITS if normalize_unit(u) == base)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        One row per product with the covered area (ha), the amount applied (kg or l) and the area weighted rate in
+        the base rate unit, sorted by amount.
+        """
+        names = self.products.names
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df = pd.DataFrame({
+                "product": names,
+                "points": self.points,
+                "area_ha": self.area_m2 / 10000.0,
+                "amount": self.amount,
+                "rate": self.amount / (self.area_m2 / 10000.0),
+            })
+        return df.sort_values("amount", ascending=False, ignore_index=True)
+
+
+def ingest_as_applied(path: Union[str, Path],
+                      event_id: str,
+                      timestamp: datetime,
+                      log_rate_unit: str,
+                      mix_name: Optional[str] = None,
+                      mix_id: Optional[str] = None,
+                      application_type: Optional[str] = None,
+                      out_path: Optional[Union[str, Path]] = None,
+                      columns: Optional[Dict[str, str]] = None,
+                      chunk_size: int = 500_000,
+                      interval_s: float = 1.0,
+                      rate_unit_out: Optional[str] = None,
+                      method: Optional[str] = None,
+                      equipment: Optional[str] = None,
+                      location: Optional[Location] = None,
+                      notes: Optional[str] = None) -> ApplicationEvent:
+    """
+    Streams a sprayer or spreader as-applied log (CSV / GeoJSON) chunk by chunk into an ApplicationEvent. The raw
+    points are written to a columnar point store referenced by file_path, with the product stored as a code and the
+    per product summary (see as_applied_product_summary) kept in the store metadata.
+
+    rate is the area weighted rate in rate_unit_out (default the normalized log_rate_unit), area is the covered area
+    in ha and amount the total product in kg or l. mix_name defaults to the product with the largest amount.
+    """
+    log_rate_unit = rate_unit(log_rate_unit)
+    rate_unit_out = log_rate_unit if rate_unit_out is None else rate_unit(rate_unit_out)
+
+    path = Path(path)
+    columns = APPLIED_POINT_COLUMNS if columns is None else {**APPLIED_POINT_COLUMNS, **columns}
+    out_path = path.with_suffix(".points") if out_path is None else Path(out_path)
+
+    accumulator = AsAppliedAccumulator(log_rate_unit, interval_s=interval_s)
+    dtypes = {**APPLIED_POINT_DTYPES, "product": "int16"}
+    metadata = {"source": str(path), "event_id": event_id, "rate_unit": log_rate_unit}
+    with PointStoreWriter(out_path, dtypes, metadata=metadata) as writer:
+        for chunk in read_point_chunks(path, columns, ("lat", "lon", "rate", "speed", "swath"), "as-applied",
+                                       chunk_size=chunk_size, dtypes=APPLIED_POINT_DTYPES):
+            writer.append({**chunk, "product": accumulator.update(chunk)})
+
+        summary = accumulator.summary()
+        writer.metadata["product_codes"] = accumulator.products.codes
+        writer.metadata["amount_units"] = accumulator.amount_units
+        writer.metadata["products"] = summary.replace({np.nan: None}).to_dict(orient="records")
+
+    area_ha = summary["area_ha"].sum()
+    amount = summary["amount"].sum()
+    rate = amount / area_ha if area_ha > 0 else 0.0
+    if mix_name is None:
+        named = summary.loc[summary["product"] != "unknown", "product"]
+        mix_name = named.iloc[0] if len(named) > 0 else "unknown"
+
+    return ApplicationEvent(
+        id=event_id,
+        file_path=str(out_path),
+        location=location,
+        timestamp=timestamp,
+        application_type=application_type,
+        mix_name=mix_name,
+        mix_id=mix_id,
+        rate=UNITS.convert(rate, accumulator.base_rate_unit, rate_unit_out),
+        rate_unit=rate_unit_out,
+        area=area_ha,
+        area_units="ha",
+        amount=amount,
+        amount_units=accumulator.amount_units,
+        method=method,
+        equipment=equipment,
+        notes=notes,
+    )
+
+
+def as_applied_product_summary(event: ApplicationEvent, rate_unit_out: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reads the per product summary written next to the points of an event ingested with ingest_as_applied, with the
+    rate in rate_unit_out (default the event rate_unit).
+    """
+    meta = read_point_store_meta(event.file_path)["metadata"]
+    df = pd.DataFrame(meta["products"])
+    base_rate_unit = f"{normalize_unit(meta['amount_units'])}/ha"
+    rate_unit_out = event.rate_unit if rate_unit_out is None else rate_unit(rate_unit_out)
+    df["rate"] = UNITS.convert(df["rate"].astype(float), base_rate_unit, rate_unit_out)
+    return df
@@ -0,0 +1,113 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from open_aglabs.applicator.models import ApplicatorRx
+from open_aglabs.applicator.zonal import zone_geometries
+from open_aglabs.core.gis import GridSpec
+
+# Cell codes of the acceleration grid besides a zone index.
+NO_ZONE = -1
+MIXED_CELL = -2
+
+
+class RxLookup:
+    """
+    Answers "which zone, and so which rate, applies here?" for whole batches of positions.
+
+    A uniform grid is laid over the prescription and every cell that lies entirely inside one zone stores that
+    zone, cells touching no zone store NO_ZONE. Most positions are answered with a single array lookup, only the
+    ones falling in cells crossed by a zone edge (MIXED_CELL) go through the STRtree and contains_xy on the
+    prepared zones. Where zones overlap the first zone of the Rx wins, positions outside every zone get the index
+    -1 and a NaN rate.
+    """
+
+    def __init__(self, rx: ApplicatorRx, points_crs: Optional[str] = "EPSG:4326", cells: int = 256):
+        if len(rx.zones) == 0:
+            raise ValueError(f"The prescription {rx.id} has no zones")
+        self.rx = rx
+        self.ids = np.array([z.id for z in rx.zones], dtype=object)
+        self.rates = np.array([z.rate for z in rx.zones], dtype=np.float64)
+        self.tank_ids = np.array([z.tank_id for z in rx.zones], dtype=object)
+        self.tank_mixes = np.array([z.tank_mix for z in rx.zones], dtype=object)
+        # multi part zones are split into their polygons, so every tree entry has a tight bounding box
+        self.geometries, self.part_zone = shapely.get_parts(zone_geometries([z.geometry for z in rx.zones]),
+                                                            return_index=True)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+        self.transformer = None
+        if points_crs is not None and points_crs != rx.crs:
+            from pyproj import Transformer
+
+            self.transformer = Transformer.from_crs(points_crs, rx.crs, always_xy=True)
+
+        self.spec, self.cell_zone = self._build_grid(cells)
+
+    def _build_grid(self, cells: int) -> Tuple[GridSpec, np.ndarray]:
+        x_min, y_min, x_max, y_max = shapely.total_bounds(self.geometries)
+        resolution = max(x_max - x_min, y_max - y_min) / cells
+        if not np.isfinite(resolution) or resolution <= 0:
+            resolution = 1.0
+        spec = GridSpec.from_bounds(x_min, y_min, x_max, y_max, resolution=resolution, crs=self.rx.crs)
+
+        x, y = spec.cell_centers()
+        x, y = np.meshgrid(x, y)
+        half = resolution / 2.0
+        boxes = shapely.box(x.ravel() - half, y.ravel() - half, x.ravel() + half, y.ravel() + half)
+
+        # the zones are the query side so GEOS prepares them once, rather than every cell box
+        boxes = shapely.STRtree(boxes)
+        cell_zone = np.full(spec.size, NO_ZONE, dtype=np.int32)
+        part_idx, box_idx = boxes.query(self.geometries, predicate="intersects")
+        cell_zone[box_idx] = MIXED_CELL
+        box_zone = np.unique(box_idx * len(self.ids) + self.part_zone[part_idx])
+        touching = np.bincount(box_zone // len(self.ids), minlength=spec.size)
+
+        # a cell within a zone that no other zone touches is answered by the grid alone
+        part_idx, box_idx = boxes.query(self.geometries, predicate="contains_properly")
+        alone = touching[box_idx] == 1
+        cell_zone[box_idx[alone]] = self.part_zone[part_idx[alone]]
+        return spec, cell_zone
+
+    def zone_index(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        The index of the zone under every position, given in the CRS of the Rx, -1 outside every zone.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        cells = self.spec.cell_index(x, y)
+        zone = np.where(cells >= 0, self.cell_zone[np.maximum(cells, 0)], NO_ZONE)
+
+        mixed = np.flatnonzero(zone == MIXED_CELL)
+        if len(mixed) > 0:
+            zone[mixed] = NO_ZONE
+            point_idx, part_idx = self.tree.query(shapely.points(x[mixed], y[mixed]))
+            inside = shapely.contains_xy(self.geometries[part_idx], x[mixed][point_idx], y[mixed][point_idx])
+            point_idx, zone_idx = point_idx[inside], self.part_zone[part_idx[inside]]
+
+            first = np.full(len(mixed), len(self.ids), dtype=np.int64)
+            np.minimum.at(first, point_idx, zone_idx)
+            found = first < len(self.ids)
+            zone[mixed[found]] = first[found]
+        return zone
+
+    def query(self, x: np.ndarray, y: np.ndarray) -> pd.DataFrame:
+        """
+        Looks up a batch of positions (in points_crs, default longitude / latitude) and returns one row per
+        position with the zone_id, rate, tank_id and tank_mix that apply there.
+        """
+        if self.transformer is not None:
+            x, y = self.transformer.transform(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        zone = self.zone_index(x, y)
+        outside = zone < 0
+        zone = np.where(outside, 0, zone)
+
+        return pd.DataFrame({
+            "zone_id": np.where(outside, None, self.ids[zone]),
+            "rate": np.where(outside, np.nan, self.rates[zone]),
+            "tank_id": np.where(outside, None, self.tank_ids[zone]),
+            "tank_mix": np.where(outside, None, self.tank_mixes[zone]),
+        })
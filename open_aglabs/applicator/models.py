@@ -62,6 +62,30 @@ class ApplicationEvent(BaseModel):
         description="The unit for the application rate (e.g., 'L/ha', 'gal/acre', 'kg/ha').",
         examples=["L/ha"]
     )
+    area: Optional[float] = Field(
+        None,
+        ge=0,
+        description="The area covered by the application.",
+        examples=[64.5]
+    )
+    area_units: Optional[str] = Field(
+        None,
+        alias="areaUnits",
+        description="The units for the area covered (e.g., 'ha', 'ac').",
+        examples=["ha"]
+    )
+    amount: Optional[float] = Field(
+        None,
+        ge=0,
+        description="The total amount of product applied.",
+        examples=[129.0]
+    )
+    amount_units: Optional[str] = Field(
+        None,
+        alias="amountUnits",
+        description="The units for the total amount of product applied (e.g., 'l', 'kg').",
+        examples=["l"]
+    )
     method: Optional[str] = Field(
         None,
         description="The method of application (e.g., 'Broadcast', 'Foliar', 'In-furrow', 'Side-dress').",
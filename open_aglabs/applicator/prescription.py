@@ -0,0 +1,193 @@
+from pathlib import Path
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+import shapely
+
+from open_aglabs.applicator.ingest import rate_unit
+from open_aglabs.applicator.models import ApplicatorRx
+from open_aglabs.core.gis import GridSpec, open_grid, transform_geometries
+
+BREAK_METHODS = ("quantile", "jenks")
+
+
+def jenks_breaks(values: np.ndarray, n_classes: int) -> np.ndarray:
+    """
+    Fisher-Jenks natural breaks of sorted values by dynamic programming. The within class sum of squares of every
+    (start, stop) pair comes from prefix sums, so each class adds one vectorized (n, n) minimisation.
+    Returns the n_classes - 1 inner breaks.
+    """
+    x = np.sort(np.asarray(values, dtype=np.float64))
+    n = len(x)
+    s1 = np.r_[0.0, np.cumsum(x)]
+    s2 = np.r_[0.0, np.cumsum(x * x)]
+
+    # cost[i, j] is the sum of squares of x[i:j], only i < j is used
+    i = np.arange(n + 1)[:, None]
+    j = np.arange(n + 1)[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost = s2[j] - s2[i] - (s1[j] - s1[i]) ** 2 / (j - i)
+    cost = np.where(j > i, cost, np.inf)
+
+    best = cost[0].copy()
+    starts = []
+    for _ in range(1, n_classes):
+        total = best[:, None] + cost
+        start = np.argmin(total, axis=0)
+        best = total[start, np.arange(n + 1)]
+        starts.append(start)
+
+    # walk back from the last value to the first class
+    breaks = []
+    stop = n
+    for start in reversed(starts):
+        stop = start[stop]
+        breaks.append(x[stop])
+    return np.array(breaks[::-1])
+
+
+def class_breaks(values: np.ndarray, n_classes: int, method: str = "quantile", sample_size: int = 2000) -> np.ndarray:
+    """
+    The n_classes - 1 inner breaks of the finite values. Jenks runs on sample_size evenly spaced quantiles of the
+    values, which keeps its cost independent of the grid size.
+    """
+    if method not in BREAK_METHODS:
+        raise ValueError(f"Unknown break method {method}, the known methods are {list(BREAK_METHODS)}")
+    if n_classes < 1:
+        raise ValueError(f"n_classes has to be at least 1, got {n_classes}")
+
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        raise ValueError("There are no finite values to classify")
+
+    if method == "quantile":
+        return np.quantile(values, np.linspace(0, 1, n_classes + 1)[1:-1])
+
+    sample = np.quantile(values, np.linspace(0, 1, min(sample_size, len(values))))
+    return jenks_breaks(sample, n_classes)
+
+
+def classify(values: np.ndarray, breaks: np.ndarray) -> np.ndarray:
+    """
+    The class (0 for the lowest) of every value, -1 where the value is not finite.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    classes = np.digitize(values, breaks).astype(np.int16)
+    classes[~np.isfinite(values)] = -1
+    return classes
+
+
+def class_boundaries(classes: np.ndarray, spec: GridSpec) -> np.ndarray:
+    """
+    The cell edges between different classes (and around the grid) as two point linestrings.
+    """
+    padded = np.pad(classes, 1, constant_values=-1)
+    res = spec.resolution
+
+    # vertical edges between the columns j - 1 and j of a row
+    row, col = np.nonzero(padded[1:-1, :-1] != padded[1:-1, 1:])
+    x = spec.x_min + col * res
+    y = spec.y_max - row * res
+    vertical = np.stack([np.stack([x, y], axis=-1), np.stack([x, y - res], axis=-1)], axis=1)
+
+    # horizontal edges between the rows i - 1 and i of a column
+    row, col = np.nonzero(padded[:-1, 1:-1] != padded[1:, 1:-1])
+    x = spec.x_min + col * res
+    y = spec.y_max - row * res
+    horizontal = np.stack([np.stack([x, y], axis=-1), np.stack([x + res, y], axis=-1)], axis=1)
+
+    return shapely.linestrings(np.concatenate([vertical, horizontal]))
+
+
+def polygonize_classes(classes: np.ndarray, spec: GridSpec) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Turns a (height, width) class grid into polygons, cells of class -1 are left out. Returns every connected
+    region of one class as a polygon (with holes) together with its class.
+
+    The edges between cells of different classes are polygonized in one call, so no union over the cells is
+    needed, and the class of each face is read from the cell under a point inside it.
+    """
+    faces = shapely.get_parts(shapely.polygonize(class_boundaries(classes, spec)))
+    inside = shapely.point_on_surface(faces)
+    face_classes = classes.reshape(-1)[spec.cell_index(shapely.get_x(inside), shapely.get_y(inside))]
+    keep = face_classes >= 0
+    return faces[keep], face_classes[keep]
+
+
+def rx_from_array(values: np.ndarray,
+                  spec: GridSpec,
+                  rx_id: str,
+                  units: str,
+                  n_classes: int = 5,
+                  method: str = "quantile",
+                  rates: Optional[Sequence[float]] = None,
+                  implement_width: float = 0.0,
+                  tank_id: Union[str, Sequence[str]] = "TANK-1",
+                  tank_mix: Union[str, Sequence[str]] = "",
+                  crs: Optional[str] = None) -> ApplicatorRx:
+    """
+    Builds an ApplicatorRx from a (height, width) grid of values.
+
+    The values are split into n_classes with quantile or Jenks breaks and every class becomes one zone, from the
+    lowest values to the highest. rates gives the rate of each class, by default it is the mean value of the class
+    (EX: for a grid that already holds rates). Zone edges are simplified to implement_width (CRS units of the grid)
+    as a coverage, so neighbouring zones keep sharing their edges and the outer edge stays put, and are reprojected
+    to crs when it is given.
+    tank_id and tank_mix are used for every zone or given per class.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape != spec.shape:
+        raise ValueError(f"The grid values have the shape {values.shape}, the GridSpec is {spec.shape}")
+    if rates is not None and len(rates) != n_classes:
+        raise ValueError(f"{len(rates)} rates were given for {n_classes} classes")
+
+    breaks = class_breaks(values, n_classes, method=method)
+    classes = classify(values, breaks)
+    faces, face_classes = polygonize_classes(classes, spec)
+    if implement_width > 0 and len(faces) > 0:
+        if hasattr(shapely, "coverage_simplify"):
+            faces = shapely.coverage_simplify(faces, implement_width, simplify_boundary=False)
+        else:
+            faces = shapely.simplify(faces, implement_width)
+
+    order = np.argsort(face_classes, kind="stable")
+    codes, indices = np.unique(face_classes[order], return_inverse=True)
+    zones = shapely.multipolygons(faces[order], indices=indices)
+    if crs is not None and crs != spec.crs:
+        zones = transform_geometries(zones, spec.crs, crs)
+
+    if rates is None:
+        valid = classes >= 0
+        total = np.bincount(classes[valid], weights=values[valid], minlength=n_classes)
+        count = np.bincount(classes[valid], minlength=n_classes)
+        rates = np.where(count > 0, total / np.maximum(count, 1), 0.0)
+
+    def per_class(value, code):
+        return value if isinstance(value, str) else value[code]
+
+    return ApplicatorRx(
+        schema_name="ApplicatorRx",
+        id=rx_id,
+        crs=spec.crs if crs is None else crs,
+        units=rate_unit(units),
+        zones=[{
+            "id": f"zone-{code + 1}",
+            "geometry": shapely.to_wkt(zone, rounding_precision=8 if crs == "EPSG:4326" else 3),
+            "tank_id": per_class(tank_id, code),
+            "tank_mix": per_class(tank_mix, code),
+            "rate": float(rates[code]),
+        } for code, zone in zip(codes, zones)],
+    )
+
+
+def rx_from_grid(path: Union[str, Path], rx_id: str, units: str, band: Optional[str] = None, **kwargs) -> ApplicatorRx:
+    """
+    Builds an ApplicatorRx from a band of a grid written by create_grid (EX: the 'mean' band of a rasterized yield
+    event), see rx_from_array for the options. The first band is used when band is not given.
+    """
+    grid, spec, bands, _ = open_grid(path)
+    band = bands[0] if band is None else band
+    if band not in bands:
+        raise ValueError(f"The grid {path} has no band {band}, its bands are {bands}")
+    return rx_from_array(grid[bands.index(band)], spec, rx_id, units, **kwargs)
@@ -0,0 +1,165 @@
+from typing import List, Optional
+
+import numpy as np
+import shapely
+from pydantic import BaseModel, Field, ConfigDict
+
+from open_aglabs.applicator.models import ApplicatorRx
+from open_aglabs.core.gis import projected_crs, transform_geometries
+
+
+class ZoneOverlap(BaseModel):
+    """
+    Two zones of a prescription that cover the same ground.
+    """
+    zone_id: str = Field(
+        ...,
+        description="The id of the first zone."
+    )
+    other_zone_id: str = Field(
+        ...,
+        description="The id of the second zone."
+    )
+    area_m2: float = Field(
+        ...,
+        ge=0,
+        description="The area both zones cover in m2."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+
+class RxValidationReport(BaseModel):
+    """
+    The topology problems found in an ApplicatorRx.
+    """
+    rx_id: str = Field(
+        ...,
+        description="The id of the validated prescription."
+    )
+    zone_count: int = Field(
+        ...,
+        description="The number of zones in the prescription."
+    )
+    duplicate_ids: List[str] = Field(
+        default_factory=list,
+        description="Zone ids used by more than one zone."
+    )
+    invalid_wkt: List[str] = Field(
+        default_factory=list,
+        description="Zones whose geometry could not be parsed, is empty or is not a polygon."
+    )
+    invalid_geometry: List[str] = Field(
+        default_factory=list,
+        description="Zones whose polygon is not valid (EX: self intersecting)."
+    )
+    overlaps: List[ZoneOverlap] = Field(
+        default_factory=list,
+        description="Every pair of zones that overlap by more than the tolerance."
+    )
+    gap_area_m2: Optional[float] = Field(
+        None,
+        description="The area inside the field boundary not covered by any zone."
+    )
+    outside_area_m2: Optional[float] = Field(
+        None,
+        description="The area of the zones outside the field boundary."
+    )
+    outside_zones: List[str] = Field(
+        default_factory=list,
+        description="Zones that reach outside the field boundary by more than the tolerance."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+    @property
+    def offending_zones(self) -> List[str]:
+        ids = self.duplicate_ids + self.invalid_wkt + self.invalid_geometry + self.outside_zones
+        for overlap in self.overlaps:
+            ids += [overlap.zone_id, overlap.other_zone_id]
+        return list(dict.fromkeys(ids))
+
+    def is_valid(self, max_gap_m2: float = 0.0) -> bool:
+        return (len(self.offending_zones) == 0) and (self.gap_area_m2 is None or self.gap_area_m2 <= max_gap_m2)
+
+
+def validate_rx(rx: ApplicatorRx,
+                boundary: Optional[str] = None,
+                boundary_crs: Optional[str] = None,
+                tolerance_m2: float = 0.01) -> RxValidationReport:
+    """
+    Checks the zones of a prescription for invalid WKT, invalid polygons, duplicate ids and overlaps, and against a
+    field boundary (WKT in boundary_crs, default the Rx crs) for gaps and zones reaching outside of it.
+
+    All the geometries are parsed in one vectorized call. Zones that do not form a clean coverage with their
+    neighbours (GEOS coverage validation) are paired through a single STRtree self join and their overlaps are
+    measured exactly, the clean zones skip the pair checks and are dissolved with the much faster coverage union.
+    Areas are measured in the Rx crs or, for geographic CRSs, in the UTM zone of the prescription. Overlaps and
+    outside areas at or below tolerance_m2 are ignored, shared edges have no area.
+    """
+    ids = np.array([z.id for z in rx.zones], dtype=object)
+    report = RxValidationReport(rx_id=rx.id, zone_count=len(ids))
+
+    unique, counts = np.unique(ids.astype(str), return_counts=True)
+    report.duplicate_ids = unique[counts > 1].tolist()
+
+    geometries = shapely.from_wkt(np.array([z.geometry for z in rx.zones], dtype=object), on_invalid="ignore")
+    type_ids = shapely.get_type_id(geometries)
+    parsed = (~shapely.is_missing(geometries)) & (~shapely.is_empty(geometries)) & \
+        np.isin(type_ids, [shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON])
+    report.invalid_wkt = ids[~parsed].tolist()
+
+    valid = parsed.copy()
+    valid[parsed] = shapely.is_valid(geometries[parsed])
+    report.invalid_geometry = ids[parsed & ~valid].tolist()
+
+    good = np.flatnonzero(valid)
+    if len(good) == 0:
+        return report
+
+    crs = projected_crs(geometries[good], rx.crs)
+    zones = transform_geometries(geometries[good], rx.crs, crs)
+    shapely.prepare(zones)
+
+    # a valid coverage has no overlaps, so only zones with invalid coverage edges need the exact pair checks
+    if hasattr(shapely, "coverage_invalid_edges"):
+        suspect = ~shapely.is_empty(shapely.coverage_invalid_edges(zones))
+    else:
+        suspect = np.ones(len(zones), dtype=bool)
+
+    tree = shapely.STRtree(zones)
+    left, right = tree.query(zones[suspect], predicate="intersects")
+    left = np.flatnonzero(suspect)[left]
+    # only one zone of a pair may be flagged (EX: just the inner one of two nested zones), every pair is kept once
+    pairs = np.unique(np.c_[np.minimum(left, right), np.maximum(left, right)][left != right], axis=0)
+    left, right = pairs[:, 0], pairs[:, 1]
+    area = shapely.area(shapely.intersection(zones[left], zones[right]))
+    overlapping = area > tolerance_m2
+    report.overlaps = [
+        ZoneOverlap(zone_id=ids[good[i]], other_zone_id=ids[good[j]], area_m2=float(a))
+        for i, j, a in zip(left[overlapping], right[overlapping], area[overlapping])
+    ]
+
+    if boundary is not None:
+        field = transform_geometries(shapely.from_wkt(boundary), boundary_crs or rx.crs, crs)
+        if not shapely.is_valid(field):
+            raise ValueError(f"The field boundary of {rx.id} is not a valid polygon")
+
+        covered = shapely.coverage_union_all(zones[~suspect]) if hasattr(shapely, "coverage_union_all") else \
+            shapely.union_all(zones[~suspect])
+        if np.any(suspect):
+            covered = shapely.union_all(np.r_[zones[suspect], covered])
+        report.gap_area_m2 = float(shapely.area(shapely.difference(field, covered)))
+
+        shapely.prepare(field)
+        outside = np.zeros(len(zones))
+        crossing = ~shapely.contains_properly(field, zones)
+        outside[crossing] = shapely.area(shapely.difference(zones[crossing], field))
+        report.outside_area_m2 = float(shapely.area(shapely.difference(covered, field)))
+        report.outside_zones = ids[good[outside > tolerance_m2]].tolist()
+
+    return report
@@ -0,0 +1,110 @@
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from open_aglabs.applicator.models import ApplicatorRx
+from open_aglabs.core.gis import transform_xy
+from open_aglabs.core.points import POINT_STORE_META, read_point_store
+from open_aglabs.harvest.cleaning import YieldCleaner, YieldCleaningConfig, yield_per_point
+from open_aglabs.harvest.models import HarvestEvent
+
+
+def zone_geometries(geometries) -> np.ndarray:
+    """
+    Parses WKT (or passes through shapely geometries) in one vectorized call and prepares them for fast predicates.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    if len(geometries) > 0 and isinstance(geometries[0], str):
+        geometries = shapely.from_wkt(geometries)
+    shapely.prepare(geometries)
+    return geometries
+
+
+def zonal_statistics(ids: Sequence[str],
+                     geometries,
+                     x: np.ndarray,
+                     y: np.ndarray,
+                     values: np.ndarray,
+                     chunk_size: int = 1_000_000) -> pd.DataFrame:
+    """
+    Joins points to polygons and returns the count, sum and mean of the values in each polygon, indexed by the
+    polygon id. Candidate pairs come from a bulk STRtree bounding box query and are confirmed with contains_xy on
+    the prepared polygons. The points have to be in the CRS of the polygons, a point inside overlapping polygons
+    counts towards each of them and points without a finite value are ignored.
+    """
+    geometries = zone_geometries(geometries)
+    tree = shapely.STRtree(geometries)
+
+    n_zones = len(geometries)
+    count = np.zeros(n_zones, dtype=np.int64)
+    total = np.zeros(n_zones, dtype=np.float64)
+    for start in range(0, len(values), chunk_size):
+        cx = np.asarray(x[start:start + chunk_size], dtype=np.float64)
+        cy = np.asarray(y[start:start + chunk_size], dtype=np.float64)
+        cv = np.asarray(values[start:start + chunk_size], dtype=np.float64)
+
+        point_idx, zone_idx = tree.query(shapely.points(cx, cy))
+        inside = shapely.contains_xy(geometries[zone_idx], cx[point_idx], cy[point_idx])
+        inside &= np.isfinite(cv[point_idx])
+        point_idx, zone_idx = point_idx[inside], zone_idx[inside]
+
+        count += np.bincount(zone_idx, minlength=n_zones)
+        total += np.bincount(zone_idx, weights=cv[point_idx], minlength=n_zones)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(count > 0, total / count, np.nan)
+
+    return pd.DataFrame({"count": count, "sum": total, "mean": mean},
+                        index=pd.Index(list(ids), name="id"))
+
+
+def rx_zonal_statistics(rx: ApplicatorRx,
+                        longitude: np.ndarray,
+                        latitude: np.ndarray,
+                        values: np.ndarray,
+                        points_crs: str = "EPSG:4326",
+                        chunk_size: int = 1_000_000) -> pd.DataFrame:
+    """
+    Summarises point values per ApplicatorZone, the table is keyed by ApplicatorZone.id and carries the zone rate,
+    tank_id and tank_mix alongside count, sum and mean.
+    """
+    x, y = transform_xy(longitude, latitude, points_crs, rx.crs)
+    df = zonal_statistics([z.id for z in rx.zones], [z.geometry for z in rx.zones], x, y, values,
+                          chunk_size=chunk_size)
+    df["rate"] = [z.rate for z in rx.zones]
+    df["tank_id"] = [z.tank_id for z in rx.zones]
+    df["tank_mix"] = [z.tank_mix for z in rx.zones]
+    return df
+
+
+def rx_zonal_yield(rx: ApplicatorRx,
+                   event: HarvestEvent,
+                   keep: Optional[np.ndarray] = None,
+                   config: Optional[YieldCleaningConfig] = None,
+                   chunk_size: int = 1_000_000) -> pd.DataFrame:
+    """
+    What did each Rx zone yield? Reads the yield points of the event from its point store (see
+    ingest_yield_monitor) and summarises the wet yield (kg/ha) of every point per zone.
+
+    The points are cleaned with YieldCleaner (config, default YieldCleaningConfig) first, so flow delay, pass ends
+    and overlaps do not count, unless keep, a boolean mask over the stored points (EX: from an earlier cleaning
+    run), says which points to use.
+    """
+    if not (Path(event.file_path) / POINT_STORE_META).exists():
+        raise ValueError(f"Harvest event {event.id} does not point at a yield point store ({event.file_path}), "
+                         f"use the event returned by ingest_yield_monitor")
+
+    points = read_point_store(event.file_path)
+    if keep is None:
+        points, _ = YieldCleaner(config).clean(points)
+    else:
+        keep = np.asarray(keep, dtype=bool)
+        if keep.shape != points["lat"].shape:
+            raise ValueError(f"The keep mask has {len(keep)} values, the event {event.id} has {len(points['lat'])} "
+                             f"points")
+        points = {name: values[keep] for name, values in points.items()}
+    values = yield_per_point(points) * 10000.0
+    return rx_zonal_statistics(rx, points["lon"], points["lat"], values, chunk_size=chunk_size)
@@ -23,6 +23,40 @@ RATE_UNITS = ("kg/ha", 'lbs/ac', 'g/m2', 'oz/ft2', 'l/ha', 'ml/m2', 'gal/ac')
 
 AMOUNT_UNITS = ["Kg", "lbs", "g", "oz", "l", "ml", "gal"]
 
+# Standard test weights in lbs per US bushel, used to convert between mass and bushels.
+CROP_TEST_WEIGHTS = {
+    "barley": 48.0,
+    "maize": 56.0,
+    "corn": 56.0,
+    "sorghum": 56.0,
+    "pearl_millet": 50.0,
+    "finger_millet": 50.0,
+    "rice": 45.0,
+    "wheat": 60.0,
+    "soybean": 60.0,
+    "bush_bean": 60.0,
+    "climbing_bean": 60.0,
+    "chickpea": 60.0,
+    "cowpea": 60.0,
+    "faba_bean": 60.0,
+    "lentil": 60.0,
+    "pigeonpea": 60.0,
+    "potato": 60.0,
+}
+
+# Nutrients removed with the harvested crop as (N, P2O5, K2O) in kg per kg of harvest at standard moisture,
+# from the usual grain / tuber removal rates (EX: corn 0.67, 0.37 and 0.27 lbs per 56 lbs bushel).
+CROP_NUTRIENT_REMOVAL = {
+    "corn": (0.0120, 0.0066, 0.0048),
+    "maize": (0.0120, 0.0066, 0.0048),
+    "soybean": (0.0633, 0.0125, 0.0200),
+    "wheat": (0.0200, 0.0083, 0.0050),
+    "barley": (0.0183, 0.0079, 0.0052),
+    "sorghum": (0.0118, 0.0070, 0.0048),
+    "rice": (0.0127, 0.0067, 0.0033),
+    "potato": (0.0033, 0.0013, 0.0063),
+}
+
 COUNTRY_CODES = {
     'UNK': "unknown",
     "AFG": "Afghanistan",
@@ -273,4 +307,36 @@ COUNTRY_CODES = {
     "YEM": "Yemen",
     "ZMB": "Zambia",
     "ZWE": "Zimbabwe"
-}
\ No newline at end of file
+}
+
+# ISO 3166-1 alpha-2 codes of the COUNTRY_CODES (alpha-3), EX: the 'us' of the season key '2025:us:corn:spring'.
+COUNTRY_ALPHA2 = {
+    "AF": "AFG", "AL": "ALB", "DZ": "DZA", "AS": "ASM", "AD": "AND", "AO": "AGO", "AI": "AIA", "AQ": "ATA", "AG": "ATG",
+    "AR": "ARG", "AM": "ARM", "AW": "ABW", "AU": "AUS", "AT": "AUT", "AZ": "AZE", "BS": "BHS", "BH": "BHR", "BD": "BGD",
+    "BB": "BRB", "BY": "BLR", "BE": "BEL", "BZ": "BLZ", "BJ": "BEN", "BM": "BMU", "BT": "BTN", "BO": "BOL", "BQ": "BES",
+    "BA": "BIH", "BW": "BWA", "BV": "BVT", "BR": "BRA", "IO": "IOT", "BN": "BRN", "BG": "BGR", "BF": "BFA", "BI": "BDI",
+    "CV": "CPV", "KH": "KHM", "CM": "CMR", "CA": "CAN", "KY": "CYM", "CF": "CAF", "TD": "TCD", "CL": "CHL", "CN": "CHN",
+    "CX": "CXR", "CC": "CCK", "CO": "COL", "KM": "COM", "CG": "COG", "CD": "COD", "CK": "COK", "CR": "CRI", "CI": "CIV",
+    "HR": "HRV", "CU": "CUB", "CW": "CUW", "CY": "CYP", "CZ": "CZE", "DK": "DNK", "DJ": "DJI", "DM": "DMA", "DO": "DOM",
+    "EC": "ECU", "EG": "EGY", "SV": "SLV", "GQ": "GNQ", "ER": "ERI", "EE": "EST", "SZ": "SWZ", "ET": "ETH", "FK": "FLK",
+    "FO": "FRO", "FJ": "FJI", "FI": "FIN", "FR": "FRA", "GF": "GUF", "PF": "PYF", "TF": "ATF", "GA": "GAB", "GM": "GMB",
+    "GE": "GEO", "DE": "DEU", "GH": "GHA", "GI": "GIB", "GR": "GRC", "GL": "GRL", "GD": "GRD", "GP": "GLP", "GU": "GUM",
+    "GT": "GTM", "GG": "GGY", "GN": "GIN", "GW": "GNB", "GY": "GUY", "HT": "HTI", "HM": "HMD", "VA": "VAT", "HN": "HND",
+    "HK": "HKG", "HU": "HUN", "IS": "ISL", "IN": "IND", "ID": "IDN", "IR": "IRN", "IQ": "IRQ", "IE": "IRL", "IM": "IMN",
+    "IL": "ISR", "IT": "ITA", "JM": "JAM", "JP": "JPN", "JE": "JEY", "JO": "JOR", "KZ": "KAZ", "KE": "KEN", "KI": "KIR",
+    "KP": "PRK", "KR": "KOR", "KW": "KWT", "KG": "KGZ", "LA": "LAO", "LV": "LVA", "LB": "LBN", "LS": "LSO", "LR": "LBR",
+    "LY": "LBY", "LI": "LIE", "LT": "LTU", "LU": "LUX", "MO": "MAC", "MG": "MDG", "MW": "MWI", "MY": "MYS", "MV": "MDV",
+    "ML": "MLI", "MT": "MLT", "MH": "MHL", "MQ": "MTQ", "MR": "MRT", "MU": "MUS", "YT": "MYT", "MX": "MEX", "FM": "FSM",
+    "MD": "MDA", "MC": "MCO", "MN": "MNG", "ME": "MNE", "MS": "MSR", "MA": "MAR", "MZ": "MOZ", "MM": "MMR", "NA": "NAM",
+    "NR": "NRU", "NP": "NPL", "NL": "NLD", "NC": "NCL", "NZ": "NZL", "NI": "NIC", "NE": "NER", "NG": "NGA", "NU": "NIU",
+    "NF": "NFK", "MK": "MKD", "MP": "MNP", "NO": "NOR", "OM": "OMN", "PK": "PAK", "PW": "PLW", "PS": "PSE", "PA": "PAN",
+    "PG": "PNG", "PY": "PRY", "PE": "PER", "PH": "PHL", "PN": "PCN", "PL": "POL", "PT": "PRT", "PR": "PRI", "QA": "QAT",
+    "RE": "REU", "RO": "ROU", "RU": "RUS", "RW": "RWA", "BL": "BLM", "SH": "SHN", "KN": "KNA", "LC": "LCA", "MF": "MAF",
+    "PM": "SPM", "VC": "VCT", "WS": "WSM", "SM": "SMR", "ST": "STP", "SA": "SAU", "SN": "SEN", "RS": "SRB", "SC": "SYC",
+    "SL": "SLE", "SG": "SGP", "SX": "SXM", "SK": "SVK", "SI": "SVN", "SB": "SLB", "SO": "SOM", "ZA": "ZAF", "GS": "SGS",
+    "SS": "SSD", "ES": "ESP", "LK": "LKA", "SD": "SDN", "SR": "SUR", "SJ": "SJM", "SE": "SWE", "CH": "CHE", "SY": "SYR",
+    "TW": "TWN", "TJ": "TJK", "TZ": "TZA", "TH": "THA", "TL": "TLS", "TG": "TGO", "TK": "TKL", "TO": "TON", "TT": "TTO",
+    "TN": "TUN", "TR": "TUR", "TM": "TKM", "TC": "TCA", "TV": "TUV", "UG": "UGA", "UA": "UKR", "AE": "ARE", "GB": "GBR",
+    "UM": "UMI", "US": "USA", "UY": "URY", "UZ": "UZB", "VU": "VUT", "VE": "VEN", "VN": "VNM", "VG": "VGB", "VI": "VIR",
+    "WF": "WLF", "EH": "ESH", "YE": "YEM", "ZM": "ZMB", "ZW": "ZWE",
+}
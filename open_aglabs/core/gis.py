@@ -0,0 +1,245 @@
+import json
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import shapely
+from pydantic import BaseModel, Field, ConfigDict
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+METERS_PER_DEGREE_LAT = 111_320.0
+
+# WGS 84 / NSIDC EASE-Grid 2.0 Global, a cylindrical equal area CRS that covers the whole earth.
+EQUAL_AREA_CRS = "EPSG:6933"
+
+
+def geohash_encode(latitude, longitude, precision: int = 9):
+    """
+    Encodes latitude / longitude pairs into geohash strings.
+
+    Works on scalars or whole arrays at once, the bit interleaving is done per bit position over the full array
+    rather than per point. Returns a str for scalar input and a numpy array of str otherwise.
+    """
+    if precision < 1 or precision > 12:
+        raise ValueError(f"Geohash precision must be between 1 and 12, got {precision}")
+
+    scalar = np.ndim(latitude) == 0 and np.ndim(longitude) == 0
+    lat = np.atleast_1d(np.asarray(latitude, dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(longitude, dtype=np.float64))
+
+    n_bits = 5 * precision
+    lon_bits = (n_bits + 1) // 2
+    lat_bits = n_bits // 2
+
+    lon_int = np.floor((lon + 180.0) / 360.0 * (1 << lon_bits)).astype(np.uint64)
+    lat_int = np.floor((lat + 90.0) / 180.0 * (1 << lat_bits)).astype(np.uint64)
+    lon_int = np.minimum(lon_int, np.uint64((1 << lon_bits) - 1))
+    lat_int = np.minimum(lat_int, np.uint64((1 << lat_bits) - 1))
+
+    # Geohash interleaves starting with a longitude bit, most significant bits first.
+    code = np.zeros(lat.shape, dtype=np.uint64)
+    for i in range(n_bits):
+        if i % 2 == 0:
+            bit = (lon_int >> np.uint64(lon_bits - 1 - i // 2)) & np.uint64(1)
+        else:
+            bit = (lat_int >> np.uint64(lat_bits - 1 - i // 2)) & np.uint64(1)
+        code = (code << np.uint64(1)) | bit
+
+    alphabet = np.array(list(GEOHASH_BASE32))
+    chars = np.empty((lat.size, precision), dtype="<U1")
+    for k in range(precision):
+        shift = np.uint64(n_bits - 5 * (k + 1))
+        chars[:, k] = alphabet[((code >> shift) & np.uint64(31)).astype(np.intp)]
+
+    hashes = chars.view(f"<U{precision}").reshape(-1)
+    if scalar:
+        return str(hashes[0])
+    return hashes
+
+
+def local_xy(latitude, longitude, origin_latitude=None, origin_longitude=None):
+    """
+    Projects coordinates onto a local equirectangular plane in meters around an origin (the first point by default).
+    Good to well under a percent over a field or farm and much cheaper than a full CRS transform.
+    """
+    lat = np.asarray(latitude, dtype=np.float64)
+    lon = np.asarray(longitude, dtype=np.float64)
+    if origin_latitude is None:
+        origin_latitude = float(lat.flat[0]) if lat.size else 0.0
+    if origin_longitude is None:
+        origin_longitude = float(lon.flat[0]) if lon.size else 0.0
+
+    x = (lon - origin_longitude) * METERS_PER_DEGREE_LAT * np.cos(np.radians(origin_latitude))
+    y = (lat - origin_latitude) * METERS_PER_DEGREE_LAT
+    return x, y
+
+
+def utm_crs(longitude, latitude) -> str:
+    """
+    Gets the WGS 84 / UTM zone CRS for the mean of the given coordinates.
+    """
+    lon = float(np.nanmean(longitude))
+    lat = float(np.nanmean(latitude))
+    zone = int(np.floor((lon + 180.0) / 6.0)) % 60 + 1
+    return f"EPSG:{32600 + zone if lat >= 0 else 32700 + zone}"
+
+
+def transform_xy(x, y, from_crs: str, to_crs: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Transforms whole coordinate arrays between two CRSs, x is always the longitude / easting.
+    """
+    from pyproj import Transformer
+
+    if from_crs == to_crs:
+        return np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    transformer = Transformer.from_crs(from_crs, to_crs, always_xy=True)
+    return transformer.transform(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+
+
+def transform_bounds(x_min: float, y_min: float, x_max: float, y_max: float, from_crs: str,
+                     to_crs: str) -> Tuple[float, float, float, float]:
+    """
+    Transforms a bounding box between two CRSs. The edges are densified, so the box holds every point of the
+    original box once transformed.
+    """
+    from pyproj import Transformer
+
+    if from_crs == to_crs:
+        return x_min, y_min, x_max, y_max
+    transformer = Transformer.from_crs(from_crs, to_crs, always_xy=True)
+    return transformer.transform_bounds(x_min, y_min, x_max, y_max, densify_pts=21)
+
+
+def transform_geometries(geometries, from_crs: str, to_crs: str):
+    """
+    Transforms shapely geometries (one or an array) between two CRSs with a single coordinate transform.
+    """
+    if from_crs == to_crs:
+        return geometries
+    return shapely.transform(geometries, lambda xy: np.column_stack(transform_xy(xy[:, 0], xy[:, 1], from_crs, to_crs)))
+
+
+def projected_crs(geometries, crs: str) -> str:
+    """
+    The CRS to measure lengths and areas of the geometries in, crs itself when it is projected or else the UTM
+    zone of the geometries.
+    """
+    from pyproj import CRS
+
+    if not CRS.from_user_input(crs).is_geographic:
+        return crs
+    x_min, y_min, x_max, y_max = shapely.total_bounds(geometries)
+    return utm_crs([x_min, x_max], [y_min, y_max])
+
+
+def equal_area_m2(geometries, crs: str) -> np.ndarray:
+    """
+    The area of polygons in m2 anywhere on earth, by one transform to the global equal area EPSG:6933 and a
+    vectorized planar area. For field sized polygons this matches the geodesic area to a few parts per billion.
+    """
+    return shapely.area(transform_geometries(geometries, crs, EQUAL_AREA_CRS))
+
+
+class GridSpec(BaseModel):
+    """
+    A north up raster grid, the (x_min, y_max) corner is the top left of the first cell.
+    """
+    crs: str = Field(
+        ...,
+        description="The coordinate reference system of the grid."
+    )
+    x_min: float = Field(
+        ...,
+        description="The left edge of the grid."
+    )
+    y_max: float = Field(
+        ...,
+        description="The top edge of the grid."
+    )
+    resolution: float = Field(
+        ...,
+        gt=0,
+        description="The cell size in CRS units."
+    )
+    width: int = Field(
+        ...,
+        gt=0,
+        description="The number of columns."
+    )
+    height: int = Field(
+        ...,
+        gt=0,
+        description="The number of rows."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+    @classmethod
+    def from_bounds(cls, x_min: float, y_min: float, x_max: float, y_max: float, resolution: float, crs: str):
+        x_min = np.floor(x_min / resolution) * resolution
+        y_max = np.ceil(y_max / resolution) * resolution
+        width = max(int(np.floor((x_max - x_min) / resolution)) + 1, 1)
+        height = max(int(np.floor((y_max - y_min) / resolution)) + 1, 1)
+        return cls(crs=crs, x_min=float(x_min), y_max=float(y_max), resolution=resolution, width=width,
+                   height=height)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    @property
+    def size(self) -> int:
+        return self.height * self.width
+
+    def cell_index(self, x, y) -> np.ndarray:
+        """
+        The flat (row major) cell index of every coordinate, -1 for coordinates outside the grid.
+        """
+        col = np.floor((np.asarray(x) - self.x_min) / self.resolution)
+        row = np.floor((self.y_max - np.asarray(y)) / self.resolution)
+        inside = (col >= 0) & (col < self.width) & (row >= 0) & (row < self.height)
+        return np.where(inside, row * self.width + col, -1).astype(np.int64)
+
+    def cell_centers(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The x coordinates of the column centers and y coordinates of the row centers.
+        """
+        x = self.x_min + (np.arange(self.width) + 0.5) * self.resolution
+        y = self.y_max - (np.arange(self.height) + 0.5) * self.resolution
+        return x, y
+
+
+def grid_metadata_path(path: Union[str, Path]) -> Path:
+    return Path(path).with_suffix(".json")
+
+
+def create_grid(path: Union[str, Path],
+                spec: GridSpec,
+                bands: List[str],
+                dtype: str = "float32",
+                fill_value: float = np.nan,
+                metadata: Optional[dict] = None) -> np.memmap:
+    """
+    Creates a (bands, height, width) .npy file opened as a writable memmap, with the GridSpec, band names and extra
+    metadata in a .json file next to it. Only the pages that are touched are held in memory.
+    """
+    path = Path(path)
+    grid = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(len(bands),) + spec.shape)
+    grid[:] = fill_value
+
+    with open(grid_metadata_path(path), "w") as f:
+        json.dump({"spec": spec.model_dump(), "bands": list(bands), "metadata": metadata or {}}, f, indent=4)
+    return grid
+
+
+def open_grid(path: Union[str, Path], mode: str = "r") -> Tuple[np.memmap, GridSpec, List[str], dict]:
+    """
+    Opens a grid written by create_grid, returns the memmap, the GridSpec, the band names and the metadata.
+    """
+    with open(grid_metadata_path(path)) as f:
+        meta = json.load(f)
+    grid = np.load(path, mmap_mode=mode)
+    return grid, GridSpec(**meta["spec"]), meta["bands"], meta["metadata"]
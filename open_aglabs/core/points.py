@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import shapely
+
+POINT_STORE_META = "meta.json"
+
+
+def iter_point_chunks(path: Union[str, Path],
+                      columns: Dict[str, str],
+                      chunk_size: int = 500_000,
+                      dtypes: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Reads a point file (CSV or anything OGR can open, EX: GeoJSON, GeoPackage) in chunks and yields a dict of numpy
+    arrays per chunk. columns maps the output name to the name of the column in the file. For spatial files 'lat'
+    and 'lon' are taken from the point geometry when they are not mapped to attribute columns.
+    """
+    path = Path(path)
+    dtypes = {} if dtypes is None else dtypes
+
+    def to_arrays(df: pd.DataFrame, geometry=None) -> Dict[str, np.ndarray]:
+        chunk = {}
+        for name, source in columns.items():
+            if source in df.columns:
+                values = df[source]
+                dtype = dtypes.get(name)
+                chunk[name] = values.to_numpy(dtype=dtype) if dtype is not None else values.to_numpy()
+        if geometry is not None:
+            if "lon" not in chunk:
+                chunk["lon"] = shapely.get_x(geometry)
+            if "lat" not in chunk:
+                chunk["lat"] = shapely.get_y(geometry)
+        return chunk
+
+    if path.suffix.lower() in (".csv", ".txt"):
+        usecols = list(dict.fromkeys(columns.values()))
+        for df in pd.read_csv(path, usecols=lambda c: c in usecols, chunksize=chunk_size):
+            yield to_arrays(df)
+        return
+
+    import pyogrio
+
+    available = set(pyogrio.read_info(path)["fields"])
+    attributes = [c for c in dict.fromkeys(columns.values()) if c in available]
+
+    skip = 0
+    while True:
+        gdf = pyogrio.read_dataframe(path, columns=attributes, skip_features=skip, max_features=chunk_size)
+        if len(gdf) == 0:
+            return
+        yield to_arrays(gdf, geometry=gdf.geometry.values)
+        skip += len(gdf)
+
+
+def read_point_chunks(path: Union[str, Path],
+                      columns: Dict[str, str],
+                      required: Sequence[str],
+                      kind: str,
+                      chunk_size: int = 500_000,
+                      dtypes: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    iter_point_chunks for a machine log of the given kind (EX: 'yield'), raising when a chunk is missing one of the
+    required output columns or when the file has no points at all.
+    """
+    empty = True
+    for chunk in iter_point_chunks(path, columns, chunk_size=chunk_size, dtypes=dtypes):
+        missing = [c for c in required if c not in chunk]
+        if len(missing) > 0:
+            raise ValueError(f"The {kind} file {path} is missing the columns {[columns[c] for c in missing]}")
+        empty = False
+        yield chunk
+    if empty:
+        raise ValueError(f"The {kind} file {path} has no points")
+
+
+class CategoryCodes:
+    """
+    Maps the names of a categorical point column (EX: varieties, products) to int16 codes in the order they are
+    first seen, missing names are 'unknown'. codes (name -> code) is what goes into the store metadata.
+    """
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.codes)
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=object)
+        values = np.where(pd.isna(values), "unknown", values).astype(str)
+        unique, inverse = np.unique(values, return_inverse=True)
+        for name in unique:
+            if name not in self.codes:
+                self.codes[name] = len(self.codes)
+        lookup = np.array([self.codes[name] for name in unique], dtype=np.int16)
+        return lookup[inverse]
+
+
+class PointStoreWriter:
+    """
+    Streams point columns to a compact columnar store, a directory with one raw binary file per column plus a
+    meta.json holding the dtypes, the number of points and any extra metadata. Chunks are appended as they arrive
+    so writing never needs the whole dataset in memory, and read_point_store memory maps the columns back.
+
+    dtypes lists every column the store may hold, the first chunk decides which of them it does and nothing is
+    written before it. Used as a context manager the store is closed on the way out and marked incomplete when an
+    exception cut the writing short.
+    """
+
+    def __init__(self, path: Union[str, Path], dtypes: Dict[str, str], metadata: Optional[dict] = None):
+        self.path = Path(path)
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in dtypes.items()}
+        self.metadata = {} if metadata is None else dict(metadata)
+        self.count = 0
+        self.closed = False
+        self._files = None
+
+    def _open(self, names):
+        self.dtypes = {name: dtype for name, dtype in self.dtypes.items() if name in names}
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._files = {name: open(self.path / f"{name}.bin", "wb") for name in self.dtypes}
+
+    def append(self, chunk: Dict[str, np.ndarray]):
+        if self._files is None:
+            self._open(chunk)
+        lengths = {len(chunk[name]) for name in self.dtypes}
+        if len(lengths) != 1:
+            raise ValueError(f"All columns of a chunk need the same length, got {lengths}")
+
+        for name, dtype in self.dtypes.items():
+            self._files[name].write(np.ascontiguousarray(chunk[name], dtype=dtype).tobytes())
+        self.count += lengths.pop()
+
+    def close(self, complete: bool = True):
+        """
+        Closes the column files and writes meta.json, a second close does nothing. complete=False marks a store
+        whose writing was cut short (EX: by an exception), its columns only hold the points written so far. A store cut
+        short before its first chunk is not written at all.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self._files is None:
+            if not complete:
+                return
+            self._open(self.dtypes)
+        for f in self._files.values():
+            f.close()
+
+        meta = {
+            "count": self.count,
+            "complete": complete,
+            "columns": {name: dtype.str for name, dtype in self.dtypes.items()},
+            "metadata": self.metadata,
+        }
+        with open(self.path / POINT_STORE_META, "w") as f:
+            json.dump(meta, f, indent=4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(complete=exc_type is None)
+
+
+def read_point_store(path: Union[str, Path], columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Opens a store written by PointStoreWriter, every column is returned as a read only numpy memmap.
+    """
+    path = Path(path)
+    meta = read_point_store_meta(path)
+    names = list(meta["columns"]) if columns is None else columns
+
+    arrays = {}
+    for name in names:
+        dtype = np.dtype(meta["columns"][name])
+        if meta["count"] == 0 or os.path.getsize(path / f"{name}.bin") == 0:
+            arrays[name] = np.empty(0, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path / f"{name}.bin", dtype=dtype, mode="r", shape=(meta["count"],))
+    return arrays
+
+
+def read_point_store_meta(path: Union[str, Path]) -> dict:
+    with open(Path(path) / POINT_STORE_META) as f:
+        return json.load(f)
+
+
+def content_hash(path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """
+    The sha256 of a file, or of every file in a directory (EX: a point store) in name order.
+    """
+    path = Path(path)
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+
+    digest = hashlib.sha256()
+    for file in files:
+        if path.is_dir():
+            digest.update(str(file.relative_to(path)).encode())
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+    return digest.hexdigest()
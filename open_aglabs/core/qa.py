@@ -0,0 +1,208 @@
+from typing import Optional, List, Dict
+
+import numpy as np
+import pandas as pd
+
+# log10 of the multipliers that show up when a lab value is entered in the wrong unit.
+# 4: ppm <-> pct, 3: ppm <-> g/kg (or mg/kg <-> g/kg)
+UNIT_SLIP_FACTORS = (4, -4, 3, -3)
+
+MAD_TO_SIGMA = 1.4826
+
+
+def analysis_frame(samples, region_field: str = "admin_level_1") -> pd.DataFrame:
+    """
+    Flattens SoilSample / TissueSample models into one row per sample with the sample id, lab, region and every
+    analysis result as a float column.
+    """
+    samples = list(samples)
+    if len(samples) == 0:
+        return pd.DataFrame(columns=["sample_id", "lab_id", "region"])
+
+    columns = list(type(samples[0].analysis_results).model_fields)
+    values = np.array([[getattr(s.analysis_results, c) for c in columns] for s in samples], dtype=np.float64)
+
+    df = pd.DataFrame(values, columns=columns)
+    df.insert(0, "sample_id", [s.sample_id for s in samples])
+    df.insert(1, "lab_id", [s.lab_id or "unknown" for s in samples])
+    df.insert(2, "region", [
+        (getattr(s.location, region_field, None) or s.location.admin_level_0 or "unknown")
+        if s.location is not None else "unknown"
+        for s in samples
+    ])
+    return df
+
+
+class AnalysisQA:
+    """
+    Batch QA for lab analysis results based on robust statistics (median / MAD).
+
+    Values are binned on a log10 scale into fixed width histograms per scope (lab, region and global), group and
+    column. Histograms add up exactly, so new batches are folded into the statistics incrementally, and the median
+    and MAD of every group and column are read off the cumulative histograms in one vectorized pass.
+    """
+
+    def __init__(self,
+                 columns: List[str],
+                 scopes: Optional[Dict[str, Optional[str]]] = None,
+                 log_min: float = -4.0,
+                 log_max: float = 6.0,
+                 bin_width: float = 0.01,
+                 min_count: int = 20,
+                 z_threshold: float = 3.5,
+                 slip_tolerance: float = 0.5):
+        self.columns = list(columns)
+        # scope name -> the column holding the group key, None for one global group
+        self.scopes = {"lab": "lab_id", "region": "region", "global": None} if scopes is None else dict(scopes)
+        self.log_min = log_min
+        self.bin_width = bin_width
+        self.n_bins = int(np.ceil((log_max - log_min) / bin_width))
+        self.min_count = min_count
+        self.z_threshold = z_threshold
+        self.slip_tolerance = slip_tolerance
+
+        self._groups = {scope: {} for scope in self.scopes}
+        self._hist = {scope: np.zeros((0, len(self.columns), self.n_bins), dtype=np.int64) for scope in self.scopes}
+        self._stats = {}
+
+    def _bins(self, df: pd.DataFrame) -> np.ndarray:
+        values = df[self.columns].to_numpy(dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logs = np.log10(values)
+        bins = np.floor((logs - self.log_min) / self.bin_width)
+        bins[~np.isfinite(bins)] = 0
+        bins = np.clip(bins, 0, self.n_bins - 1).astype(np.int64)
+        # values <= 0 and missing values are left out of the statistics
+        bins[~(values > 0)] = -1
+        return bins
+
+    def _group_codes(self, scope: str, df: pd.DataFrame, add: bool) -> np.ndarray:
+        key_col = self.scopes[scope]
+        keys = np.full(len(df), "global", dtype=object) if key_col is None else df[key_col].astype(str).to_numpy()
+        groups = self._groups[scope]
+
+        unique, inverse = np.unique(keys.astype(str), return_inverse=True)
+        lookup = np.empty(len(unique), dtype=np.int64)
+        for i, key in enumerate(unique):
+            if key not in groups:
+                if not add:
+                    lookup[i] = -1
+                    continue
+                groups[key] = len(groups)
+            lookup[i] = groups[key]
+        return lookup[inverse]
+
+    def update(self, df: pd.DataFrame):
+        """
+        Folds a batch (see analysis_frame) into the running statistics.
+        """
+        bins = self._bins(df)
+        n_cols = len(self.columns)
+        col_idx = np.broadcast_to(np.arange(n_cols), bins.shape)
+
+        for scope in self.scopes:
+            codes = self._group_codes(scope, df, add=True)
+            n_groups = len(self._groups[scope])
+            hist = self._hist[scope]
+            if hist.shape[0] < n_groups:
+                grown = np.zeros((n_groups, n_cols, self.n_bins), dtype=np.int64)
+                grown[:hist.shape[0]] = hist
+                hist = grown
+
+            valid = bins >= 0
+            g = np.broadcast_to(codes[:, None], bins.shape)[valid]
+            flat = (g * n_cols + col_idx[valid]) * self.n_bins + bins[valid]
+            hist += np.bincount(flat, minlength=hist.size).reshape(hist.shape)
+            self._hist[scope] = hist
+
+        self._stats = {}
+
+    def statistics(self, scope: str):
+        """
+        Returns (count, median, mad) arrays of shape (n_groups, n_columns) for a scope, all on the log10 scale.
+        """
+        if scope in self._stats:
+            return self._stats[scope]
+
+        hist = self._hist[scope]
+        count = hist.sum(axis=2)
+        half = count[..., None] / 2.0
+
+        cum = np.cumsum(hist, axis=2)
+        median_bin = np.argmax(cum >= half, axis=2)
+
+        # Fold each histogram around its median bin to get the histogram of |x - median| in bins.
+        bin_idx = np.arange(self.n_bins)
+        distance = np.abs(bin_idx[None, None, :] - median_bin[..., None])
+        n_groups, n_cols = count.shape
+        base = (np.arange(n_groups)[:, None] * n_cols + np.arange(n_cols)[None, :])[..., None] * self.n_bins
+        folded = np.bincount((base + distance).ravel(), weights=hist.ravel(),
+                             minlength=hist.size).reshape(hist.shape)
+        mad_bin = np.argmax(np.cumsum(folded, axis=2) >= half, axis=2)
+
+        median = self.log_min + (median_bin + 0.5) * self.bin_width
+        # A MAD below the bin resolution is not meaningful, the floor keeps z scores finite for constant groups.
+        mad = np.maximum(mad_bin * self.bin_width, self.bin_width)
+        self._stats[scope] = (count, median, mad)
+        return self._stats[scope]
+
+    def check(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Scores a batch against the current statistics and returns a long report with one row per flagged value.
+        A value is an outlier when its robust z score (log scale) passes z_threshold in any scope with at least
+        min_count values, and a likely unit slip when it also sits within slip_tolerance (log10) of one of the
+        UNIT_SLIP_FACTORS away from the median, suspected_factor is then value / expected value (EX: 10000 for a
+        pct entered as ppm).
+        """
+        values = df[self.columns].to_numpy(dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logs = np.log10(values)
+        logs[~(values > 0)] = np.nan
+
+        best_z = np.full(values.shape, np.nan)
+        best_median = np.full(values.shape, np.nan)
+        best_scope = np.full(values.shape, "", dtype=object)
+
+        for scope in self.scopes:
+            codes = self._group_codes(scope, df, add=False)
+            count, median, mad = self.statistics(scope)
+            known = codes >= 0
+            safe = np.where(known, codes, 0)
+
+            if count.shape[0] == 0:
+                continue
+            enough = known[:, None] & (count[safe, :] >= self.min_count)
+            z = (logs - median[safe, :]) / (MAD_TO_SIGMA * mad[safe, :])
+            z[~enough] = np.nan
+
+            replace = np.isfinite(z) & (np.isnan(best_z) | (np.abs(z) > np.abs(best_z)))
+            best_z = np.where(replace, z, best_z)
+            best_median = np.where(replace, median[safe, :], best_median)
+            best_scope[replace] = scope
+
+        flagged = np.abs(best_z) > self.z_threshold
+        rows, cols = np.nonzero(flagged)
+
+        offset = logs[rows, cols] - best_median[rows, cols]
+        factors = np.array(UNIT_SLIP_FACTORS, dtype=np.float64)
+        nearest = factors[np.argmin(np.abs(offset[:, None] - factors[None, :]), axis=1)] if len(rows) else offset
+        is_slip = np.abs(offset - nearest) <= self.slip_tolerance
+
+        sample_ids = df["sample_id"].to_numpy() if "sample_id" in df else df.index.to_numpy()
+        return pd.DataFrame({
+            "sample_id": sample_ids[rows],
+            "column": np.array(self.columns, dtype=object)[cols],
+            "value": values[rows, cols],
+            "scope": best_scope[rows, cols],
+            "median": np.power(10.0, best_median[rows, cols]),
+            "robust_z": best_z[rows, cols],
+            "flag": np.where(is_slip, "unit_slip", "outlier"),
+            "suspected_factor": np.where(is_slip, np.power(10.0, nearest), np.nan),
+        })
+
+    def process(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Updates the statistics with a new batch and then checks that batch.
+        """
+        self.update(df)
+        return self.check(df)
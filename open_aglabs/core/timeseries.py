@@ -0,0 +1,212 @@
+from datetime import datetime
+from typing import Optional, List, Union
+
+import numpy as np
+import pandas as pd
+
+from open_aglabs.core.gis import geohash_encode
+
+
+def to_utc_datetime64(timestamps) -> np.ndarray:
+    """
+    Converts datetimes (naive or tz aware) into a naive UTC datetime64[ns] array.
+    """
+    if not isinstance(timestamps, np.ndarray):
+        timestamps = list(timestamps)
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True))
+    return index.tz_localize(None).values.astype("datetime64[ns]")
+
+
+def sample_location_key(sample, key_by: str = "location", geohash_precision: int = 9) -> str:
+    """
+    Gets the key a sample is stored under. key_by='location' uses the Location id and falls back to the geohash of
+    the latitude / longitude, key_by='geohash' always uses the geohash.
+    """
+    location = sample.location
+    if key_by == "location" and location is not None and location.id:
+        return location.id
+
+    if location is None or location.latitude is None or location.longitude is None:
+        raise ValueError(f"Sample {getattr(sample, 'sample_id', None)} has no location id or coordinates to key on")
+
+    return geohash_encode(location.latitude, location.longitude, precision=geohash_precision)
+
+
+class AnalysisTimeSeriesStore:
+    """
+    An indexed time series store for the analysis results of SoilSample and TissueSample records.
+
+    Rows are kept sorted by (location key, timestamp) with the analysis values packed into a single float32 matrix,
+    missing values are stored as NaN. Each location maps to one contiguous slice of the sorted arrays, so a query
+    is a dictionary lookup followed by a binary search on the timestamps.
+    """
+
+    def __init__(self, columns: List[str], key_by: str = "location", geohash_precision: int = 9):
+        if key_by not in ("location", "geohash"):
+            raise ValueError(f"key_by must be 'location' or 'geohash', got {key_by}")
+
+        self.columns = list(columns)
+        self.key_by = key_by
+        self.geohash_precision = geohash_precision
+
+        self._keys = np.array([], dtype=object)
+        self._timestamps = np.array([], dtype="datetime64[ns]")
+        self._values = np.empty((0, len(self.columns)), dtype=np.float32)
+        self._sample_ids = np.array([], dtype=object)
+        self._slices = {}
+        self._pending = []
+
+    @classmethod
+    def from_samples(cls, samples, key_by: str = "location", geohash_precision: int = 9):
+        """
+        Builds a store from a list of SoilSample / TissueSample models. The columns are taken from the analysis model
+        of the first sample, so soil and tissue samples need to go into separate stores.
+        """
+        samples = list(samples)
+        if len(samples) == 0:
+            raise ValueError("Can not infer the analysis columns from an empty list of samples")
+
+        columns = list(type(samples[0].analysis_results).model_fields)
+        store = cls(columns=columns, key_by=key_by, geohash_precision=geohash_precision)
+        store.add_samples(samples)
+        return store
+
+    def __len__(self):
+        self._flush()
+        return len(self._timestamps)
+
+    @property
+    def keys(self) -> List[str]:
+        self._flush()
+        return list(self._slices)
+
+    def add_samples(self, samples):
+        """
+        Queues samples to be added to the store. The sorted index is rebuilt once on the next read instead of on
+        every append.
+        """
+        samples = list(samples)
+        if len(samples) == 0:
+            return
+
+        expected = set(self.columns)
+        for sample in samples:
+            if set(type(sample.analysis_results).model_fields) != expected:
+                raise ValueError(f"Sample {sample.sample_id} has analysis results of type "
+                                 f"{type(sample.analysis_results).__name__} which do not match the store columns")
+
+        keys = np.array([sample_location_key(s, self.key_by, self.geohash_precision) for s in samples], dtype=object)
+        timestamps = to_utc_datetime64([s.timestamp for s in samples])
+        values = np.array([[getattr(s.analysis_results, c) for c in self.columns] for s in samples], dtype=np.float64)
+        sample_ids = np.array([s.sample_id for s in samples], dtype=object)
+
+        self.add_records(keys, timestamps, values.astype(np.float32), sample_ids)
+
+    def add_records(self, keys, timestamps, values, sample_ids=None):
+        """
+        Queues already columnar records (keys, timestamps and an (n, len(columns)) matrix of values).
+        """
+        keys = np.asarray(keys, dtype=object)
+        timestamps = to_utc_datetime64(timestamps)
+        values = np.asarray(values, dtype=np.float32).reshape(len(keys), len(self.columns))
+        if sample_ids is None:
+            sample_ids = np.full(len(keys), None, dtype=object)
+
+        self._pending.append((keys, timestamps, values, np.asarray(sample_ids, dtype=object)))
+
+    def _flush(self):
+        if len(self._pending) == 0:
+            return
+
+        keys = np.concatenate([self._keys] + [p[0] for p in self._pending])
+        timestamps = np.concatenate([self._timestamps] + [p[1] for p in self._pending])
+        values = np.concatenate([self._values] + [p[2] for p in self._pending])
+        sample_ids = np.concatenate([self._sample_ids] + [p[3] for p in self._pending])
+        self._pending = []
+
+        unique_keys, key_codes = np.unique(keys.astype(str), return_inverse=True)
+        order = np.lexsort((timestamps, key_codes))
+
+        self._keys = keys[order]
+        self._timestamps = timestamps[order]
+        self._values = np.ascontiguousarray(values[order])
+        self._sample_ids = sample_ids[order]
+
+        sorted_codes = key_codes[order]
+        starts = np.searchsorted(sorted_codes, np.arange(len(unique_keys)), side="left")
+        stops = np.searchsorted(sorted_codes, np.arange(len(unique_keys)), side="right")
+        self._slices = {str(k): (int(a), int(b)) for k, a, b in zip(unique_keys, starts, stops)}
+
+    def key_for(self, latitude: float, longitude: float) -> str:
+        """
+        Gets the geohash key for a coordinate using the precision of this store.
+        """
+        return geohash_encode(latitude, longitude, precision=self.geohash_precision)
+
+    def query(self,
+              key: str,
+              start: Optional[Union[datetime, str]] = None,
+              end: Optional[Union[datetime, str]] = None,
+              columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the records of one location between start (inclusive) and end (exclusive) as a DataFrame indexed by
+        the UTC timestamp.
+        """
+        self._flush()
+        columns = self.columns if columns is None else list(columns)
+        unknown = [c for c in columns if c not in self.columns]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown columns {unknown}, the store has {self.columns}")
+
+        a, b = self._slices.get(key, (0, 0))
+        times = self._timestamps[a:b]
+        lo = a if start is None else a + int(np.searchsorted(times, to_utc_datetime64([start])[0], side="left"))
+        hi = b if end is None else a + int(np.searchsorted(times, to_utc_datetime64([end])[0], side="left"))
+
+        col_idx = [self.columns.index(c) for c in columns]
+        df = pd.DataFrame(self._values[lo:hi][:, col_idx], columns=columns,
+                          index=pd.DatetimeIndex(self._timestamps[lo:hi], name="timestamp"))
+        df.insert(0, "sample_id", self._sample_ids[lo:hi])
+        return df
+
+    def resample(self,
+                 key: str,
+                 rule: str,
+                 how: str = "mean",
+                 start: Optional[Union[datetime, str]] = None,
+                 end: Optional[Union[datetime, str]] = None,
+                 columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Resamples the records of one location to a regular frequency, EX: rule='YS' for one row per year.
+        """
+        df = self.query(key, start=start, end=end, columns=columns).drop(columns="sample_id")
+        return getattr(df.resample(rule), how)()
+
+    def save(self, path: str):
+        """
+        Saves the store to a single .npz file.
+        """
+        self._flush()
+        np.savez(path,
+                 columns=np.array(self.columns),
+                 key_by=np.array(self.key_by),
+                 geohash_precision=np.array(self.geohash_precision),
+                 keys=self._keys.astype(str),
+                 timestamps=self._timestamps,
+                 values=self._values,
+                 sample_ids=np.array(["" if s is None else s for s in self._sample_ids]))
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Loads a store saved with save().
+        """
+        with np.load(path, allow_pickle=False) as data:
+            store = cls(columns=data["columns"].tolist(),
+                        key_by=str(data["key_by"]),
+                        geohash_precision=int(data["geohash_precision"]))
+            sample_ids = data["sample_ids"].astype(object)
+            sample_ids[sample_ids == ""] = None
+            store.add_records(data["keys"].astype(object), data["timestamps"], data["values"], sample_ids)
+        store._flush()
+        return store
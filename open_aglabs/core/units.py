@@ -0,0 +1,185 @@
+from typing import Optional, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+KG_PER_LB = 0.45359237
+KG_PER_OZ = 0.028349523125
+L_PER_GAL = 3.785411784
+L_PER_BU = 35.23907016688
+HA_PER_AC = 0.40468564224
+HA_PER_M2 = 1e-4
+HA_PER_FT2 = 0.09290304 * HA_PER_M2
+
+MASS = "mass"
+VOLUME = "volume"
+AREA = "area"
+MASS_PER_AREA = "mass_per_area"
+VOLUME_PER_AREA = "volume_per_area"
+CONCENTRATION = "concentration"
+
+# Each unit maps to (dimension, factor to the base unit of that dimension).
+# Base units: kg, l, ha, kg/ha, l/ha and ppm. Densities are always in kg/l.
+UNIT_DEFINITIONS: Dict[str, Tuple[str, float]] = {
+    "kg": (MASS, 1.0),
+    "g": (MASS, 1e-3),
+    "t": (MASS, 1000.0),
+    "lbs": (MASS, KG_PER_LB),
+    "oz": (MASS, KG_PER_OZ),
+    "l": (VOLUME, 1.0),
+    "ml": (VOLUME, 1e-3),
+    "gal": (VOLUME, L_PER_GAL),
+    "bu": (VOLUME, L_PER_BU),
+    "ha": (AREA, 1.0),
+    "ac": (AREA, HA_PER_AC),
+    "m2": (AREA, HA_PER_M2),
+    "ft2": (AREA, HA_PER_FT2),
+    "kg/ha": (MASS_PER_AREA, 1.0),
+    "t/ha": (MASS_PER_AREA, 1000.0),
+    "lbs/ac": (MASS_PER_AREA, KG_PER_LB / HA_PER_AC),
+    "g/m2": (MASS_PER_AREA, 1e-3 / HA_PER_M2),
+    "oz/ft2": (MASS_PER_AREA, KG_PER_OZ / HA_PER_FT2),
+    "l/ha": (VOLUME_PER_AREA, 1.0),
+    "ml/m2": (VOLUME_PER_AREA, 1e-3 / HA_PER_M2),
+    "gal/ac": (VOLUME_PER_AREA, L_PER_GAL / HA_PER_AC),
+    "bu/ac": (VOLUME_PER_AREA, L_PER_BU / HA_PER_AC),
+    "ppm": (CONCENTRATION, 1.0),
+    "mg/kg": (CONCENTRATION, 1.0),
+    "g/kg": (CONCENTRATION, 1000.0),
+    "pct": (CONCENTRATION, 10000.0),
+}
+
+UNIT_ALIASES = {
+    "lb": "lbs",
+    "tonne": "t",
+    "acre": "ac",
+    "acres": "ac",
+    "hectare": "ha",
+    "hectares": "ha",
+    "%": "pct",
+    "percent": "pct",
+    "lb/ac": "lbs/ac",
+    "lbs/acre": "lbs/ac",
+    "lb/acre": "lbs/ac",
+    "gal/acre": "gal/ac",
+    "bu/acre": "bu/ac",
+}
+
+# Pairs of dimensions that can be converted between when a density (kg/l) is known.
+DENSITY_DIMENSIONS = {
+    (VOLUME, MASS): 1,
+    (MASS, VOLUME): -1,
+    (VOLUME_PER_AREA, MASS_PER_AREA): 1,
+    (MASS_PER_AREA, VOLUME_PER_AREA): -1,
+}
+
+
+def normalize_unit(unit: str) -> str:
+    """
+    Maps the unit spellings used across the models (EX: 'Kg', 'L/ha', 'bu/acre') onto the UNIT_DEFINITIONS keys.
+    """
+    key = str(unit).strip().lower().replace(" ", "")
+    key = UNIT_ALIASES.get(key, key)
+    if key not in UNIT_DEFINITIONS:
+        raise ValueError(f"Unknown unit {unit}, the known units are {list(UNIT_DEFINITIONS)}")
+    return key
+
+
+class UnitConverter:
+    """
+    Converts values between units with precomputed conversion factor matrices.
+
+    factors[i, j] is the multiplier that takes unit i to unit j (NaN when the dimensions differ) and
+    density_power[i, j] is the power of the density (kg/l) that also has to be applied, 1 for volume to mass,
+    -1 for mass to volume and 0 otherwise. A whole column of values is converted with a single multiply.
+    """
+
+    def __init__(self, definitions: Optional[Dict[str, Tuple[str, float]]] = None):
+        definitions = UNIT_DEFINITIONS if definitions is None else definitions
+        self.units = list(definitions)
+        self.unit_index = {u: i for i, u in enumerate(self.units)}
+        self.dimensions = np.array([definitions[u][0] for u in self.units])
+
+        to_base = np.array([definitions[u][1] for u in self.units], dtype=np.float64)
+        ratio = to_base[:, None] / to_base[None, :]
+
+        same = self.dimensions[:, None] == self.dimensions[None, :]
+        self.density_power = np.zeros(ratio.shape, dtype=np.float64)
+        self.density_power[~same] = np.nan
+        for (from_dim, to_dim), power in DENSITY_DIMENSIONS.items():
+            mask = (self.dimensions[:, None] == from_dim) & (self.dimensions[None, :] == to_dim)
+            self.density_power[mask] = power
+
+        self.factors = np.where(np.isnan(self.density_power), np.nan, ratio)
+
+    def index(self, unit: str) -> int:
+        return self.unit_index[normalize_unit(unit)]
+
+    def _codes(self, units) -> np.ndarray:
+        if isinstance(units, str):
+            return np.array(self.index(units))
+
+        unique, inverse = np.unique(np.asarray(units, dtype=str), return_inverse=True)
+        lookup = np.array([self.index(u) for u in unique], dtype=np.intp)
+        return lookup[inverse]
+
+    def factor(self, from_units, to_unit: str, density=None):
+        """
+        Gets the conversion multiplier(s). from_units can be a single unit or a column of units and density can be a
+        scalar or a column (kg/l), it is only needed for volume <-> mass conversions.
+        """
+        rows = self._codes(from_units)
+        col = self.index(to_unit)
+
+        factors = self.factors[rows, col]
+        power = self.density_power[rows, col]
+        if np.any(np.isnan(factors)):
+            bad = np.atleast_1d(np.asarray(from_units, dtype=str))[np.atleast_1d(np.isnan(factors))]
+            raise ValueError(f"Can not convert {sorted(set(bad.tolist()))} to {to_unit}")
+
+        if np.any(power != 0):
+            if density is None:
+                raise ValueError(f"A density (kg/l) is needed to convert between volume and mass units to {to_unit}")
+            density = np.asarray(density, dtype=np.float64)
+            factors = factors * np.power(density, power)
+
+        return factors
+
+    def convert(self, values, from_units, to_unit: str, density=None):
+        """
+        Converts a scalar, numpy array or pandas Series of values. The result keeps the type (and index) of values.
+        """
+        factors = self.factor(from_units, to_unit, density=density)
+        if isinstance(values, pd.Series):
+            return values * np.broadcast_to(factors, values.shape)
+
+        result = np.asarray(values, dtype=np.float64) * factors
+        if np.ndim(result) == 0:
+            return float(result)
+        return result
+
+    def convert_frame(self, df: pd.DataFrame, value_col: str, unit_col: str, to_unit: str,
+                      density_col: Optional[str] = None) -> pd.Series:
+        """
+        Converts a DataFrame column whose unit is stored row by row in another column.
+        """
+        density = None if density_col is None else df[density_col].to_numpy(dtype=np.float64)
+        factors = self.factor(df[unit_col].to_numpy(), to_unit, density=density)
+        return df[value_col] * factors
+
+
+UNITS = UnitConverter()
+
+
+def bushel_density(test_weight, test_weight_units: str = "lbs"):
+    """
+    Converts a test weight (the mass of one bushel, EX: 56 lbs of corn) into a density in kg/l.
+    """
+    return UNITS.convert(test_weight, test_weight_units, "kg") / L_PER_BU
+
+
+def convert(values, from_units, to_unit: str, density=None):
+    """
+    Converts values with the module level UnitConverter.
+    """
+    return UNITS.convert(values, from_units, to_unit, density=density)
@@ -0,0 +1,268 @@
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+
+from open_aglabs.applicator.models import ApplicationEvent
+from open_aglabs.core.points import content_hash
+from open_aglabs.field_management.models import FieldManagement, TillageEvent
+from open_aglabs.harvest.models import HarvestEvent
+from open_aglabs.planting.models import PlantingEvent
+from open_aglabs.soil.models import SoilAggregate
+from open_aglabs.tissue.models import TissueAggregate
+
+# activity_keys activity -> (FieldManagement event list, event model)
+ACTIVITY_EVENTS = {
+    "planting": ("planting_events", PlantingEvent),
+    "application": ("application_events", ApplicationEvent),
+    "tillage": ("tillage_events", TillageEvent),
+    "harvest": ("harvest_events", HarvestEvent),
+    "soil": ("soil_events", SoilAggregate),
+    "tissue": ("tissue_events", TissueAggregate),
+}
+
+EventParser = Callable[[Path, type], List[BaseModel]]
+
+
+def event_key(event: BaseModel) -> Optional[str]:
+    """
+    The id of an event, the soil and tissue aggregates call it event_id (and may leave it empty).
+    """
+    return event.id if hasattr(event, "id") else event.event_id
+
+
+def read_event_file(path: Union[str, Path], model: type) -> List[BaseModel]:
+    """
+    The events of a JSON (one event or a list of events) or JSON lines (.jsonl) file, validated as model.
+    """
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = json.load(f)
+            records = data if isinstance(data, list) else [data]
+    return TypeAdapter(List[model]).validate_python(records)
+
+
+class SourceFile(BaseModel):
+    """
+    What a FieldManagementBuilder knows of a source file from its last build.
+    """
+    activity: str = Field(
+        ...,
+        description="The activity_keys activity the file was listed under, EX: 'planting'."
+    )
+    sha256: str = Field(
+        ...,
+        description="The content hash of the file (see core.points.content_hash)."
+    )
+    mtime_ns: int = Field(
+        ...,
+        description="The modification time of the file in ns."
+    )
+    size: int = Field(
+        ...,
+        description="The size of the file in bytes."
+    )
+    events: int = Field(
+        0,
+        description="The number of events parsed from the file, they follow the events of the files listed before "
+                    "it in the event list of its activity."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+
+class BuildManifest(BaseModel):
+    """
+    The source files that went into the persisted FieldManagement of a field, by path.
+    """
+    field_id: str = Field(
+        ...,
+        description="The field the manifest belongs to."
+    )
+    sources: Dict[str, SourceFile] = Field(
+        default_factory=dict,
+        description="Every source file of the field by its path."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+
+class BuildReport(BaseModel):
+    """
+    What an incremental build of one field did.
+    """
+    field_id: str = Field(
+        ...,
+        description="The field that was built."
+    )
+    parsed: List[str] = Field(
+        default_factory=list,
+        description="The new or changed source files that were parsed."
+    )
+    unchanged: List[str] = Field(
+        default_factory=list,
+        description="The source files that were skipped, their size and mtime or content hash did not change."
+    )
+    removed: List[str] = Field(
+        default_factory=list,
+        description="The source files no longer listed in activity_keys, their events were dropped."
+    )
+    events_added: int = Field(
+        0,
+        description="The number of events parsed from the new or changed files."
+    )
+    events_removed: int = Field(
+        0,
+        description="The number of events dropped with changed or removed files."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class FieldManagementBuilder:
+    """
+    Builds FieldManagement histories from their activity_keys source files incrementally.
+
+    Every field is persisted in state_dir as <field_id>.json next to a <field_id>.manifest.json recording the
+    size, mtime, content hash and event count of every source file. A rebuild stats each listed file: a file with
+    the size and mtime of the manifest is skipped without being read, a touched file is hashed and only parsed
+    when its content changed. The events of every activity are kept grouped by source file in the order the files
+    are listed, so the events of changed and unlisted files are replaced in (or dropped from) the persisted history
+    by their position, whatever their ids, and every other event is kept as it was. A nightly rebuild only parses
+    what changed.
+
+    parsers maps an activity to a function (path, event model) -> events, read_event_file by default. Relative
+    source paths are resolved against base_dir.
+    """
+
+    def __init__(self,
+                 state_dir: Union[str, Path],
+                 parsers: Optional[Dict[str, EventParser]] = None,
+                 base_dir: Optional[Union[str, Path]] = None):
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.parsers = parsers or {}
+        self.base_dir = None if base_dir is None else Path(base_dir)
+
+    def _paths(self, field_id: str) -> Tuple[Path, Path]:
+        return self.state_dir / f"{field_id}.json", self.state_dir / f"{field_id}.manifest.json"
+
+    def load(self, field_id: str) -> Tuple[Optional[FieldManagement], BuildManifest]:
+        """
+        The persisted FieldManagement (None before the first build) and manifest of a field.
+        """
+        field_path, manifest_path = self._paths(field_id)
+        field = FieldManagement.model_validate_json(field_path.read_text()) if field_path.exists() else None
+        if manifest_path.exists():
+            manifest = BuildManifest.model_validate_json(manifest_path.read_text())
+        else:
+            manifest = BuildManifest(field_id=field_id)
+        return field, manifest
+
+    def _resolve(self, path: str) -> Path:
+        path = Path(path)
+        return path if self.base_dir is None or path.is_absolute() else self.base_dir / path
+
+    def build(self,
+              field_id: str,
+              activity_keys: Dict[str, List[str]],
+              seasons: Optional[List[str]] = None) -> Tuple[FieldManagement, BuildReport]:
+        """
+        Brings the persisted history of a field up to date with its activity_keys and persists it. seasons
+        replaces the persisted seasons when given. Returns the merged FieldManagement and what was done.
+        """
+        unknown = [a for a in activity_keys if a not in ACTIVITY_EVENTS]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown activities {unknown}, the known activities are {list(ACTIVITY_EVENTS)}")
+
+        field, manifest = self.load(field_id)
+        if field is None:
+            manifest = BuildManifest(field_id=field_id)
+        report = BuildReport(field_id=field_id)
+        listed = {path: activity for activity, paths in activity_keys.items() for path in paths}
+
+        # the persisted events of every source file, sliced from the event lists in manifest order
+        data = {"field_id": field_id, "seasons": [], "activity_keys": None}
+        if field is not None:
+            data = {name: getattr(field, name) for name in FieldManagement.model_fields}
+        previous_events: Dict[str, List[BaseModel]] = {}
+        offsets = dict.fromkeys(ACTIVITY_EVENTS, 0)
+        for path, previous in manifest.sources.items():
+            start = offsets[previous.activity]
+            offsets[previous.activity] += previous.events
+            previous_events[path] = data.get(ACTIVITY_EVENTS[previous.activity][0], [])[start:start + previous.events]
+
+        events_by_path: Dict[str, List[BaseModel]] = {}
+        sources: Dict[str, SourceFile] = {}
+        for path, activity in listed.items():
+            file = self._resolve(path)
+            stat = file.stat()
+            previous = manifest.sources.get(path)
+            if previous is not None and previous.activity == activity and previous.size == stat.st_size and \
+                    previous.mtime_ns == stat.st_mtime_ns:
+                sources[path] = previous
+                events_by_path[path] = previous_events[path]
+                report.unchanged.append(path)
+                continue
+
+            sha256 = content_hash(file)
+            if previous is not None and previous.activity == activity and previous.sha256 == sha256:
+                sources[path] = previous.model_copy(update={"mtime_ns": stat.st_mtime_ns, "size": stat.st_size})
+                events_by_path[path] = previous_events[path]
+                report.unchanged.append(path)
+                continue
+
+            list_name, model = ACTIVITY_EVENTS[activity]
+            events = self.parsers.get(activity, read_event_file)(file, model)
+            events_by_path[path] = events
+            sources[path] = SourceFile(activity=activity, sha256=sha256, mtime_ns=stat.st_mtime_ns,
+                                       size=stat.st_size, events=len(events))
+            report.parsed.append(path)
+            report.events_added += len(events)
+            if previous is not None:
+                report.events_removed += len(previous_events[path])
+
+        for path, previous in manifest.sources.items():
+            if path not in listed:
+                report.events_removed += len(previous_events[path])
+                report.removed.append(path)
+
+        activity_keys = {activity: list(paths) for activity, paths in activity_keys.items()}
+        changed = len(report.parsed) > 0 or len(report.removed) > 0 or field is None or \
+            data["activity_keys"] != activity_keys or (seasons is not None and data["seasons"] != seasons)
+        data["seasons"] = data["seasons"] if seasons is None else list(seasons)
+        data["activity_keys"] = activity_keys
+        for activity, (list_name, _) in ACTIVITY_EVENTS.items():
+            data[list_name] = [e for path, events in events_by_path.items() if listed[path] == activity
+                               for e in events]
+        field = FieldManagement.model_construct(**data)
+
+        field_path, manifest_path = self._paths(field_id)
+        if changed:
+            _write_atomic(field_path, field.model_dump_json(by_alias=True))
+        _write_atomic(manifest_path, BuildManifest(field_id=field_id, sources=sources).model_dump_json())
+        return field, report
+
+    def build_many(self, fields: Iterable[FieldManagement]) -> List[BuildReport]:
+        """
+        Builds every field from the field_id, seasons and activity_keys of a FieldManagement (EX: a nightly list
+        of fields whose events are still empty).
+        """
+        return [self.build(f.field_id, f.activity_keys or {}, seasons=f.seasons)[1] for f in fields]
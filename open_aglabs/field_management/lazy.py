@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from pydantic import BaseModel, TypeAdapter
+
+from open_aglabs.field_management.ingest import ACTIVITY_EVENTS, read_event_file
+from open_aglabs.field_management.models import FieldManagement
+
+# FieldManagement event list -> event model
+EVENT_LISTS = {list_name: model for list_name, model in ACTIVITY_EVENTS.values()}
+
+_ADAPTERS = {list_name: TypeAdapter(List[model]) for list_name, model in EVENT_LISTS.items()}
+
+_HEADER = {"field_id": "fieldId", "seasons": "seasons", "activity_keys": "activityKeys"}
+
+
+class LazyFieldManagement:
+    """
+    A FieldManagement whose event lists are only validated when they are first used.
+
+    The field_id, seasons and activity_keys are available at once, every event list is kept as its raw JSON records
+    or as the source files it comes from and is validated into its event models on first access, then cached.
+    Reading the seasons or the harvest_events of many fields never pays for their planting or soil events. The
+    lazy field reads like a FieldManagement (EX: it can be passed to nutrient_budget), materialize() returns the
+    real one.
+    """
+
+    def __init__(self,
+                 field_id: str,
+                 seasons: List[str],
+                 activity_keys: Optional[Dict[str, list]] = None,
+                 raw_events: Optional[Dict[str, list]] = None,
+                 event_files: Optional[Dict[str, List[Union[str, Path]]]] = None):
+        unknown = [name for name in {**(raw_events or {}), **(event_files or {})} if name not in EVENT_LISTS]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown event lists {unknown}, the known lists are {list(EVENT_LISTS)}")
+        self.field_id = TypeAdapter(str).validate_python(field_id)
+        self.seasons = TypeAdapter(List[str]).validate_python(seasons)
+        self.activity_keys = activity_keys
+        self._raw = dict(raw_events or {})
+        self._files = {name: [Path(p) for p in paths] for name, paths in (event_files or {}).items()}
+        self._events: Dict[str, List[BaseModel]] = {}
+
+    @classmethod
+    def from_json(cls, data: Union[str, bytes]) -> "LazyFieldManagement":
+        """
+        A lazy field from the JSON of a FieldManagement (by alias or by name, EX: a file persisted by the
+        FieldManagementBuilder). The document is parsed once, the events stay raw records until used.
+        """
+        document = json.loads(data)
+        header = {name: document.get(alias, document.get(name)) for name, alias in _HEADER.items()}
+        if header["field_id"] is None or header["seasons"] is None:
+            raise ValueError("A FieldManagement needs a fieldId and seasons")
+        raw_events = {name: document[name] for name in EVENT_LISTS if document.get(name)}
+        return cls(header["field_id"], header["seasons"], header["activity_keys"], raw_events=raw_events)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "LazyFieldManagement":
+        return cls.from_json(Path(path).read_bytes())
+
+    @classmethod
+    def from_sources(cls,
+                     field_id: str,
+                     seasons: List[str],
+                     activity_keys: Dict[str, List[str]],
+                     base_dir: Optional[Union[str, Path]] = None) -> "LazyFieldManagement":
+        """
+        A lazy field over its activity_keys source files (see read_event_file), every file of an activity is only
+        read when its event list is first used. Relative paths are resolved against base_dir.
+        """
+        event_files = {}
+        for activity, paths in activity_keys.items():
+            if activity not in ACTIVITY_EVENTS:
+                raise ValueError(f"Unknown activity {activity}, the known activities are {list(ACTIVITY_EVENTS)}")
+            files = [Path(p) if base_dir is None or Path(p).is_absolute() else Path(base_dir) / p for p in paths]
+            event_files[ACTIVITY_EVENTS[activity][0]] = files
+        return cls(field_id, seasons, activity_keys, event_files=event_files)
+
+    def _load(self, name: str) -> List[BaseModel]:
+        events = self._events.get(name)
+        if events is None:
+            # the raw records and files are only dropped once all of them validated, a failure can be retried
+            events = _ADAPTERS[name].validate_python(self._raw.get(name, []))
+            for path in self._files.get(name, []):
+                events += read_event_file(path, EVENT_LISTS[name])
+            self._raw.pop(name, None)
+            self._files.pop(name, None)
+            self._events[name] = events
+        return events
+
+    def __getattr__(self, name: str):
+        if name in EVENT_LISTS:
+            return self._load(name)
+        raise AttributeError(f"{type(self).__name__} has no attribute {name}")
+
+    def is_loaded(self, name: str) -> bool:
+        """
+        Whether an event list (EX: 'harvest_events') was already validated.
+        """
+        if name not in EVENT_LISTS:
+            raise ValueError(f"Unknown event list {name}, the known lists are {list(EVENT_LISTS)}")
+        return name in self._events
+
+    def event_count(self, name: str) -> Optional[int]:
+        """
+        The number of events of a list without validating them, None when they are still unread source files.
+        """
+        if name in self._events:
+            return len(self._events[name])
+        if name in self._files:
+            return None
+        return len(self._raw.get(name, []))
+
+    def materialize(self) -> FieldManagement:
+        """
+        Validates every event list that was not used yet and returns the full FieldManagement.
+        """
+        return FieldManagement.model_construct(field_id=self.field_id, seasons=self.seasons,
+                                               activity_keys=self.activity_keys,
+                                               **{name: self._load(name) for name in EVENT_LISTS})
@@ -0,0 +1,251 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from open_aglabs.core.constants import CROP_NUTRIENT_REMOVAL
+from open_aglabs.core.units import UNITS, UNIT_DEFINITIONS, MASS_PER_AREA, VOLUME_PER_AREA, normalize_unit
+from open_aglabs.field_management.models import FieldManagement
+from open_aglabs.harvest.standardize import standardize_harvest_events
+from open_aglabs.products.models import Product
+from open_aglabs.tank_mix.models import TankMix
+
+NUTRIENTS = ("n", "p", "k")
+
+# NutrientComposition fields of N, P (as P2O5) and K (as K2O), in % of the product mass.
+NUTRIENT_FIELDS = ("nitrogen", "phosphorous", "potassium")
+
+BUDGET_COLUMNS = ["field_id", "season", "crop"] + [f"{n}_applied" for n in NUTRIENTS] + \
+    [f"{n}_removed" for n in NUTRIENTS] + [f"{n}_balance" for n in NUTRIENTS] + ["unresolved_applications"]
+
+
+# The month a season of every TIME_OF_YEAR_LIST time of year starts in, the named seasons in their northern hemisphere
+# months and the rains in their East African ones. 'unknown' seasons start with the first planting of their crop.
+SEASON_START_MONTH = {**{str(m): m for m in range(1, 13)}, "winter": 1, "spring": 3, "summer": 6, "fall": 9,
+                      "long_rains": 3, "short_rains": 10}
+
+# A season ends when the next season of its field starts, or this many months after its own start.
+MAX_SEASON_MONTHS = 12
+
+
+def _season_frame(fields) -> pd.DataFrame:
+    rows = {"field_id": [], "season": [], "year": [], "crop": [], "time_of_year": []}
+    for field in fields:
+        for season in dict.fromkeys(field.seasons):
+            parts = season.split(":")
+            rows["field_id"].append(field.field_id)
+            rows["season"].append(season)
+            rows["year"].append(int(parts[0]) if parts[0].isdigit() else -1)
+            rows["crop"].append(parts[2].lower() if len(parts) > 2 else None)
+            rows["time_of_year"].append(parts[3].lower() if len(parts) > 3 else "unknown")
+    return pd.DataFrame(rows).astype({"field_id": str, "year": np.int64, "crop": object, "time_of_year": str})
+
+
+def _season_windows(seasons: pd.DataFrame, plantings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the month every season starts in (start, in months since year 0) and the month it covers events from
+    (begin). A season runs until the next season of its field starts, across years, so a fall sown crop keeps the
+    events of the next summer. The first season of a field covers its year from January. Seasons of the same field
+    and year with the same or no start month can not be told apart and raise.
+    """
+    windows = seasons[seasons["year"] >= 0].copy()
+    first = plantings.groupby(["field_id", "year", "crop"], as_index=False)["month"].min()
+    planted = windows.merge(first, on=["field_id", "year", "crop"], how="left")["month"].to_numpy()
+    windows["start"] = windows["time_of_year"].map(SEASON_START_MONTH).fillna(pd.Series(planted, index=windows.index))
+
+    shared = windows.duplicated(["field_id", "year"], keep=False)
+    ambiguous = shared & (windows["start"].isna() | windows.duplicated(["field_id", "year", "start"], keep=False))
+    if ambiguous.any():
+        raise ValueError(f"The seasons {windows.loc[ambiguous, 'season'].tolist()} share their field and year "
+                         f"without a distinct start, give them a time of year or a planting")
+
+    # the only season of a year without a start month starts with it
+    windows["start"] = windows["year"] * 12 + windows["start"].fillna(1).astype(np.int64) - 1
+    windows = windows.sort_values(["field_id", "start"], kind="stable")
+    windows["begin"] = windows["start"].where(windows.duplicated("field_id"), windows["year"] * 12)
+    return windows
+
+
+def _locate_seasons(events: pd.DataFrame, windows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the season of every event (with its year and month) and the crop of that season: the last season of its
+    field that began in or before the month of the event and started less than MAX_SEASON_MONTHS before it, or the
+    year itself.
+    """
+    events = events.astype({"field_id": str, "year": np.int64, "month": np.int64}).reset_index(drop=True)
+    events["order"] = np.arange(len(events))
+    events["period"] = events["year"] * 12 + events["month"] - 1
+    right = windows[["field_id", "begin", "start", "season", "crop"]].rename(columns={"crop": "season_crop"})
+    located = pd.merge_asof(events.sort_values("period", kind="stable"), right.sort_values("begin", kind="stable"),
+                            left_on="period", right_on="begin", by="field_id", direction="backward")
+    ended = located["period"] - located["start"] >= MAX_SEASON_MONTHS
+    located.loc[ended, ["season", "season_crop"]] = None
+    located = located.sort_values("order").drop(columns=["order", "period", "begin", "start"]).reset_index(drop=True)
+    missing = located["season"].isna()
+    located.loc[missing, "season"] = located.loc[missing, "year"].astype(str)
+    return located
+
+
+def _planted_crops(plantings: pd.DataFrame, windows: pd.DataFrame) -> pd.DataFrame:
+    """
+    The crop of the first planting of every season (or year without a season) of every field.
+    """
+    located = _locate_seasons(plantings.sort_values(["year", "month"], kind="stable"), windows)
+    return located.drop_duplicates(["field_id", "season"])[["field_id", "season", "crop"]].rename(
+        columns={"crop": "planted_crop"})
+
+
+def _assign_seasons(events: pd.DataFrame, windows: pd.DataFrame, planted: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the season and crop of every event (see _locate_seasons). Seasons without a crop take the crop of their
+    first planting.
+    """
+    events = _locate_seasons(events, windows).merge(planted, on=["field_id", "season"], how="left")
+    events["crop"] = events["season_crop"].where(events["season_crop"].notna(), events["planted_crop"]).fillna(
+        "unknown")
+    return events.drop(columns=["season_crop", "planted_crop"])
+
+
+def _product_nutrients(products: Iterable[Product]) -> Dict[str, Tuple[float, float, float]]:
+    lookup = {}
+    for product in products:
+        values = tuple(getattr(product.nutrients, name) for name in NUTRIENT_FIELDS)
+        lookup.setdefault(product.name, values)
+        lookup[product.product_id] = values
+    return lookup
+
+
+def _mix_nutrients(mixes: Iterable[TankMix], nutrients: Dict[str, Tuple[float, float, float]]) -> pd.DataFrame:
+    """
+    The N, P2O5 and K2O share (kg per kg of mix) of every tank mix, from the ratio of its products. Mixes are keyed
+    by id and name, a product with no known nutrient composition adds nothing.
+    """
+    rows = []
+    for mix in mixes:
+        share = np.zeros(3)
+        for product in mix.mix_content:
+            composition = nutrients.get(product.product_id, nutrients.get(product.product_name))
+            if composition is not None and product.ratio is not None:
+                share += np.array(composition) * product.ratio / 100.0 / 100.0
+        for key in dict.fromkeys([mix.id, mix.name]):
+            rows.append((key, *share))
+    # a product applied on its own is a mix of one
+    for key, composition in nutrients.items():
+        rows.append((key, *(np.array(composition) / 100.0)))
+    return pd.DataFrame(rows, columns=["mix", "n_share", "p_share", "k_share"]).drop_duplicates("mix")
+
+
+def nutrient_budget(fields: Iterable[FieldManagement],
+                    mixes: Iterable[TankMix] = (),
+                    products: Iterable[Product] = (),
+                    removal: Optional[Dict[str, Tuple[float, float, float]]] = None,
+                    densities: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    The N, P2O5 and K2O balance of every field and season in kg/ha: what the applications brought minus what the
+    harvests took away.
+
+    An application brings its rate times the nutrient share of its mix (by mix_id, then mix_name), which is the
+    ratio of every product of the TankMix times its NutrientComposition, or the composition of a Product applied
+    on its own. Volume rates need the density (kg/l) of the mix in densities (by mix id or name). Applications that
+    can not be resolved add nothing and are counted in unresolved_applications. A harvest removes its standardized
+    yield (kg/ha) times the removal coefficients of the crop, CROP_NUTRIENT_REMOVAL by default; crops without
+    coefficients give NaN removals and balances, seasons without harvests remove nothing.
+
+    Events go to the season of their field whose time of year started last before them (see SEASON_START_MONTH,
+    EX: a June application of a field with '2025:ke:maize:long_rains' and '2025:ke:maize:short_rains' goes to the
+    long rains, and the July 2026 harvest of a field with '2025:us:wheat:fall' to the wheat), or to their year when
+    no season of the field started less than MAX_SEASON_MONTHS before them.
+    All the events of all the fields are flattened into columns once, everything after that is merges and grouped
+    sums.
+    """
+    fields = list(fields)
+    removal = CROP_NUTRIENT_REMOVAL if removal is None else removal
+
+    plantings = {"field_id": [], "year": [], "month": [], "crop": []}
+    applications = {"field_id": [], "year": [], "month": [], "mix_id": [], "mix_name": [], "rate": [],
+                    "rate_unit": []}
+    harvest_fields, harvest_years, harvest_months, harvests = [], [], [], []
+    for field in fields:
+        for event in field.planting_events:
+            plantings["field_id"].append(field.field_id)
+            plantings["year"].append(event.timestamp.year)
+            plantings["month"].append(event.timestamp.month)
+            plantings["crop"].append(event.crop_type.lower())
+        for event in field.application_events:
+            applications["field_id"].append(field.field_id)
+            applications["year"].append(event.timestamp.year)
+            applications["month"].append(event.timestamp.month)
+            applications["mix_id"].append(event.mix_id)
+            applications["mix_name"].append(event.mix_name)
+            applications["rate"].append(event.rate)
+            applications["rate_unit"].append(event.rate_unit)
+        for event in field.harvest_events:
+            harvest_fields.append(field.field_id)
+            harvest_years.append(event.timestamp.year)
+            harvest_months.append(event.timestamp.month)
+            harvests.append(event)
+    plantings = pd.DataFrame(plantings).astype({"field_id": str, "year": np.int64, "month": np.int64, "crop": str})
+    seasons = _season_frame(fields)
+    windows = _season_windows(seasons, plantings)
+    planted = _planted_crops(plantings, windows)
+
+    # inputs
+    applied = _assign_seasons(pd.DataFrame(applications), windows, planted)
+    shares = _mix_nutrients(mixes, _product_nutrients(products)).set_index("mix")
+    by_id = shares.reindex(applied["mix_id"].to_numpy()).to_numpy(dtype=np.float64)
+    by_name = shares.reindex(applied["mix_name"].to_numpy()).to_numpy(dtype=np.float64)
+    share = np.where(np.isnan(by_id), by_name, by_id)
+
+    rate_kg_ha = np.full(len(applied), np.nan)
+    if len(applied) > 0:
+        units = applied["rate_unit"].map(normalize_unit).to_numpy()
+        dimension = np.array([UNIT_DEFINITIONS.get(u, (None,))[0] for u in units], dtype=object)
+        mass = dimension == MASS_PER_AREA
+        if np.any(mass):
+            rate_kg_ha[mass] = UNITS.convert(applied["rate"].to_numpy()[mass], units[mass], "kg/ha")
+        volume = dimension == VOLUME_PER_AREA
+        if np.any(volume):
+            density = applied.loc[volume, "mix_id"].map(densities or {})
+            density = density.fillna(applied.loc[volume, "mix_name"].map(densities or {})).to_numpy(dtype=np.float64)
+            known = np.isfinite(density)
+            volume = np.flatnonzero(volume)[known]
+            rate_kg_ha[volume] = UNITS.convert(applied["rate"].to_numpy()[volume], units[volume], "kg/ha",
+                                               density=density[known])
+
+    nutrient = share * rate_kg_ha[:, None]
+    resolved = np.isfinite(nutrient).all(axis=1)
+    for i, name in enumerate(NUTRIENTS):
+        applied[f"{name}_applied"] = np.where(resolved, nutrient[:, i], 0.0)
+    applied["unresolved_applications"] = (~resolved).astype(np.int64)
+
+    # removals
+    removed = _assign_seasons(pd.DataFrame({"field_id": harvest_fields, "year": harvest_years,
+                                            "month": harvest_months}), windows, planted)
+    if len(harvests) > 0:
+        yield_kg_ha = standardize_harvest_events(harvests, crop=removed["crop"].to_numpy())["yield_kg_ha"].to_numpy()
+    else:
+        yield_kg_ha = np.zeros(0)
+    crops = removed["crop"].to_numpy()
+    unique, inverse = np.unique(crops.astype(str), return_inverse=True)
+    coefficients = np.array([removal.get(c, (np.nan, np.nan, np.nan)) for c in unique], dtype=np.float64)
+    coefficients = coefficients.reshape(-1, 3)[inverse]
+    for i, name in enumerate(NUTRIENTS):
+        removed[f"{name}_removed"] = yield_kg_ha * coefficients[:, i]
+
+    # every season of every field gets a row, with or without events
+    keys = ["field_id", "season", "crop"]
+    applied_sum = applied.groupby(keys)[[f"{n}_applied" for n in NUTRIENTS] + ["unresolved_applications"]].sum()
+    removed["harvests"] = 1
+    removed_sum = removed.groupby(keys)[[f"{n}_removed" for n in NUTRIENTS] + ["harvests"]].sum(min_count=1)
+    seasons["crop"] = seasons["crop"].fillna(pd.Series(
+        seasons.merge(planted, on=["field_id", "season"], how="left")["planted_crop"].to_numpy(),
+        index=seasons.index)).fillna("unknown")
+    budget = seasons.set_index(keys)[[]].join(applied_sum, how="outer").join(removed_sum, how="outer")
+
+    harvested = budget["harvests"].notna()
+    for name in NUTRIENTS:
+        budget[f"{name}_applied"] = budget[f"{name}_applied"].fillna(0.0)
+        budget[f"{name}_removed"] = budget[f"{name}_removed"].where(harvested, 0.0)
+        budget[f"{name}_balance"] = budget[f"{name}_applied"] - budget[f"{name}_removed"]
+    budget["unresolved_applications"] = budget["unresolved_applications"].fillna(0).astype(np.int64)
+    return budget.reset_index()[BUDGET_COLUMNS]
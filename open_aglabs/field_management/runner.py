@@ -0,0 +1,191 @@
+import os
+import pickle
+import time
+import traceback
+from functools import partial
+from importlib import import_module
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+from pydantic import BaseModel, Field, ConfigDict
+
+from open_aglabs.field_management.lazy import LazyFieldManagement
+from open_aglabs.field_management.models import FieldManagement
+
+
+class FieldRun(BaseModel):
+    """
+    The outcome of one field of a pipeline run.
+    """
+    key: str = Field(
+        ...,
+        description="The key of the field, EX: its field_id."
+    )
+    ok: bool = Field(
+        ...,
+        description="Whether the task returned without raising."
+    )
+    seconds: float = Field(
+        ...,
+        description="The time the task took in the worker, in s."
+    )
+    worker: int = Field(
+        ...,
+        description="The pid of the worker process."
+    )
+    result_bytes: int = Field(
+        0,
+        description="The size of the serialized result sent back by the worker, 0 when results are not kept."
+    )
+    error: Optional[str] = Field(
+        None,
+        description="The exception and traceback of a failed task."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+
+class PipelineReport(BaseModel):
+    """
+    The per field timings and failures and the overall throughput of a pipeline run.
+    """
+    runs: List[FieldRun] = Field(
+        default_factory=list,
+        description="Every field in the order it finished."
+    )
+    processes: int = Field(
+        ...,
+        description="The number of worker processes, 0 when the tasks ran in the calling process."
+    )
+    seconds: float = Field(
+        0.0,
+        description="The wall time of the whole run in s."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+    @property
+    def failed(self) -> List[FieldRun]:
+        return [r for r in self.runs if not r.ok]
+
+    @property
+    def fields_per_second(self) -> float:
+        return len(self.runs) / self.seconds if self.seconds > 0 else 0.0
+
+    def frame(self) -> pd.DataFrame:
+        """
+        One row per field with key, ok, seconds, worker, result_bytes and error, slowest first.
+        """
+        df = pd.DataFrame([r.model_dump() for r in self.runs], columns=list(FieldRun.model_fields))
+        return df.sort_values("seconds", ascending=False, ignore_index=True)
+
+
+class PipelineResult:
+    """
+    The decoded results of a pipeline run by field key, with its PipelineReport.
+    """
+
+    def __init__(self, results: Dict[str, Any], report: PipelineReport):
+        self.results = results
+        self.report = report
+
+
+def encode_result(result: Any) -> tuple:
+    """
+    The compact form a worker sends a result back in. A pydantic model goes as its JSON rather than as a pickled
+    object tree, anything else (EX: a DataFrame, whose columns pickle as flat buffers) is pickled.
+    """
+    if isinstance(result, BaseModel):
+        cls = type(result)
+        return "model", f"{cls.__module__}:{cls.__qualname__}", result.model_dump_json(by_alias=True).encode()
+    return "pickle", None, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_result(kind: str, name: Optional[str], payload: bytes) -> Any:
+    """
+    Reverses encode_result. A FieldManagement comes back as a LazyFieldManagement, so its events are only
+    validated when they are used, other models are validated from their JSON.
+    """
+    if kind == "pickle":
+        return pickle.loads(payload)
+    module, _, qualname = name.partition(":")
+    cls = import_module(module)
+    for part in qualname.split("."):
+        cls = getattr(cls, part)
+    if cls is FieldManagement:
+        return LazyFieldManagement.from_json(payload)
+    return cls.model_validate_json(payload)
+
+
+def _run_task(task: Callable, keep_results: bool, item: tuple):
+    key, value = item
+    start = time.perf_counter()
+    try:
+        result = task(value)
+        encoded = encode_result(result) if keep_results else None
+        error = None
+    except Exception:
+        encoded = None
+        error = traceback.format_exc()
+    return key, time.perf_counter() - start, os.getpid(), encoded, error
+
+
+def _default_key(item) -> str:
+    return str(getattr(item, "field_id", item))
+
+
+def run_field_pipeline(items: Iterable,
+                       task: Callable[[Any], Any],
+                       processes: Optional[int] = None,
+                       chunksize: int = 1,
+                       key: Optional[Callable[[Any], str]] = None,
+                       size: Optional[Callable[[Any], float]] = None,
+                       keep_results: bool = True,
+                       start_method: Optional[str] = None) -> PipelineResult:
+    """
+    Runs task(item) for every field item (EX: the path of a persisted field, or a FieldManagement) over a pool of
+    processes (os.cpu_count() by default, 0 runs in the calling process) and collects the results by key(item),
+    the field_id or the item itself by default. task has to be picklable, a module level function.
+
+    Items are handed out chunksize at a time to whichever worker is free (imap_unordered), so a few large fields
+    do not hold up a worker while others sit idle. With size, a cost estimate per item (EX: its file size), the
+    largest items are started first so the run does not end waiting on one of them. Results come back in the
+    compact form of encode_result. A task that raises is recorded with its traceback in the report and the run
+    goes on. keep_results=False only keeps the report, for tasks that write their own output: their results are
+    neither encoded nor sent back.
+    """
+    processes = os.cpu_count() if processes is None else processes
+    key = _default_key if key is None else key
+    items = [(key(item), item) for item in items]
+    if size is not None:
+        items.sort(key=lambda item: size(item[1]), reverse=True)
+    keys = [k for k, _ in items]
+    if len(set(keys)) != len(keys):
+        raise ValueError("Every field of a pipeline run needs its own key")
+
+    report = PipelineReport(processes=processes)
+    results: Dict[str, Any] = {}
+    run = partial(_run_task, task, keep_results)
+    start = time.perf_counter()
+
+    def collect(outcomes):
+        for field_key, seconds, worker, encoded, error in outcomes:
+            result_bytes = 0 if encoded is None else len(encoded[2])
+            report.runs.append(FieldRun(key=field_key, ok=error is None, seconds=seconds, worker=worker,
+                                        result_bytes=result_bytes, error=error))
+            if encoded is not None:
+                results[field_key] = decode_result(*encoded)
+
+    if processes == 0:
+        collect(map(run, items))
+    else:
+        with get_context(start_method).Pool(processes=processes) as pool:
+            collect(pool.imap_unordered(run, items, chunksize=chunksize))
+
+    report.seconds = time.perf_counter() - start
+    return PipelineResult(results, report)
@@ -0,0 +1,243 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field, ConfigDict
+
+from open_aglabs.core.constants import (COUNTRY_ALPHA2, COUNTRY_CODES, CROP_LIST, TIME_OF_YEAR_LIST,
+                                        YEAR_LIST)
+
+SEASON_KEY_SEPARATOR = ":"
+
+SEASON_DIMENSIONS = ("year", "country", "crop", "time_of_year")
+
+_ALPHA3_TO_ALPHA2 = {alpha3: alpha2 for alpha2, alpha3 in COUNTRY_ALPHA2.items()}
+
+_YEARS = set(YEAR_LIST.tolist())
+
+
+def season_country(country: str) -> str:
+    """
+    The COUNTRY_CODES (alpha-3) code of an alpha-2 or alpha-3 country code in any case, EX: 'us' -> 'USA'.
+    'unknown' and 'unk' are 'UNK'.
+    """
+    code = str(country).strip().upper()
+    if code == "UNKNOWN":
+        code = "UNK"
+    code = COUNTRY_ALPHA2.get(code, code)
+    if code not in COUNTRY_CODES:
+        raise ValueError(f"Unknown country {country}, use an ISO 3166-1 alpha-2 or alpha-3 code")
+    return code
+
+
+def _member(value, allowed, name: str) -> str:
+    value = str(value).strip().lower()
+    if value not in allowed:
+        raise ValueError(f"Unknown {name} {value}, the known values are {list(allowed)}")
+    return value
+
+
+def _year(value) -> int:
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"The season year has to be a number, got {value}") from None
+    if year not in _YEARS:
+        raise ValueError(f"The season year {year} is outside of {YEAR_LIST[0]} - {YEAR_LIST[-1]}")
+    return year
+
+
+class SeasonKey(BaseModel):
+    """
+    A FieldManagement season key, EX: '2025:us:corn:spring', as its year, country (COUNTRY_CODES alpha-3 code),
+    crop (CROP_LIST) and time of year (TIME_OF_YEAR_LIST).
+    """
+    year: int = Field(
+        ...,
+        description="The year of the season, in YEAR_LIST.",
+        examples=[2025]
+    )
+    country: str = Field(
+        ...,
+        description="The alpha-3 code of the country, in COUNTRY_CODES.",
+        examples=["USA"]
+    )
+    crop: str = Field(
+        ...,
+        description="The crop of the season, in CROP_LIST.",
+        examples=["corn"]
+    )
+    time_of_year: str = Field(
+        ...,
+        description="The part of the year the season covers, in TIME_OF_YEAR_LIST.",
+        examples=["spring"]
+    )
+
+    model_config = ConfigDict(
+        extra="forbid",
+        frozen=True
+    )
+
+    def __str__(self) -> str:
+        country = _ALPHA3_TO_ALPHA2.get(self.country, self.country).lower()
+        return SEASON_KEY_SEPARATOR.join([str(self.year), country, self.crop, self.time_of_year])
+
+
+@lru_cache(maxsize=65536)
+def parse_season_key(key: str) -> SeasonKey:
+    """
+    Parses and validates a season key 'year:country:crop:time_of_year', EX: '2025:us:corn:spring'. The country
+    can be an alpha-2 or alpha-3 code, parts are case insensitive. str() of the SeasonKey gives the canonical key.
+    """
+    parts = str(key).split(SEASON_KEY_SEPARATOR)
+    if len(parts) != len(SEASON_DIMENSIONS):
+        raise ValueError(f"A season key has the form year:country:crop:time_of_year, got {key}")
+    return SeasonKey.model_construct(
+        year=_year(parts[0]),
+        country=season_country(parts[1]),
+        crop=_member(parts[2], CROP_LIST, "crop"),
+        time_of_year=_member(parts[3], TIME_OF_YEAR_LIST, "time of year"),
+    )
+
+
+def parse_season_keys(keys: Iterable[str]) -> pd.DataFrame:
+    """
+    Parses many season keys at once, every distinct key only once, into a DataFrame of season, year, country, crop
+    and time_of_year with one row per key.
+    """
+    codes, unique = pd.factorize(pd.Series(list(keys), dtype=object))
+    parsed = [parse_season_key(k) for k in unique]
+    df = pd.DataFrame({"season": np.asarray(unique, dtype=object)[codes]})
+    df["year"] = np.array([p.year for p in parsed], dtype=np.int16)[codes]
+    for name in SEASON_DIMENSIONS[1:]:
+        df[name] = np.array([getattr(p, name) for p in parsed], dtype=object)[codes]
+    return df
+
+
+def _normalizer(dimension: str):
+    if dimension == "year":
+        return _year
+    if dimension == "country":
+        return season_country
+    if dimension == "crop":
+        return lambda v: _member(v, CROP_LIST, "crop")
+    return lambda v: _member(v, TIME_OF_YEAR_LIST, "time of year")
+
+
+class SeasonIndex:
+    """
+    A partition index of the seasons of many fields, to find the fields of some years, countries, crops or times of
+    year without reading any of their events.
+
+    Every (field, season) pair is a row. For each dimension the rows are partitioned by value into sorted row arrays,
+    a query takes the partitions of the values asked for, unions them within a dimension and intersects them across
+    dimensions. Year ranges are a binary search over the rows sorted by year. The index only needs the field_id and
+    seasons of a field, so it can be built from LazyFieldManagement or the headers of persisted fields.
+    """
+
+    def __init__(self):
+        self._field_ids: List[str] = []
+        self._seasons: List[str] = []
+        self._parsed: List[SeasonKey] = []
+        self.invalid: Dict[str, List[str]] = {}
+        self._partitions: Optional[Dict[str, Dict[Union[int, str], np.ndarray]]] = None
+        self._year_order: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_fields(cls, fields: Iterable, errors: str = "raise") -> "SeasonIndex":
+        """
+        An index of the seasons of FieldManagement (or LazyFieldManagement) objects, see add.
+        """
+        index = cls()
+        for field in fields:
+            index.add(field.field_id, field.seasons, errors=errors)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._seasons)
+
+    def add(self, field_id: str, seasons: Sequence[str], errors: str = "raise"):
+        """
+        Adds the seasons of a field. With errors='raise' an invalid season key raises a ValueError, with
+        errors='skip' it is left out and kept in invalid by field id.
+        """
+        if errors not in ("raise", "skip"):
+            raise ValueError(f"errors has to be 'raise' or 'skip', got {errors}")
+        for season in seasons:
+            try:
+                parsed = parse_season_key(season)
+            except ValueError as e:
+                if errors == "raise":
+                    raise ValueError(f"The season {season} of the field {field_id} is not valid: {e}") from None
+                self.invalid.setdefault(field_id, []).append(season)
+                continue
+            self._field_ids.append(field_id)
+            self._seasons.append(season)
+            self._parsed.append(parsed)
+        self._partitions = None
+        self._year_order = None
+
+    def _build(self):
+        if self._partitions is not None:
+            return
+        self._partitions = {}
+        for dimension in SEASON_DIMENSIONS:
+            values = pd.Series([getattr(p, dimension) for p in self._parsed], dtype=object)
+            codes, unique = pd.factorize(values)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(unique)))]
+            self._partitions[dimension] = {v: order[bounds[i]:bounds[i + 1]] for i, v in enumerate(unique)}
+        years = np.array([p.year for p in self._parsed], dtype=np.int16)
+        order = np.argsort(years, kind="stable")
+        self._year_order = (years[order], order)
+
+    def _rows(self, dimension: str, values) -> np.ndarray:
+        if dimension == "year" and isinstance(values, tuple):
+            start, end = values
+            years, order = self._year_order
+            lo = 0 if start is None else np.searchsorted(years, start, side="left")
+            hi = len(years) if end is None else np.searchsorted(years, end, side="right")
+            return np.sort(order[lo:hi])
+        if isinstance(values, (str, int, np.integer)):
+            values = [values]
+        normalize = _normalizer(dimension)
+        partitions = self._partitions[dimension]
+        parts = [partitions.get(normalize(v), np.empty(0, dtype=np.int64)) for v in values]
+        return np.unique(np.concatenate(parts)) if len(parts) > 0 else np.empty(0, dtype=np.int64)
+
+    def _query(self, year=None, country=None, crop=None, time_of_year=None) -> np.ndarray:
+        self._build()
+        rows = None
+        for dimension, values in zip(SEASON_DIMENSIONS, (year, country, crop, time_of_year)):
+            if values is None:
+                continue
+            matches = self._rows(dimension, values)
+            rows = matches if rows is None else np.intersect1d(rows, matches, assume_unique=True)
+        return np.arange(len(self._seasons)) if rows is None else rows
+
+    def seasons(self, year=None, country=None, crop=None, time_of_year=None) -> pd.DataFrame:
+        """
+        The (field, season) rows matching every given dimension, in the order they were added, as a DataFrame of
+        field_id, season, year, country, crop and time_of_year. Each dimension takes one value or a list of values,
+        year also takes an inclusive (start, end) range with None for an open end. Values are normalized like the
+        season keys, EX: country='us' matches 'USA'.
+        """
+        rows = self._query(year=year, country=country, crop=crop, time_of_year=time_of_year)
+        parsed = [self._parsed[i] for i in rows]
+        return pd.DataFrame({
+            "field_id": [self._field_ids[i] for i in rows],
+            "season": [self._seasons[i] for i in rows],
+            "year": np.array([p.year for p in parsed], dtype=np.int16),
+            "country": [p.country for p in parsed],
+            "crop": [p.crop for p in parsed],
+            "time_of_year": [p.time_of_year for p in parsed],
+        })
+
+    def fields(self, year=None, country=None, crop=None, time_of_year=None) -> List[str]:
+        """
+        The ids of the fields with a season matching every given dimension (see seasons), in the order they were
+        added.
+        """
+        rows = self._query(year=year, country=country, crop=crop, time_of_year=time_of_year)
+        return list(dict.fromkeys(self._field_ids[i] for i in rows))
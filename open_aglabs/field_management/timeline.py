@@ -0,0 +1,208 @@
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from open_aglabs.field_management.ingest import ACTIVITY_EVENTS, event_key
+from open_aglabs.field_management.models import FieldManagement
+
+# Type codes of the timeline, the position of the activity in ACTIVITY_EVENTS, EX: 0 for planting.
+ACTIVITIES = tuple(ACTIVITY_EVENTS)
+
+TimelineEntry = Tuple[np.datetime64, str, int]
+
+
+def to_datetime64(values) -> np.ndarray:
+    """
+    datetime64[ns] in UTC of datetimes, timestamps or strings, naive values are taken to be UTC already.
+    """
+    return pd.to_datetime(pd.Series(values, dtype=object), utc=True).dt.tz_convert(None).to_numpy("datetime64[ns]")
+
+
+class EventTimeline:
+    """
+    Every event of a FieldManagement on one time axis: a sorted datetime64[ns] array of the event timestamps (UTC)
+    with, for each, the code of its activity (see ACTIVITIES) and its row in that activity's event list.
+
+    Range and nearest queries are binary searches over the sorted times, queries limited to some activities
+    search a per activity view of the index built on first use. Events added with append, or appended to the
+    event lists of the field and picked up by refresh, are merged into the index without re-sorting it: events
+    later than the last indexed one go into spare capacity at the end, earlier ones are inserted at their place.
+    """
+
+    def __init__(self, field: FieldManagement):
+        self.field = field
+        self._times = np.empty(0, dtype="datetime64[ns]")
+        self._codes = np.empty(0, dtype=np.int8)
+        self._rows = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._indexed = [0] * len(ACTIVITIES)
+        self._views = {}
+        self.refresh()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._times[:self._size]
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes[:self._size]
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self._rows[:self._size]
+
+    def _events(self, code: int) -> list:
+        return getattr(self.field, ACTIVITY_EVENTS[ACTIVITIES[code]][0])
+
+    def _extend(self, times: np.ndarray, codes: np.ndarray, rows: np.ndarray):
+        if len(times) == 0:
+            return
+        order = np.lexsort((rows, codes, times))
+        times, codes, rows = times[order], codes[order], rows[order]
+        self._views = {}
+
+        if self._size == 0 or times[0] >= self._times[self._size - 1]:
+            end = self._size + len(times)
+            if end > len(self._times):
+                capacity = max(end, 2 * len(self._times), 64)
+                self._times = np.resize(self._times, capacity)
+                self._codes = np.resize(self._codes, capacity)
+                self._rows = np.resize(self._rows, capacity)
+            self._times[self._size:end] = times
+            self._codes[self._size:end] = codes
+            self._rows[self._size:end] = rows
+            self._size = end
+            return
+
+        # after the indexed events with the same time, so ties stay in the order they were added
+        positions = np.searchsorted(self.times, times, side="right")
+        self._times = np.insert(self.times, positions, times)
+        self._codes = np.insert(self.codes, positions, codes)
+        self._rows = np.insert(self.rows, positions, rows)
+        self._size = len(self._times)
+
+    def refresh(self) -> int:
+        """
+        Indexes the events appended to the event lists of the field since the last refresh, returns how many.
+        """
+        times, codes, rows = [], [], []
+        for code in range(len(ACTIVITIES)):
+            events = self._events(code)
+            start = self._indexed[code]
+            if len(events) < start:
+                raise ValueError(f"Events were removed from {ACTIVITIES[code]}, build a new EventTimeline")
+            times += [e.timestamp for e in events[start:]]
+            codes += [code] * (len(events) - start)
+            rows += range(start, len(events))
+            self._indexed[code] = len(events)
+        if len(times) > 0:
+            self._extend(to_datetime64(times), np.array(codes, dtype=np.int8), np.array(rows, dtype=np.int32))
+        return len(times)
+
+    def append(self, activity: str, events: Union[BaseModel, Iterable[BaseModel]]):
+        """
+        Appends events to an event list of the field (EX: 'harvest') and to the index.
+        """
+        self._code(activity)
+        events = [events] if isinstance(events, BaseModel) else list(events)
+        getattr(self.field, ACTIVITY_EVENTS[activity][0]).extend(events)
+        self.refresh()
+
+    @staticmethod
+    def _code(activity: str) -> int:
+        if activity not in ACTIVITY_EVENTS:
+            raise ValueError(f"Unknown activity {activity}, the known activities are {list(ACTIVITIES)}")
+        return ACTIVITIES.index(activity)
+
+    def _view(self, activities: Optional[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The sorted times and timeline positions of the events of some activities (all of them for None).
+        """
+        if activities is None:
+            return self.times, np.arange(self._size)
+        key = tuple(sorted({self._code(a) for a in ([activities] if isinstance(activities, str) else activities)}))
+        if key not in self._views:
+            positions = np.flatnonzero(np.isin(self.codes, key))
+            self._views[key] = (self.times[positions], positions)
+        return self._views[key]
+
+    def _entry(self, position: int) -> TimelineEntry:
+        return self._times[position], ACTIVITIES[self._codes[position]], int(self._rows[position])
+
+    def event(self, position: int) -> BaseModel:
+        """
+        The event model at a position of the timeline.
+        """
+        return self._events(self._codes[position])[self._rows[position]]
+
+    def between(self,
+                start: Optional[Union[datetime, str, np.datetime64]] = None,
+                end: Optional[Union[datetime, str, np.datetime64]] = None,
+                activities: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        The events with start <= timestamp <= end in time order (either bound can be left open), as a DataFrame
+        of timestamp, activity, row (in the activity's event list), event_id and position (in the timeline).
+        """
+        times, positions = self._view(activities)
+        lo = 0 if start is None else np.searchsorted(times, to_datetime64([start])[0], side="left")
+        hi = len(times) if end is None else np.searchsorted(times, to_datetime64([end])[0], side="right")
+        positions = positions[lo:hi]
+        codes = self._codes[positions]
+        return pd.DataFrame({
+            "timestamp": self._times[positions],
+            "activity": np.array(ACTIVITIES, dtype=object)[codes],
+            "row": self._rows[positions],
+            "event_id": [event_key(self.event(p)) for p in positions],
+            "position": positions,
+        })
+
+    def _nearest(self, when, activities, where, before: bool, strict: bool) -> Optional[TimelineEntry]:
+        times, positions = self._view(activities)
+        t = to_datetime64([when])[0]
+        if before:
+            i = np.searchsorted(times, t, side="left" if strict else "right") - 1
+            step = -1
+        else:
+            i = np.searchsorted(times, t, side="right" if strict else "left")
+            step = 1
+        # the binary search gives the nearest event, a filter walks on from there
+        while 0 <= i < len(times):
+            if where is None or where(self.event(positions[i])):
+                return self._entry(positions[i])
+            i += step
+        return None
+
+    def last_before(self,
+                    when: Union[datetime, str, np.datetime64],
+                    activities: Optional[Sequence[str]] = None,
+                    where: Optional[Callable[[BaseModel], bool]] = None,
+                    strict: bool = False) -> Optional[TimelineEntry]:
+        """
+        The (timestamp, activity, row) of the latest event at or before when (strictly before with strict), of
+        some activities and for which where(event) holds, or None. EX: the last herbicide application before a
+        harvest, last_before(harvest.timestamp, 'application', lambda e: e.application_type == 'Herbicide').
+        """
+        return self._nearest(when, activities, where, before=True, strict=strict)
+
+    def first_after(self,
+                    when: Union[datetime, str, np.datetime64],
+                    activities: Optional[Sequence[str]] = None,
+                    where: Optional[Callable[[BaseModel], bool]] = None,
+                    strict: bool = False) -> Optional[TimelineEntry]:
+        """
+        The (timestamp, activity, row) of the earliest event at or after when (strictly after with strict), see
+        last_before.
+        """
+        return self._nearest(when, activities, where, before=False, strict=strict)
+
+    def counts(self) -> List[int]:
+        """
+        The number of indexed events of every activity, in ACTIVITIES order.
+        """
+        return np.bincount(self.codes, minlength=len(ACTIVITIES)).tolist()
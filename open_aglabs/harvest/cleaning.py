@@ -0,0 +1,242 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field, ConfigDict
+
+from open_aglabs.core.gis import local_xy
+
+CLEANING_STAGES = ["flow_delay", "pass_delay", "speed", "swath", "overlap", "outliers"]
+
+
+class YieldCleaningConfig(BaseModel):
+    """
+    The settings for the yield cleaning pipeline. Stages run in the order given by stages.
+    """
+    stages: List[str] = Field(
+        default_factory=lambda: list(CLEANING_STAGES),
+        description="The cleaning stages to run, in order."
+    )
+    flow_delay_points: int = Field(
+        12,
+        ge=0,
+        description="How many points the grain flow sensor lags behind the header position."
+    )
+    pass_heading_change_deg: float = Field(
+        60.0,
+        gt=0,
+        le=180,
+        description="A heading change larger than this between two points starts a new pass."
+    )
+    pass_gap_m: float = Field(
+        30.0,
+        gt=0,
+        description="A jump larger than this between two points starts a new pass."
+    )
+    start_pass_points: int = Field(
+        4,
+        ge=0,
+        description="Points removed at the start of every pass while the header fills."
+    )
+    end_pass_points: int = Field(
+        2,
+        ge=0,
+        description="Points removed at the end of every pass while the header empties."
+    )
+    min_speed: float = Field(
+        0.5,
+        ge=0,
+        description="The minimum ground speed in m/s."
+    )
+    max_speed: float = Field(
+        4.0,
+        gt=0,
+        description="The maximum ground speed in m/s."
+    )
+    max_speed_change: float = Field(
+        0.3,
+        gt=0,
+        description="The largest allowed relative speed change between consecutive points."
+    )
+    min_swath_fraction: float = Field(
+        0.8,
+        ge=0,
+        le=1,
+        description="Points cut with less than this fraction of the full swath are removed."
+    )
+    overlap_cell_m: float = Field(
+        2.0,
+        gt=0,
+        description="The cell size used to find ground that was already harvested by an earlier pass."
+    )
+    outlier_mad: float = Field(
+        3.0,
+        gt=0,
+        description="Points whose yield is more than this many robust standard deviations from the median are trimmed."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+
+def pass_ids(lat: np.ndarray, lon: np.ndarray, heading_change_deg: float, gap_m: float) -> np.ndarray:
+    """
+    Splits the point stream into passes wherever the heading turns sharply or the machine jumps. A turn changes
+    the heading twice in a row (into and out of the headland step), only the first change starts a pass.
+    """
+    x, y = local_xy(lat, lon)
+    dx, dy = np.diff(x), np.diff(y)
+    step = np.hypot(dx, dy)
+    heading = np.degrees(np.arctan2(dy, dx))
+
+    new_pass = np.zeros(len(x), dtype=bool)
+    new_pass[1:] = step > gap_m
+    turn = np.abs((np.diff(heading) + 180.0) % 360.0 - 180.0) > heading_change_deg
+    new_pass[2:] |= turn & ~np.r_[False, turn[:-1]] & ~new_pass[1:-1]
+    return np.cumsum(new_pass)
+
+
+def yield_per_point(points: Dict[str, np.ndarray], interval_s: float = 1.0) -> np.ndarray:
+    """
+    The wet yield of every point in kg/m2.
+    """
+    interval = points.get("interval")
+    interval = interval_s if interval is None else interval
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return points["mass_flow"] * interval / (points["speed"] * interval * points["swath"])
+
+
+class YieldCleaner:
+    """
+    Runs the cleaning stages over whole point arrays. Every stage returns a boolean mask of the points it removes,
+    the masks are combined into one keep mask so the arrays are only compressed once at the end.
+    """
+
+    def __init__(self, config: Optional[YieldCleaningConfig] = None):
+        self.config = YieldCleaningConfig() if config is None else config
+        unknown = [s for s in self.config.stages if s not in CLEANING_STAGES]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown cleaning stages {unknown}, the known stages are {CLEANING_STAGES}")
+
+    def _pass_ids(self, points):
+        if "pass_id" not in points:
+            points["pass_id"] = pass_ids(points["lat"], points["lon"],
+                                         self.config.pass_heading_change_deg, self.config.pass_gap_m)
+        return points["pass_id"]
+
+    def flow_delay(self, points, keep) -> np.ndarray:
+        """
+        Moves the flow (and moisture) readings back onto the position they were cut at. The readings can not come
+        from another pass, and the points left without a reading at the end of each pass are removed.
+        """
+        k = self.config.flow_delay_points
+        n = len(keep)
+        remove = np.zeros(n, dtype=bool)
+        if k == 0 or n == 0:
+            return remove
+
+        passes = self._pass_ids(points)
+        source_ok = np.zeros(n, dtype=bool)
+        source_ok[:n - k] = passes[k:] == passes[:n - k]
+
+        for name in ("mass_flow", "moisture"):
+            shifted = np.empty_like(points[name])
+            shifted[:n - k] = points[name][k:]
+            shifted[n - k:] = points[name][n - k:]
+            points[name] = shifted
+
+        remove[~source_ok] = True
+        return remove
+
+    def pass_delay(self, points, keep) -> np.ndarray:
+        """
+        Removes the start and end of every pass where the header is filling up or emptying.
+        """
+        passes = self._pass_ids(points)
+        index = np.arange(len(passes))
+        counts = np.bincount(passes)
+        ends = np.cumsum(counts)
+        starts, ends = (ends - counts)[passes], ends[passes] - 1
+        return (index - starts < self.config.start_pass_points) | (ends - index < self.config.end_pass_points)
+
+    def speed(self, points, keep) -> np.ndarray:
+        speed = points["speed"]
+        remove = ~((speed >= self.config.min_speed) & (speed <= self.config.max_speed))
+
+        change = np.zeros(len(speed), dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change[1:] = np.abs(np.diff(speed)) / speed[:-1]
+        passes = self._pass_ids(points)
+        same_pass = np.zeros(len(speed), dtype=bool)
+        same_pass[1:] = passes[1:] == passes[:-1]
+        remove |= same_pass & (change > self.config.max_speed_change)
+        return remove
+
+    def swath(self, points, keep) -> np.ndarray:
+        swath = points["swath"]
+        full = np.nanmax(swath[keep]) if np.any(keep) else 0.0
+        return ~(swath >= self.config.min_swath_fraction * full)
+
+    def overlap(self, points, keep) -> np.ndarray:
+        """
+        Removes points on ground that an earlier pass already harvested. Every kept point is binned into a grid cell
+        and only the points from the first pass to reach a cell survive.
+        """
+        remove = np.zeros(len(keep), dtype=bool)
+        idx = np.nonzero(keep)[0]
+        if len(idx) == 0:
+            return remove
+
+        x, y = local_xy(points["lat"], points["lon"])
+        size = self.config.overlap_cell_m
+        cx = np.floor((x[idx] - x[idx].min()) / size).astype(np.int64)
+        cy = np.floor((y[idx] - y[idx].min()) / size).astype(np.int64)
+        cell = cy * (cx.max() + 1) + cx
+
+        passes = self._pass_ids(points)[idx]
+        _, inverse = np.unique(cell, return_inverse=True)
+        first_pass = np.full(inverse.max() + 1, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first_pass, inverse, passes)
+        remove[idx] = passes != first_pass[inverse]
+        return remove
+
+    def outliers(self, points, keep) -> np.ndarray:
+        """
+        Trims points whose yield is further than outlier_mad robust standard deviations from the field median.
+        """
+        y = yield_per_point(points)
+        valid = keep & np.isfinite(y)
+        remove = ~np.isfinite(y)
+        if not np.any(valid):
+            return remove
+
+        median = np.median(y[valid])
+        mad = np.median(np.abs(y[valid] - median)) * 1.4826
+        if mad == 0:
+            return remove
+        return remove | (np.abs(y - median) > self.config.outlier_mad * mad)
+
+    def clean(self, points: Dict[str, np.ndarray]) -> Tuple[Dict[str, np.ndarray], Dict[str, int]]:
+        """
+        Cleans a dict of point arrays (see YIELD_POINT_COLUMNS) and returns the kept points along with how many points
+        each stage removed. Points removed by an earlier stage are not counted again.
+        """
+        points = {name: np.array(values) for name, values in points.items()}
+        n = len(points["lat"])
+        keep = np.ones(n, dtype=bool)
+
+        report = {}
+        for stage in self.config.stages:
+            remove = getattr(self, stage)(points, keep)
+            report[stage] = int(np.count_nonzero(keep & remove))
+            keep &= ~remove
+
+        report["kept"] = int(np.count_nonzero(keep))
+        return {name: values[keep] for name, values in points.items()}, report
+
+
+def clean_yield_points(points: Dict[str, np.ndarray], config: Optional[YieldCleaningConfig] = None):
+    """
+    Runs the yield cleaning pipeline with the given (or default) config.
+    """
+    return YieldCleaner(config).clean(points)
@@ -0,0 +1,146 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Union
+
+import numpy as np
+
+from open_aglabs.core.base_models import Location
+from open_aglabs.core.points import PointStoreWriter, read_point_chunks
+from open_aglabs.core.units import convert, bushel_density
+from open_aglabs.harvest.models import HarvestEvent
+
+# Output name -> column name in the yield monitor export. Inputs are expected in SI units:
+# mass_flow in kg/s of wet grain, moisture in %, speed in m/s, swath in m and the optional interval in s.
+YIELD_POINT_COLUMNS = {
+    "lat": "lat",
+    "lon": "lon",
+    "mass_flow": "mass_flow",
+    "moisture": "moisture",
+    "speed": "speed",
+    "swath": "swath",
+    "interval": "interval",
+}
+
+# Coordinates stay float64 (float32 is only good to ~1 m), the measurements are stored as float32.
+YIELD_POINT_DTYPES = {
+    "lat": "float64",
+    "lon": "float64",
+    "mass_flow": "float32",
+    "moisture": "float32",
+    "speed": "float32",
+    "swath": "float32",
+    "interval": "float32",
+}
+
+
+class YieldAccumulator:
+    """
+    Keeps running totals over chunks of yield points so a whole field is summarised without holding every point.
+    Per point the harvested area is speed * interval * swath and the wet mass is mass_flow * interval.
+    """
+
+    def __init__(self, interval_s: float = 1.0):
+        self.interval_s = interval_s
+        self.points = 0
+        self.area_m2 = 0.0
+        self.wet_mass_kg = 0.0
+        self.water_kg = 0.0
+
+    def update(self, chunk: Dict[str, np.ndarray]):
+        interval = chunk.get("interval")
+        interval = self.interval_s if interval is None else np.asarray(interval, dtype=np.float64)
+
+        area = np.asarray(chunk["speed"], dtype=np.float64) * interval * np.asarray(chunk["swath"], dtype=np.float64)
+        wet = np.asarray(chunk["mass_flow"], dtype=np.float64) * interval
+        moisture = np.asarray(chunk["moisture"], dtype=np.float64)
+
+        valid = np.isfinite(area) & np.isfinite(wet) & np.isfinite(moisture)
+        self.points += int(np.count_nonzero(valid))
+        self.area_m2 += float(area[valid].sum())
+        self.wet_mass_kg += float(wet[valid].sum())
+        self.water_kg += float((wet[valid] * moisture[valid]).sum()) / 100.0
+
+    @property
+    def area_ha(self) -> float:
+        return self.area_m2 / 10000.0
+
+    @property
+    def moisture_pct(self) -> Optional[float]:
+        """
+        The mass weighted moisture of the harvested grain.
+        """
+        if self.wet_mass_kg == 0:
+            return None
+        return 100.0 * self.water_kg / self.wet_mass_kg
+
+    @property
+    def dry_mass_kg(self) -> float:
+        return self.wet_mass_kg - self.water_kg
+
+    def standard_mass_kg(self, nominal_moisture: Optional[float]) -> float:
+        """
+        The mass of the harvest once adjusted to the nominal moisture, or the wet mass if there is none.
+        """
+        if nominal_moisture is None:
+            return self.wet_mass_kg
+        return self.dry_mass_kg / (1.0 - nominal_moisture / 100.0)
+
+
+def ingest_yield_monitor(path: Union[str, Path],
+                         event_id: str,
+                         timestamp: datetime,
+                         harvest_type: str = "Destructive",
+                         harvest_method: Optional[str] = "Combine",
+                         out_path: Optional[Union[str, Path]] = None,
+                         columns: Optional[Dict[str, str]] = None,
+                         chunk_size: int = 500_000,
+                         interval_s: float = 1.0,
+                         nominal_moisture: Optional[float] = 15.5,
+                         nominal_volume: Optional[float] = None,
+                         nominal_mass_units: Optional[str] = "lbs",
+                         crop_yield_units: str = "kg/ha",
+                         location: Optional[Location] = None,
+                         notes: Optional[str] = None) -> HarvestEvent:
+    """
+    Streams a yield monitor export (CSV / GeoJSON) chunk by chunk, writes the points to a columnar point store and
+    returns the HarvestEvent summary pointing at that store through file_path.
+
+    crop_yield is the standard mass per area at nominal_moisture. Volume based yield units (EX: 'bu/acre') need
+    nominal_volume, the mass of one bushel in nominal_mass_units.
+    """
+    path = Path(path)
+    columns = YIELD_POINT_COLUMNS if columns is None else {**YIELD_POINT_COLUMNS, **columns}
+    out_path = path.with_suffix(".points") if out_path is None else Path(out_path)
+
+    accumulator = YieldAccumulator(interval_s=interval_s)
+    required = ("lat", "lon", "mass_flow", "moisture", "speed", "swath")
+    with PointStoreWriter(out_path, YIELD_POINT_DTYPES, metadata={"source": str(path), "event_id": event_id}) as writer:
+        for chunk in read_point_chunks(path, columns, required, "yield", chunk_size=chunk_size,
+                                       dtypes=YIELD_POINT_DTYPES):
+            writer.append(chunk)
+            accumulator.update(chunk)
+
+    mass = accumulator.standard_mass_kg(nominal_moisture)
+    crop_yield = None
+    if accumulator.area_ha > 0:
+        density = None if nominal_volume is None else bushel_density(nominal_volume, nominal_mass_units)
+        crop_yield = convert(mass / accumulator.area_ha, "kg/ha", crop_yield_units, density=density)
+
+    return HarvestEvent(
+        id=event_id,
+        file_path=str(out_path),
+        location=location,
+        timestamp=timestamp,
+        harvest_type=harvest_type,
+        harvest_method=harvest_method,
+        crop_yield=crop_yield,
+        crop_yield_units=crop_yield_units,
+        nominal_moisture=nominal_moisture,
+        area=accumulator.area_ha,
+        area_units="ha",
+        mass=mass,
+        mass_units="kg",
+        nominal_volume=nominal_volume,
+        nominal_mass_units=nominal_mass_units,
+        notes=notes,
+    )
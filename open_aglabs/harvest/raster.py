@@ -0,0 +1,153 @@
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from open_aglabs.core.gis import GridSpec, create_grid, transform_bounds, transform_xy, utm_crs
+from open_aglabs.core.points import read_point_store
+from open_aglabs.harvest.cleaning import yield_per_point
+from open_aglabs.harvest.models import HarvestEvent
+
+GRID_STATS = ("mean", "median", "count")
+
+
+def grid_medians(cells: np.ndarray, values: np.ndarray):
+    """
+    The median of the values in every cell, by sorting the points by (cell, value) and reading the middle of each
+    run of equal cells. Returns the unique cells and their medians.
+    """
+    order = np.lexsort((values, cells))
+    cells, values = cells[order], values[order]
+
+    starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+    counts = np.diff(np.r_[starts, len(cells)])
+    low = values[starts + (counts - 1) // 2]
+    high = values[starts + counts // 2]
+    return cells[starts], (low + high) / 2.0
+
+
+class GridAccumulator:
+    """
+    Bins chunks of points into a memory mapped (stats, height, width) grid. Sums and counts are accumulated with
+    np.add.at straight into the memmap, so neither the points nor the grid ever have to fit in memory. The median
+    needs every value of a cell together: the cell id and value of every point are kept (int32 / float32 where they
+    fit) and sorted once in finish, so only the median grows with the number of points.
+    """
+
+    def __init__(self,
+                 spec: GridSpec,
+                 out_path: Union[str, Path],
+                 stats: Sequence[str] = GRID_STATS,
+                 metadata: Optional[dict] = None):
+        unknown = [s for s in stats if s not in GRID_STATS]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown grid statistics {unknown}, the known statistics are {list(GRID_STATS)}")
+
+        self.spec = spec
+        self.bands = list(stats)
+        self.grid = create_grid(out_path, spec, self.bands, fill_value=0.0, metadata=metadata)
+        self.total = self.grid[self.bands.index("mean")].reshape(-1) if "mean" in self.bands else None
+        self.count = self.grid[self.bands.index("count")].reshape(-1) if "count" in self.bands else \
+            np.zeros(spec.size, dtype=np.float32)
+        self.cell_dtype = np.int32 if spec.size < np.iinfo(np.int32).max else np.int64
+        self.median_cells, self.median_values = [], []
+
+    def update(self, x: np.ndarray, y: np.ndarray, values: np.ndarray):
+        cells = self.spec.cell_index(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        values = np.asarray(values, dtype=np.float64)
+        valid = (cells >= 0) & np.isfinite(values)
+        cells, values = cells[valid], values[valid]
+
+        np.add.at(self.count, cells, 1)
+        if self.total is not None:
+            np.add.at(self.total, cells, values)
+        if "median" in self.bands:
+            self.median_cells.append(cells.astype(self.cell_dtype))
+            self.median_values.append(values.astype(np.float32))
+
+    def finish(self) -> np.memmap:
+        """
+        Turns the sums into means, fills in the medians (NaN for empty cells) and flushes the grid.
+        """
+        empty = self.count == 0
+        if self.total is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.total /= self.count
+            self.total[empty] = np.nan
+        if "median" in self.bands:
+            median = self.grid[self.bands.index("median")].reshape(-1)
+            median[:] = np.nan
+            if sum(len(c) for c in self.median_cells) > 0:
+                cells, medians = grid_medians(np.concatenate(self.median_cells), np.concatenate(self.median_values))
+                median[cells] = medians
+            self.median_cells, self.median_values = [], []
+
+        self.grid.flush()
+        return self.grid
+
+
+def rasterize_points(x: np.ndarray,
+                     y: np.ndarray,
+                     values: np.ndarray,
+                     spec: GridSpec,
+                     out_path: Union[str, Path],
+                     stats: Sequence[str] = GRID_STATS,
+                     chunk_size: int = 1_000_000,
+                     metadata: Optional[dict] = None) -> np.memmap:
+    """
+    Bins points (arrays or memmaps) into a memory mapped (stats, height, width) grid chunk by chunk, see
+    GridAccumulator.
+    """
+    accumulator = GridAccumulator(spec, out_path, stats=stats, metadata=metadata)
+    for start in range(0, len(values), chunk_size):
+        stop = start + chunk_size
+        accumulator.update(x[start:stop], y[start:stop], values[start:stop])
+    return accumulator.finish()
+
+
+def rasterize_harvest_event(event: HarvestEvent,
+                            resolution: float = 5.0,
+                            crs: Optional[str] = None,
+                            out_path: Optional[Union[str, Path]] = None,
+                            stats: Sequence[str] = GRID_STATS,
+                            chunk_size: int = 1_000_000) -> HarvestEvent:
+    """
+    Rasterizes the (cleaned) yield points of a HarvestEvent to a grid of wet yield in kg/ha. The returned copy of
+    the event points at the grid instead, the grid metadata keeps the path of the points.
+
+    The point store at event.file_path is memory mapped and read chunk_size points at a time: a first pass over
+    lon / lat finds the UTM zone and the bounds of the grid, a second one projects the points and bins their yield.
+    Only the median (see GridAccumulator) keeps a few bytes per point, leave it out of stats for very large logs.
+    """
+    points = read_point_store(event.file_path)
+    n = len(points["lon"])
+    if n == 0:
+        raise ValueError(f"Harvest event {event.id} has no points in {event.file_path}")
+
+    lon_sum, lat_sum, finite = 0.0, 0.0, 0
+    lon_min, lat_min, lon_max, lat_max = np.inf, np.inf, -np.inf, -np.inf
+    for start in range(0, n, chunk_size):
+        lon = np.asarray(points["lon"][start:start + chunk_size], dtype=np.float64)
+        lat = np.asarray(points["lat"][start:start + chunk_size], dtype=np.float64)
+        ok = np.isfinite(lon) & np.isfinite(lat)
+        lon, lat = lon[ok], lat[ok]
+        if len(lon) > 0:
+            lon_sum, lat_sum, finite = lon_sum + lon.sum(), lat_sum + lat.sum(), finite + len(lon)
+            lon_min, lon_max = min(lon_min, lon.min()), max(lon_max, lon.max())
+            lat_min, lat_max = min(lat_min, lat.min()), max(lat_max, lat.max())
+    if finite == 0:
+        raise ValueError(f"Harvest event {event.id} has no located points in {event.file_path}")
+
+    crs = utm_crs(lon_sum / finite, lat_sum / finite) if crs is None else crs
+    x_min, y_min, x_max, y_max = transform_bounds(lon_min, lat_min, lon_max, lat_max, "EPSG:4326", crs)
+    spec = GridSpec.from_bounds(x_min, y_min, x_max, y_max, resolution=resolution, crs=crs)
+
+    out_path = Path(event.file_path).with_suffix(".grid.npy") if out_path is None else Path(out_path)
+    accumulator = GridAccumulator(spec, out_path, stats=stats,
+                                  metadata={"points": event.file_path, "event_id": event.id, "units": "kg/ha"})
+    for start in range(0, n, chunk_size):
+        chunk = {name: column[start:start + chunk_size] for name, column in points.items()}
+        x, y = transform_xy(chunk["lon"], chunk["lat"], "EPSG:4326", crs)
+        accumulator.update(x, y, yield_per_point(chunk) * 10000.0)
+    accumulator.finish()
+    return event.model_copy(update={"file_path": str(out_path)})
@@ -0,0 +1,136 @@
+from typing import List, Optional, Union, Sequence
+
+import numpy as np
+import pandas as pd
+
+from open_aglabs.core.constants import CROP_TEST_WEIGHTS
+from open_aglabs.core.units import UNITS, bushel_density
+from open_aglabs.harvest.models import HarvestEvent
+
+STANDARD_YIELD_COLUMNS = ["area_ha", "mass_kg", "dry_mass_kg", "yield_kg_ha", "bushels", "yield_bu_ac"]
+
+
+def moisture_adjusted_mass(mass, moisture, nominal_moisture):
+    """
+    Adjusts a mass measured at one moisture (%) to the mass it would have at the nominal moisture (%).
+    """
+    mass = np.asarray(mass, dtype=np.float64)
+    moisture = np.asarray(moisture, dtype=np.float64)
+    nominal_moisture = np.asarray(nominal_moisture, dtype=np.float64)
+    return mass * (100.0 - moisture) / (100.0 - nominal_moisture)
+
+
+def crop_test_weights(crops) -> np.ndarray:
+    """
+    Looks up the standard test weight (lbs/bu) of every crop, NaN for crops without one.
+    """
+    crops = np.atleast_1d(np.asarray(crops, dtype=object))
+    unique, inverse = np.unique(crops.astype(str), return_inverse=True)
+    lookup = np.array([CROP_TEST_WEIGHTS.get(c.lower(), np.nan) for c in unique], dtype=np.float64)
+    return lookup[inverse]
+
+
+def standardize_yield(mass,
+                      area,
+                      moisture=None,
+                      nominal_moisture=15.5,
+                      test_weight=None,
+                      crop=None,
+                      mass_units: Union[str, Sequence[str]] = "kg",
+                      area_units: Union[str, Sequence[str]] = "ha",
+                      test_weight_units: str = "lbs") -> pd.DataFrame:
+    """
+    Standardizes whole arrays of harvests (or yield points) in one call.
+
+    mass is measured at moisture (%) and is brought to nominal_moisture, leaving moisture out means the mass is
+    already at nominal_moisture. Bushels use test_weight (mass of one bushel in test_weight_units) or the standard
+    test weight of crop. Every argument can be a scalar or an array, units can also be given row by row.
+    Returns a DataFrame with STANDARD_YIELD_COLUMNS, the bushel columns are NaN when there is no test weight.
+    """
+    mass_kg = UNITS.convert(np.asarray(mass, dtype=np.float64), mass_units, "kg")
+    area_ha = UNITS.convert(np.asarray(area, dtype=np.float64), area_units, "ha")
+    mass_kg, area_ha = np.broadcast_arrays(np.atleast_1d(mass_kg), np.atleast_1d(area_ha))
+
+    nominal_moisture = np.broadcast_to(np.asarray(nominal_moisture, dtype=np.float64), mass_kg.shape)
+    if moisture is not None:
+        mass_kg = moisture_adjusted_mass(mass_kg, moisture, nominal_moisture)
+    dry_mass_kg = mass_kg * (100.0 - nominal_moisture) / 100.0
+
+    if test_weight is None:
+        test_weight = np.full(mass_kg.shape, np.nan) if crop is None else crop_test_weights(crop)
+        test_weight_units = "lbs"
+    density = np.broadcast_to(bushel_density(np.asarray(test_weight, dtype=np.float64), test_weight_units),
+                              mass_kg.shape)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yield_kg_ha = np.where(area_ha > 0, mass_kg / area_ha, np.nan)
+    bushels = UNITS.convert(mass_kg, "kg", "bu", density=density)
+    yield_bu_ac = UNITS.convert(yield_kg_ha, "kg/ha", "bu/ac", density=density)
+
+    return pd.DataFrame({
+        "area_ha": area_ha,
+        "mass_kg": mass_kg,
+        "dry_mass_kg": dry_mass_kg,
+        "yield_kg_ha": yield_kg_ha,
+        "bushels": bushels,
+        "yield_bu_ac": yield_bu_ac,
+    })
+
+
+def standardize_harvest_events(events: List[HarvestEvent],
+                               crop=None,
+                               nominal_moisture: Optional[float] = None,
+                               default_nominal_moisture: float = 15.5) -> pd.DataFrame:
+    """
+    Standardizes many HarvestEvents at once, returning one row per event indexed by the event id.
+
+    The event mass is taken to be at the event nominal_moisture and is moved to nominal_moisture when given, so all
+    the events end up on the same basis. Events without a mass fall back to crop_yield * area. The test weight is
+    the event nominal_volume (in nominal_mass_units) or the standard test weight of crop.
+    """
+    events = list(events)
+    n = len(events)
+    if n == 0:
+        return pd.DataFrame(columns=STANDARD_YIELD_COLUMNS)
+
+    def column(name, default=np.nan, dtype=np.float64):
+        return np.array([getattr(e, name) if getattr(e, name) is not None else default for e in events], dtype=dtype)
+
+    event_moisture = column("nominal_moisture", default_nominal_moisture)
+    target_moisture = event_moisture if nominal_moisture is None else np.full(n, nominal_moisture)
+
+    crops = np.broadcast_to(np.asarray(crop if crop is not None else "unknown", dtype=object), (n,))
+    test_weight_lbs = crop_test_weights(crops)
+    nominal_volume = column("nominal_volume")
+    has_volume = np.isfinite(nominal_volume)
+    if np.any(has_volume):
+        volume_units = column("nominal_mass_units", "lbs", dtype=object)
+        test_weight_lbs[has_volume] = UNITS.convert(nominal_volume[has_volume], volume_units[has_volume], "lbs")
+    density = bushel_density(test_weight_lbs)
+
+    area = column("area")
+    area_units = column("area_units", "ha", dtype=object)
+    area_ha = np.full(n, np.nan)
+    has_area = np.isfinite(area)
+    if np.any(has_area):
+        area_ha[has_area] = UNITS.convert(area[has_area], area_units[has_area], "ha")
+
+    mass = column("mass")
+    mass_units = column("mass_units", "kg", dtype=object)
+    mass_kg = np.full(n, np.nan)
+    has_mass = np.isfinite(mass)
+    if np.any(has_mass):
+        mass_kg[has_mass] = UNITS.convert(mass[has_mass], mass_units[has_mass], "kg")
+
+    crop_yield = column("crop_yield")
+    from_yield = ~has_mass & np.isfinite(crop_yield) & has_area
+    if np.any(from_yield):
+        yield_units = column("crop_yield_units", "kg/ha", dtype=object)[from_yield]
+        yield_kg_ha = UNITS.convert(crop_yield[from_yield], yield_units, "kg/ha", density=density[from_yield])
+        mass_kg[from_yield] = yield_kg_ha * area_ha[from_yield]
+
+    df = standardize_yield(mass_kg, area_ha, moisture=event_moisture, nominal_moisture=target_moisture,
+                           test_weight=test_weight_lbs, test_weight_units="lbs")
+    df.insert(0, "nominal_moisture", target_moisture)
+    df.index = pd.Index([e.id for e in events], name="id")
+    return df
@@ -0,0 +1,172 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Union
+
+import numpy as np
+import pandas as pd
+
+from open_aglabs.core.base_models import Location
+from open_aglabs.core.points import CategoryCodes, PointStoreWriter, read_point_chunks, read_point_store_meta
+from open_aglabs.core.units import HA_PER_AC
+from open_aglabs.planting.models import PlantingEvent
+
+# Output name -> column name in the planter log. Inputs are expected per row (or per section) in SI units:
+# seeding_rate in seeds/ha, depth in cm, speed in m/s, width (row or section width) in m and the optional interval in s.
+PLANTING_POINT_COLUMNS = {
+    "lat": "lat",
+    "lon": "lon",
+    "seeding_rate": "seeding_rate",
+    "variety": "variety",
+    "depth": "depth",
+    "speed": "speed",
+    "width": "width",
+    "interval": "interval",
+}
+
+PLANTING_POINT_DTYPES = {
+    "lat": "float64",
+    "lon": "float64",
+    "seeding_rate": "float32",
+    "depth": "float32",
+    "speed": "float32",
+    "width": "float32",
+    "interval": "float32",
+}
+
+# Seeding rates are computed in seeds/ha, this is the multiplier to the supported output units.
+SEEDING_UNITS = {
+    "seeds/ha": 1.0,
+    "seeds/acre": HA_PER_AC,
+    "seeds/ac": HA_PER_AC,
+}
+
+
+class AsPlantedAccumulator:
+    """
+    Keeps area weighted running totals per variety over chunks of planter points. Varieties are mapped to small
+    integer codes as they are first seen, so every chunk is reduced with np.bincount.
+    """
+
+    def __init__(self, interval_s: float = 1.0):
+        self.interval_s = interval_s
+        self.varieties = CategoryCodes()
+        self.area_m2 = np.zeros(0)
+        self.seeds = np.zeros(0)
+        self.depth_area = np.zeros(0)
+        self.depth_weight = np.zeros(0)
+        self.points = np.zeros(0, dtype=np.int64)
+
+    def update(self, chunk: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Adds a chunk and returns the variety codes of its points.
+        """
+        variety = chunk["variety"] if "variety" in chunk else np.full(len(chunk["seeding_rate"]), None)
+        codes = self.varieties.encode(variety)
+
+        interval = chunk.get("interval")
+        interval = self.interval_s if interval is None else np.asarray(interval, dtype=np.float64)
+        area = np.asarray(chunk["speed"], dtype=np.float64) * interval * np.asarray(chunk["width"], dtype=np.float64)
+        rate = np.asarray(chunk["seeding_rate"], dtype=np.float64)
+        valid = np.isfinite(area) & np.isfinite(rate)
+
+        n = len(self.varieties)
+        for name in ("area_m2", "seeds", "depth_area", "depth_weight", "points"):
+            current = getattr(self, name)
+            if len(current) < n:
+                setattr(self, name, np.concatenate([current, np.zeros(n - len(current), dtype=current.dtype)]))
+
+        c = codes[valid]
+        self.points += np.bincount(c, minlength=n)
+        self.area_m2 += np.bincount(c, weights=area[valid], minlength=n)
+        self.seeds += np.bincount(c, weights=(rate * area)[valid] / 10000.0, minlength=n)
+
+        if "depth" in chunk:
+            depth = np.asarray(chunk["depth"], dtype=np.float64)
+            has_depth = valid & np.isfinite(depth)
+            self.depth_area += np.bincount(codes[has_depth], weights=(depth * area)[has_depth], minlength=n)
+            self.depth_weight += np.bincount(codes[has_depth], weights=area[has_depth], minlength=n)
+        return codes
+
+    def summary(self) -> pd.DataFrame:
+        """
+        One row per variety with the planted area (ha), seeds and the area weighted rate (seeds/ha) and depth (cm),
+        sorted by area.
+        """
+        names = self.varieties.names
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df = pd.DataFrame({
+                "variety": names,
+                "points": self.points,
+                "area_ha": self.area_m2 / 10000.0,
+                "seeds": self.seeds,
+                "seeding_rate": self.seeds / (self.area_m2 / 10000.0),
+                "depth_cm": np.where(self.depth_weight > 0, self.depth_area / self.depth_weight, np.nan),
+            })
+        return df.sort_values("area_ha", ascending=False, ignore_index=True)
+
+
+def ingest_as_planted(path: Union[str, Path],
+                      event_id: str,
+                      timestamp: datetime,
+                      crop_type: str,
+                      out_path: Optional[Union[str, Path]] = None,
+                      columns: Optional[Dict[str, str]] = None,
+                      chunk_size: int = 500_000,
+                      interval_s: float = 1.0,
+                      seeding_unit: str = "seeds/acre",
+                      location: Optional[Location] = None,
+                      notes: Optional[str] = None) -> PlantingEvent:
+    """
+    Streams an as-planted log (CSV / GeoJSON) chunk by chunk into a PlantingEvent. The raw points are written to a
+    columnar point store referenced by file_path, with the variety stored as a code and the per variety summary
+    (see as_planted_variety_summary) kept in the store metadata.
+
+    seeding_rate and depth_cm are area weighted over the whole event, variety lists every variety by planted area.
+    """
+    if seeding_unit not in SEEDING_UNITS:
+        raise ValueError(f"Unknown seeding unit {seeding_unit}, the known units are {list(SEEDING_UNITS)}")
+
+    path = Path(path)
+    columns = PLANTING_POINT_COLUMNS if columns is None else {**PLANTING_POINT_COLUMNS, **columns}
+    out_path = path.with_suffix(".points") if out_path is None else Path(out_path)
+
+    accumulator = AsPlantedAccumulator(interval_s=interval_s)
+    dtypes = {**PLANTING_POINT_DTYPES, "variety": "int16"}
+    with PointStoreWriter(out_path, dtypes, metadata={"source": str(path), "event_id": event_id}) as writer:
+        for chunk in read_point_chunks(path, columns, ("lat", "lon", "seeding_rate", "speed", "width"), "planting",
+                                       chunk_size=chunk_size, dtypes=PLANTING_POINT_DTYPES):
+            writer.append({**chunk, "variety": accumulator.update(chunk)})
+
+        summary = accumulator.summary()
+        writer.metadata["variety_codes"] = accumulator.varieties.codes
+        writer.metadata["varieties"] = summary.replace({np.nan: None}).to_dict(orient="records")
+
+    area_ha = summary["area_ha"].sum()
+    seeding_rate = summary["seeds"].sum() / area_ha if area_ha > 0 else 0.0
+    depth_weight = accumulator.depth_weight.sum()
+    depth_cm = accumulator.depth_area.sum() / depth_weight if depth_weight > 0 else None
+    varieties = [v for v in summary.loc[summary["area_ha"] > 0, "variety"] if v != "unknown"]
+
+    return PlantingEvent(
+        id=event_id,
+        file_path=str(out_path),
+        location=location,
+        timestamp=timestamp,
+        crop_type=crop_type,
+        variety=varieties or None,
+        seeding_rate=seeding_rate * SEEDING_UNITS[seeding_unit],
+        seeding_unit=seeding_unit,
+        depth_cm=depth_cm,
+        notes=notes,
+    )
+
+
+def as_planted_variety_summary(event: PlantingEvent, seeding_unit: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reads the per variety summary written next to the points of an event ingested with ingest_as_planted.
+    """
+    meta = read_point_store_meta(event.file_path)
+    df = pd.DataFrame(meta["metadata"]["varieties"])
+    seeding_unit = event.seeding_unit if seeding_unit is None else seeding_unit
+    df["seeding_rate"] = df["seeding_rate"].astype(float) * SEEDING_UNITS[seeding_unit]
+    return df
@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -57,6 +57,12 @@ class PlantingEvent(BaseModel):
         description="Planting depth in centimeters.",
         examples=[5.0]
     )
+    variety_geometries: Optional[Dict[str, str]] = Field(
+        None,
+        alias="varietyGeometries",
+        description="The area planted with each variety as WKT in EPSG:4326, keyed by variety.",
+        examples=[{"Pioneer P1197AM": "POLYGON ((-118.79 34.56, -118.78 34.56, -118.78 34.57, -118.79 34.56))"}]
+    )
     notes: Optional[str] = Field(
         None,
         description="Any additional notes about the planting event."
@@ -0,0 +1,148 @@
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import shapely
+
+from open_aglabs.core.gis import transform_geometries, transform_xy, utm_crs
+from open_aglabs.core.points import content_hash, read_point_store, read_point_store_meta
+from open_aglabs.planting.models import PlantingEvent
+
+
+def swath_geometries(x: np.ndarray,
+                     y: np.ndarray,
+                     width: np.ndarray,
+                     codes: np.ndarray,
+                     max_gap_m: float = 10.0,
+                     simplify_m: float = 0.1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The ground covered by the logged points in projected coordinates (m), with the code of every geometry.
+
+    Points are expected in logging order, per row or per section. Consecutive points of the same variety closer
+    than max_gap_m form one run (a row or section pass), every run becomes a single linestring that is simplified
+    and buffered by half its median width with flat ends. A run of one point is buffered as a square of its width.
+    """
+    n = len(x)
+    if n == 0:
+        return np.empty(0, dtype=object), np.empty(0, dtype=codes.dtype)
+
+    step = np.hypot(np.diff(x), np.diff(y))
+    new_run = np.r_[True, (codes[1:] != codes[:-1]) | (step > max_gap_m)]
+    starts = np.flatnonzero(new_run)
+    counts = np.diff(np.r_[starts, n])
+    runs = np.cumsum(new_run) - 1
+
+    order = np.lexsort((width, runs))
+    run_width = width[order][starts + counts // 2]
+
+    lines = counts > 1
+    on_line = lines[runs]
+    line_index = np.cumsum(lines) - 1
+    line_geometries = shapely.linestrings(x[on_line], y[on_line], indices=line_index[runs[on_line]])
+    line_geometries = shapely.simplify(line_geometries, simplify_m)
+    line_geometries = shapely.buffer(line_geometries, run_width[lines] / 2.0, cap_style="flat")
+
+    single = starts[~lines]
+    squares = shapely.buffer(shapely.points(x[single], y[single]), width[single] / 2.0, cap_style="square")
+    return np.concatenate([line_geometries, squares]), np.concatenate([codes[starts[lines]], codes[single]])
+
+
+def dissolve_by_code(geometries: np.ndarray,
+                     codes: np.ndarray,
+                     tile_m: float = 250.0,
+                     grid_size: Optional[float] = 0.01) -> Dict[int, shapely.Geometry]:
+    """
+    Unions the geometries per code. The geometries are first grouped by (code, tile of their centroid) and every
+    group is dissolved with one union_all, the much smaller per tile results are then dissolved per code, so no
+    single union has to work through a whole field of overlapping swaths.
+    """
+    if len(geometries) == 0:
+        return {}
+
+    centroids = shapely.centroid(geometries)
+    tx = np.floor(shapely.get_x(centroids) / tile_m).astype(np.int64)
+    ty = np.floor(shapely.get_y(centroids) / tile_m).astype(np.int64)
+    order = np.lexsort((ty, tx, codes))
+    codes, tx, ty, geometries = codes[order], tx[order], ty[order], geometries[order]
+
+    new_group = np.r_[True, (codes[1:] != codes[:-1]) | (tx[1:] != tx[:-1]) | (ty[1:] != ty[:-1])]
+    starts = np.flatnonzero(new_group)
+    stops = np.r_[starts[1:], len(geometries)]
+    tiles = np.array([shapely.union_all(geometries[a:b], grid_size=grid_size) for a, b in zip(starts, stops)],
+                     dtype=object)
+    tile_codes = codes[starts]
+
+    dissolved = {}
+    for code in np.unique(tile_codes):
+        dissolved[int(code)] = shapely.union_all(tiles[tile_codes == code], grid_size=grid_size)
+    return dissolved
+
+
+def variety_cache_path(event: PlantingEvent, cache_dir: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Where the variety geometries of an event are cached, keyed by the content hash of its point store.
+    """
+    points = Path(event.file_path)
+    cache_dir = points.with_suffix(".varieties") if cache_dir is None else Path(cache_dir)
+    return cache_dir / f"{content_hash(points)}.json"
+
+
+def extract_variety_geometries(event: PlantingEvent,
+                               width_m: Optional[float] = None,
+                               max_gap_m: float = 10.0,
+                               tile_m: float = 250.0,
+                               simplify_m: float = 0.1,
+                               close_m: float = 0.25,
+                               cache_dir: Optional[Union[str, Path]] = None,
+                               use_cache: bool = True) -> PlantingEvent:
+    """
+    Builds the area planted with each variety of an event ingested with ingest_as_planted. The points are projected
+    to UTM, buffered into swaths (see swath_geometries) with the logged width or width_m, dissolved per variety, closed by
+    close_m (a buffer out and back in that removes the slivers GPS error leaves between neighbouring rows) and
+    simplified to simplify_m. Returns a copy of the event with variety_geometries as WKT in EPSG:4326.
+
+    The result is cached next to the point store (or in cache_dir) under the hash of the points and the settings,
+    so a log is only processed again when it changes.
+    """
+    settings = {"width_m": width_m, "max_gap_m": max_gap_m, "tile_m": tile_m, "simplify_m": simplify_m,
+                "close_m": close_m}
+    cache_path = variety_cache_path(event, cache_dir)
+    if use_cache and cache_path.exists():
+        cached = json.loads(cache_path.read_text())
+        if cached["settings"] == settings:
+            return event.model_copy(update={"variety_geometries": cached["geometries"]})
+
+    points = read_point_store(event.file_path)
+    lon, lat = np.asarray(points["lon"]), np.asarray(points["lat"])
+    if len(lon) == 0:
+        raise ValueError(f"Planting event {event.id} has no points in {event.file_path}")
+    if width_m is None and "width" not in points:
+        raise ValueError(f"Planting event {event.id} has no width column, width_m has to be given")
+
+    codes = np.asarray(points["variety"]) if "variety" in points else np.zeros(len(lon), dtype=np.int16)
+    width = np.full(len(lon), width_m, dtype=np.float64) if width_m is not None else \
+        np.asarray(points["width"], dtype=np.float64)
+    valid = np.isfinite(lon) & np.isfinite(lat) & np.isfinite(width) & (width > 0)
+
+    crs = utm_crs(lon[valid], lat[valid])
+    x, y = transform_xy(lon[valid], lat[valid], "EPSG:4326", crs)
+    swaths, swath_codes = swath_geometries(x, y, width[valid], codes[valid], max_gap_m=max_gap_m,
+                                           simplify_m=simplify_m)
+    dissolved = dissolve_by_code(swaths, swath_codes, tile_m=tile_m)
+
+    meta = read_point_store_meta(event.file_path)["metadata"]
+    names = {code: name for name, code in meta.get("variety_codes", {"unknown": 0}).items()}
+    geometries = {}
+    for code, geometry in dissolved.items():
+        if close_m > 0:
+            geometry = shapely.buffer(shapely.buffer(geometry, close_m, join_style="mitre"), -close_m,
+                                      join_style="mitre")
+        geometry = shapely.simplify(geometry, simplify_m)
+        geometry = transform_geometries(geometry, crs, "EPSG:4326")
+        geometries[names.get(code, str(code))] = shapely.to_wkt(geometry, rounding_precision=8)
+
+    if use_cache:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps({"settings": settings, "geometries": geometries}))
+    return event.model_copy(update={"variety_geometries": geometries})
@@ -0,0 +1,253 @@
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, Field, ConfigDict
+
+from open_aglabs.products.ingest import (CatalogModel, iter_product_batches, read_product_records,
+                                         validate_product_batch)
+from open_aglabs.products.models import PesticideProduct, Product
+
+# Product fields holding a PesticideProduct, their ingredients and crops are indexed with the product.
+PESTICIDE_FIELDS = ("herbicides", "insecticides", "fungicides", "nematicides", "growth_regulators", "other")
+
+_KINDS = {"product": Product, "pesticide": PesticideProduct}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    row INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    registration_id TEXT NOT NULL,
+    company TEXT NOT NULL,
+    company_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS entries_key ON entries (registration_id, kind);
+CREATE INDEX IF NOT EXISTS entries_company_key ON entries (company_key);
+CREATE TABLE IF NOT EXISTS ingredients (term TEXT NOT NULL, row INTEGER NOT NULL, PRIMARY KEY (term, row))
+    WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ingredients_row ON ingredients (row);
+CREATE TABLE IF NOT EXISTS crops (term TEXT NOT NULL, row INTEGER NOT NULL, PRIMARY KEY (term, row)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS crops_row ON crops (row);
+"""
+
+# The most host parameters of one lookup query.
+_LOOKUP_SIZE = 500
+
+
+@lru_cache(maxsize=65536)
+def catalog_key(value: str) -> str:
+    """
+    The lookup form of a company, ingredient or crop name: case folded with single spaces.
+    """
+    return " ".join(str(value).split()).casefold()
+
+
+class ProductLoadReport(BaseModel):
+    """
+    The outcome of a bulk load into a ProductCatalog.
+    """
+    added: int = Field(
+        0,
+        description="The number of products added to the catalog."
+    )
+    replaced: int = Field(
+        0,
+        description="The number of products that replaced the entry of the same kind and registration id."
+    )
+    rejected: Dict[int, str] = Field(
+        default_factory=dict,
+        description="The validation error of every rejected record, by its position in the input."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+
+def _terms(entry: CatalogModel):
+    if isinstance(entry, PesticideProduct):
+        pesticides = [entry]
+    else:
+        pesticides = [getattr(entry, field) for field in PESTICIDE_FIELDS if getattr(entry, field) is not None]
+    ingredients = {catalog_key(i.name) for p in pesticides for i in p.active_ingredient}
+    crops = {catalog_key(c) for p in pesticides for c in p.approved_crop}
+    return ingredients, crops
+
+
+class ProductCatalog:
+    """
+    A registration database of Product and PesticideProduct entries in SQLite, queried by registration id, company,
+    active ingredient and approved crop.
+
+    The registration id and company columns have their own indexes and the ingredients and crops of every entry
+    (for a Product, those of all its pesticide compositions) go into inverted term -> row tables clustered on the
+    term, so every lookup is an index seek. Entries are stored as their JSON, only the matches of a query are
+    parsed. With a file path the catalog persists and a later ProductCatalog(path) opens it without any loading,
+    the default ':memory:' catalog lives for the object only.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:"):
+        self.path = path
+        self.connection = sqlite3.connect(str(path))
+        # the catalog is rebuilt from its source files, so it trades crash safety for bulk load speed
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _rows(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        wanted = set(keys)
+        ids = list(dict.fromkeys(registration_id for _, registration_id in keys))
+        rows = {}
+        for start in range(0, len(ids), _LOOKUP_SIZE):
+            chunk = ids[start:start + _LOOKUP_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            sql = f"SELECT kind, registration_id, row FROM entries WHERE registration_id IN ({placeholders})"
+            for kind, registration_id, row in self.connection.execute(sql, chunk):
+                if (kind, registration_id) in wanted:
+                    rows[(kind, registration_id)] = row
+        return rows
+
+    def _upsert(self, entries: Iterable[CatalogModel]) -> Tuple[int, int]:
+        batch: Dict[Tuple[str, str], CatalogModel] = {}
+        for entry in entries:
+            if isinstance(entry, PesticideProduct):
+                batch[("pesticide", entry.regId)] = entry
+            else:
+                batch[("product", entry.registration_id)] = entry
+
+        existing = self._rows(list(batch))
+        row = self.connection.execute("SELECT COALESCE(MAX(row), 0) FROM entries").fetchone()[0]
+        rows, ingredients, crops = [], [], []
+        for (kind, registration_id), entry in batch.items():
+            if (kind, registration_id) in existing:
+                entry_row = existing[(kind, registration_id)]
+            else:
+                row += 1
+                entry_row = row
+            rows.append((entry_row, kind, registration_id, entry.company, catalog_key(entry.company), entry.name,
+                         entry.model_dump_json(by_alias=True, exclude_none=True)))
+            entry_ingredients, entry_crops = _terms(entry)
+            ingredients += [(term, entry_row) for term in entry_ingredients]
+            crops += [(term, entry_row) for term in entry_crops]
+
+        with self.connection:
+            replaced = [(r,) for r in existing.values()]
+            self.connection.executemany("DELETE FROM ingredients WHERE row = ?", replaced)
+            self.connection.executemany("DELETE FROM crops WHERE row = ?", replaced)
+            # a replaced entry keeps its row, and so its place in the catalog order
+            self.connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            # in key order the clustered term tables are appended to rather than split
+            self.connection.executemany("INSERT INTO ingredients VALUES (?, ?)", sorted(ingredients))
+            self.connection.executemany("INSERT INTO crops VALUES (?, ?)", sorted(crops))
+        return len(rows) - len(existing), len(existing)
+
+    def add(self, entries: Iterable[CatalogModel]) -> int:
+        """
+        Adds validated entries in one transaction and returns how many were new. An entry whose kind and
+        registration id are already in the catalog (EX: a file loaded again) replaces the stored entry and its
+        ingredients and crops, within one call the last one wins.
+        """
+        return self._upsert(entries)[0]
+
+    def load_records(self,
+                     records: Iterable[dict],
+                     model: Optional[Type[BaseModel]] = None,
+                     batch_size: int = 5000,
+                     errors: str = "raise") -> ProductLoadReport:
+        """
+        Validates raw records batch_size at a time (see validate_product_batch) and adds the valid ones. With
+        errors='raise' the first batch with a rejected record raises a ValueError before it is added, with
+        errors='skip' rejected records are reported and left out.
+        """
+        if errors not in ("raise", "skip"):
+            raise ValueError(f"errors has to be 'raise' or 'skip', got {errors}")
+
+        report = ProductLoadReport()
+        offset = 0
+        for batch in iter_product_batches(records, batch_size=batch_size):
+            valid, rejected = validate_product_batch(batch, model=model)
+            if len(rejected) > 0 and errors == "raise":
+                position, message = next(iter(rejected.items()))
+                raise ValueError(f"The product record {offset + position} is not valid: {message}")
+            report.rejected.update({offset + position: message for position, message in rejected.items()})
+            added, replaced = self._upsert(valid)
+            report.added += added
+            report.replaced += replaced
+            offset += len(batch)
+        return report
+
+    def load(self, path: Union[str, Path], **kwargs) -> ProductLoadReport:
+        """
+        Bulk loads a CSV, JSON or JSON lines file (see read_product_records and load_records).
+        """
+        return self.load_records(read_product_records(path), **kwargs)
+
+    def _entries(self, where: str, params: list, limit: Optional[int]) -> List[CatalogModel]:
+        sql = f"SELECT kind, data FROM entries WHERE {where} ORDER BY row"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [_KINDS[kind].model_validate_json(data) for kind, data in self.connection.execute(sql, params)]
+
+    def search(self,
+               registration_id: Optional[str] = None,
+               company: Optional[str] = None,
+               ingredient: Optional[str] = None,
+               crop: Optional[str] = None,
+               limit: Optional[int] = None) -> List[CatalogModel]:
+        """
+        The entries matching every given criterion, in the order they were added. Company, ingredient and crop
+        names match whatever their case and spacing.
+        """
+        where, params = [], []
+        if registration_id is not None:
+            where.append("registration_id = ?")
+            params.append(registration_id)
+        if company is not None:
+            where.append("company_key = ?")
+            params.append(catalog_key(company))
+        if ingredient is not None:
+            where.append("row IN (SELECT row FROM ingredients WHERE term = ?)")
+            params.append(catalog_key(ingredient))
+        if crop is not None:
+            where.append("row IN (SELECT row FROM crops WHERE term = ?)")
+            params.append(catalog_key(crop))
+        return self._entries(" AND ".join(where) or "1", params, limit)
+
+    def get(self, registration_id: str) -> List[CatalogModel]:
+        return self.search(registration_id=registration_id)
+
+    def by_company(self, company: str, limit: Optional[int] = None) -> List[CatalogModel]:
+        return self.search(company=company, limit=limit)
+
+    def by_ingredient(self, ingredient: str, limit: Optional[int] = None) -> List[CatalogModel]:
+        return self.search(ingredient=ingredient, limit=limit)
+
+    def by_crop(self, crop: str, limit: Optional[int] = None) -> List[CatalogModel]:
+        return self.search(crop=crop, limit=limit)
+
+    def names(self) -> List[Tuple[str, str]]:
+        """
+        The (registration_id, name) of every entry, in the order they were added.
+        """
+        return self.connection.execute("SELECT registration_id, name FROM entries ORDER BY row").fetchall()
+
+    def ingredients(self) -> List[str]:
+        return [term for term, in self.connection.execute("SELECT DISTINCT term FROM ingredients ORDER BY term")]
+
+    def crops(self) -> List[str]:
+        return [term for term, in self.connection.execute("SELECT DISTINCT term FROM crops ORDER BY term")]
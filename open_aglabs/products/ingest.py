@@ -0,0 +1,116 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from open_aglabs.products.models import PesticideProduct, Product
+
+# List cells of a flat CSV row, EX: 'Corn;Soybeans' and 'Glyphosate:41;2,4-D:15'.
+CSV_LIST_SEPARATOR = ";"
+CSV_PERCENTAGE_SEPARATOR = ":"
+
+CatalogModel = Union[Product, PesticideProduct]
+
+_ADAPTERS = {model: TypeAdapter(List[model]) for model in (Product, PesticideProduct)}
+
+
+def record_model(record: dict) -> Type[BaseModel]:
+    """
+    Whether a raw record is a PesticideProduct (it has a regId) or a Product.
+    """
+    return PesticideProduct if "regId" in record else Product
+
+
+def _csv_value(column: str, value: str):
+    value = value.strip()
+    if value == "":
+        return None
+    if value[0] in "[{":
+        return json.loads(value)
+    if column == "approved_crop":
+        return [crop.strip() for crop in value.split(CSV_LIST_SEPARATOR) if crop.strip()]
+    if column == "active_ingredient":
+        ingredients = []
+        for item in value.split(CSV_LIST_SEPARATOR):
+            name, _, percentage = item.rpartition(CSV_PERCENTAGE_SEPARATOR)
+            ingredients.append({"name": name.strip(), "percentage": percentage.strip()})
+        return ingredients
+    return value
+
+
+def read_product_records(path: Union[str, Path]) -> Iterator[dict]:
+    """
+    Streams the raw records of a product file: a JSON list, JSON lines (.jsonl) or a CSV with one product per row.
+    CSV cells holding JSON (starting with [ or {) are parsed, so nested Product fields can be given as JSON, and the
+    approved_crop and active_ingredient columns of a PesticideProduct also take the flat forms 'Corn;Soybeans' and
+    'Glyphosate:41;2,4-D:15'. Empty CSV cells are left out.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            for n, row in enumerate(csv.DictReader(f), start=2):
+                if None in row:
+                    raise ValueError(f"The line {n} of {path} has more cells than there are columns")
+                record = {}
+                for column, value in row.items():
+                    value = _csv_value(column, value or "")
+                    if value is not None:
+                        record[column] = value
+                yield record
+    elif suffix in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        yield from (data if isinstance(data, list) else [data])
+    else:
+        raise ValueError(f"Unknown product file type {suffix}, use .csv, .json or .jsonl")
+
+
+def validate_product_batch(records: List[dict],
+                           model: Optional[Type[BaseModel]] = None) -> Tuple[List[CatalogModel], Dict[int, str]]:
+    """
+    Validates a batch of raw records as Product or PesticideProduct (by record_model when model is not given).
+    Each model's records go through one list validation, the errors of that pass name the rejected records.
+    Returns the valid models in order and the error of every rejected record by its position in the batch.
+    """
+    groups: Dict[Type[BaseModel], List[int]] = {}
+    for i, record in enumerate(records):
+        groups.setdefault(model or record_model(record), []).append(i)
+
+    valid: Dict[int, CatalogModel] = {}
+    errors: Dict[int, str] = {}
+    for group_model, index in groups.items():
+        adapter = _ADAPTERS.get(group_model) or TypeAdapter(List[group_model])
+        batch = [records[i] for i in index]
+        try:
+            models = adapter.validate_python(batch)
+        except ValidationError as e:
+            bad = {}
+            for error in e.errors():
+                position = error["loc"][0]
+                field = ".".join(str(part) for part in error["loc"][1:])
+                bad.setdefault(position, f"{field}: {error['msg']}")
+            for position, message in bad.items():
+                errors[index[position]] = message
+            index = [i for position, i in enumerate(index) if position not in bad]
+            models = adapter.validate_python([records[i] for i in index])
+        valid.update(zip(index, models))
+
+    return [valid[i] for i in sorted(valid)], dict(sorted(errors.items()))
+
+
+def iter_product_batches(records: Iterable[dict], batch_size: int = 5000) -> Iterator[List[dict]]:
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if len(batch) == 0:
+            return
+        yield batch
@@ -0,0 +1,238 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from open_aglabs.applicator.models import ApplicationEvent
+from open_aglabs.products.catalog import ProductCatalog
+
+NGRAM_SIZE = 3
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name: str) -> str:
+    """
+    The matching form of a product name: case folded, anything but letters and digits turned into single spaces.
+    """
+    return _NON_ALNUM.sub(" ", str(name).casefold()).strip()
+
+
+def name_ngrams(name: str, n: int = NGRAM_SIZE) -> List[str]:
+    """
+    The character n-grams of a normalized name padded with a space on both sides, EX: ' ro', 'rou', ... 'up '.
+    """
+    padded = f" {name} "
+    return [padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))]
+
+
+class ProductMatcher:
+    """
+    Resolves free text product names (EX: ApplicationEvent.mix_name typed by an operator) to catalog entries.
+
+    Every name and alias of the catalog is split into character trigrams weighted by TF-IDF (sublinear term
+    frequency, L2 normalized), stored twice in flat CSR style arrays: as an inverted index (trigram -> names) and
+    per name (name -> trigrams). A batch of queries is resolved in two vectorized steps:
+
+    - candidates: the postings of the rarest trigrams of every query, up to probe_budget postings per query, are
+      gathered at once and summed per (query, name) pair, the best `candidates` names of every query are kept.
+      Common trigrams (EX: ' pr') would add long postings for little weight, a typo in one rare trigram still
+      leaves the others to find the name.
+    - rescoring: the full cosine similarity of every query with its candidates, from the per name trigrams.
+
+    Resolutions are cached by normalized name, so repeated names across millions of records are only scored once.
+    """
+
+    def __init__(self,
+                 names: Sequence[str],
+                 keys: Sequence[str],
+                 min_score: float = 0.3,
+                 candidates: int = 16,
+                 probe_budget: int = 1000,
+                 chunk_size: int = 2048):
+        if len(names) == 0:
+            raise ValueError("A ProductMatcher needs at least one name")
+        if len(names) != len(keys):
+            raise ValueError(f"{len(names)} names were given for {len(keys)} keys")
+        self.names = np.array(names, dtype=object)
+        self.keys = np.array(keys, dtype=object)
+        self.min_score = min_score
+        self.candidates = candidates
+        self.probe_budget = probe_budget
+        self.chunk_size = chunk_size
+        self.cache: Dict[str, Tuple[int, float]] = {}
+
+        grams, name_idx = [], []
+        for i, name in enumerate(self.names):
+            name_grams = name_ngrams(normalize_name(name))
+            grams += name_grams
+            name_idx += [i] * len(name_grams)
+        codes, vocabulary = pd.factorize(pd.Series(grams, dtype=object))
+        self.vocabulary = {g: i for i, g in enumerate(vocabulary)}
+        n_grams = len(vocabulary)
+
+        # term frequency per (name, gram), then the document frequency of every gram
+        pair, counts = np.unique(np.array(name_idx, dtype=np.int64) * n_grams + codes, return_counts=True)
+        name_idx, gram = pair // n_grams, pair % n_grams
+        self.df = np.bincount(gram, minlength=n_grams)
+        self.idf = np.log((1.0 + len(self.names)) / (1.0 + self.df)) + 1.0
+        weight = (1.0 + np.log(counts)) * self.idf[gram]
+        weight /= np.sqrt(np.bincount(name_idx, weights=weight ** 2, minlength=len(self.names)))[name_idx]
+
+        # per name, sorted by (name, gram) as np.unique left them
+        self.name_indptr = np.r_[0, np.cumsum(np.bincount(name_idx, minlength=len(self.names)))]
+        self.name_grams = gram
+        self.name_weights = weight
+
+        # inverted index, sorted by (gram, name)
+        order = np.argsort(gram, kind="stable")
+        self.indptr = np.r_[0, np.cumsum(self.df)]
+        self.posting_names = name_idx[order]
+        self.posting_weights = weight[order]
+
+    @classmethod
+    def from_catalog(cls, catalog: ProductCatalog, aliases: Optional[Dict[str, Iterable[str]]] = None, **kwargs):
+        """
+        A matcher over the names of every catalog entry, plus extra aliases by registration id (EX: {'524-549':
+        ['RU PMax', 'Roundup PM']}). Matches are keyed by registration id.
+        """
+        keys, names = [], []
+        for registration_id, name in catalog.names():
+            keys.append(registration_id)
+            names.append(name)
+        for registration_id, alias_names in (aliases or {}).items():
+            for alias in alias_names:
+                keys.append(registration_id)
+                names.append(alias)
+        return cls(names, keys, **kwargs)
+
+    def _query_grams(self, queries: Sequence[str]):
+        """
+        The (query, gram, weight) of the known grams of every query, sorted by query and gram.
+        """
+        query_idx, gram = [], []
+        for i, query in enumerate(queries):
+            codes = [self.vocabulary.get(g) for g in name_ngrams(query)]
+            codes = [c for c in codes if c is not None]
+            query_idx += [i] * len(codes)
+            gram += codes
+        pair, counts = np.unique(np.array(query_idx, dtype=np.int64) * len(self.df) + np.array(gram, dtype=np.int64),
+                                 return_counts=True)
+        query_idx, gram = pair // len(self.df), pair % len(self.df)
+        weight = (1.0 + np.log(counts)) * self.idf[gram]
+        weight /= np.sqrt(np.bincount(query_idx, weights=weight ** 2, minlength=len(queries)))[query_idx]
+        return query_idx, gram, weight
+
+    def _candidates(self, query_idx, gram, weight):
+        """
+        The (query, name) candidate pairs from the rarest grams of every query, the best few per query.
+        """
+        order = np.lexsort((self.df[gram], query_idx))
+        query_idx, gram, weight = query_idx[order], gram[order], weight[order]
+        lengths = self.df[gram]
+        starts = np.r_[0, np.flatnonzero(np.diff(query_idx)) + 1]
+        seen = np.cumsum(lengths)
+        seen -= np.repeat(seen[starts] - lengths[starts], np.diff(np.r_[starts, len(gram)]))
+        probe = seen <= self.probe_budget
+        probe[starts] = True
+        query_idx, gram, weight, lengths = query_idx[probe], gram[probe], weight[probe], lengths[probe]
+
+        owner = np.repeat(np.arange(len(gram)), lengths)
+        positions = np.repeat(self.indptr[gram] - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+        key = query_idx[owner] * len(self.names) + self.posting_names[positions]
+        key, inverse = np.unique(key, return_inverse=True)
+        partial = np.bincount(inverse, weights=weight[owner] * self.posting_weights[positions], minlength=len(key))
+        pair_query, pair_name = key // len(self.names), key % len(self.names)
+
+        # rank the names of every query by partial score and keep the first few
+        order = np.lexsort((-partial, pair_query))
+        pair_query, pair_name = pair_query[order], pair_name[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(pair_query)) + 1]
+        rank = np.arange(len(pair_query)) - np.repeat(starts, np.diff(np.r_[starts, len(pair_query)]))
+        keep = rank < self.candidates
+        return pair_query[keep], pair_name[keep]
+
+    def _rescore(self, pair_query, pair_name, query_idx, gram, weight) -> np.ndarray:
+        """
+        The cosine similarity of every (query, name) pair, over all their grams.
+        """
+        lengths = self.name_indptr[pair_name + 1] - self.name_indptr[pair_name]
+        owner = np.repeat(np.arange(len(pair_name)), lengths)
+        positions = np.repeat(self.name_indptr[pair_name] - (np.cumsum(lengths) - lengths), lengths) + \
+            np.arange(lengths.sum())
+
+        # the query grams are sorted by (query, gram), so every name gram finds its query weight by binary search
+        query_keys = query_idx * len(self.df) + gram
+        key = pair_query[owner] * len(self.df) + self.name_grams[positions]
+        found = np.minimum(np.searchsorted(query_keys, key), len(query_keys) - 1)
+        shared = query_keys[found] == key
+        return np.bincount(owner[shared], weights=weight[found[shared]] * self.name_weights[positions[shared]],
+                           minlength=len(pair_name))
+
+    def _score(self, queries: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The best name index (-1 for none) and its cosine score for every normalized query, chunk_size queries at a
+        time.
+        """
+        best = np.full(len(queries), -1, dtype=np.int64)
+        best_score = np.zeros(len(queries))
+        for start in range(0, len(queries), self.chunk_size):
+            query_idx, gram, weight = self._query_grams(queries[start:start + self.chunk_size])
+            if len(gram) == 0:
+                continue
+            pair_query, pair_name = self._candidates(query_idx, gram, weight)
+            scores = self._rescore(pair_query, pair_name, query_idx, gram, weight)
+
+            # the highest score per query, the first name on ties
+            order = np.lexsort((pair_name, -scores, pair_query))
+            top = order[np.r_[True, np.diff(pair_query[order]) != 0]]
+            best[start + pair_query[top]] = pair_name[top]
+            best_score[start + pair_query[top]] = scores[top]
+        return best, best_score
+
+    def clear_cache(self):
+        self.cache.clear()
+
+    def match(self, mix_names: Iterable[str]) -> pd.DataFrame:
+        """
+        Resolves a batch of names. Returns one row per name with the matched key, matched_name and score (cosine
+        similarity of the trigram vectors), key and matched_name are None below min_score and for missing names
+        (None / NaN).
+        """
+        mix_names = pd.Series(list(mix_names), dtype=object)
+        codes, unique = pd.factorize(mix_names)
+        # one slot per distinct name plus a trailing empty one, which the missing names (code -1) pick
+        key = np.full(len(unique) + 1, None, dtype=object)
+        name = np.full(len(unique) + 1, None, dtype=object)
+        score = np.zeros(len(unique) + 1)
+        if len(unique) > 0:
+            normalized = pd.Series([normalize_name(n) for n in unique], dtype=object)
+            new = [n for n in pd.unique(normalized) if n not in self.cache]
+            if len(new) > 0:
+                best, best_score = self._score(new)
+                self.cache.update(zip(new, zip(best.tolist(), best_score.tolist())))
+
+            resolved = [self.cache[n] for n in normalized]
+            index = np.array([r[0] for r in resolved], dtype=np.int64)
+            score[:-1] = [r[1] for r in resolved]
+            found = (index >= 0) & (score[:-1] >= self.min_score)
+            index = np.where(found, index, 0)
+            key[:-1] = np.where(found, self.keys[index], None)
+            name[:-1] = np.where(found, self.names[index], None)
+
+        return pd.DataFrame({
+            "mix_name": mix_names.to_numpy(),
+            "key": key[codes],
+            "matched_name": name[codes],
+            "score": score[codes],
+        })
+
+    def match_events(self, events: Iterable[ApplicationEvent]) -> pd.DataFrame:
+        """
+        Resolves the mix_name of every event, see match, with the event_id in front.
+        """
+        events = list(events)
+        df = self.match([e.mix_name for e in events])
+        df.insert(0, "event_id", [e.id for e in events])
+        return df
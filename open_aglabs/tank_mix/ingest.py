@@ -0,0 +1,128 @@
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from open_aglabs.applicator.models import ApplicatorRx
+from open_aglabs.core.gis import equal_area_m2
+from open_aglabs.core.units import UNITS, UNIT_DEFINITIONS, MASS_PER_AREA, normalize_unit
+from open_aglabs.tank_mix.models import TankMix
+
+TANK_TOTAL_COLUMNS = ["tank_id", "product_id", "product_name", "amount_units", "area_ha", "amount"]
+
+
+def rx_zone_frame(rxs: Iterable[ApplicatorRx]) -> pd.DataFrame:
+    """
+    One row per zone of every prescription with its rate and area. The zones of all prescriptions sharing a CRS are
+    parsed and measured together (see equal_area_m2), so hundreds of fields cost a handful of vectorized calls.
+    """
+    rows = {"rx_id": [], "zone_id": [], "tank_id": [], "tank_mix": [], "rate": [], "rate_units": [], "crs": [],
+            "geometry": []}
+    for rx in rxs:
+        n = len(rx.zones)
+        rows["rx_id"] += [rx.id] * n
+        rows["zone_id"] += [z.id for z in rx.zones]
+        rows["tank_id"] += [z.tank_id for z in rx.zones]
+        rows["tank_mix"] += [z.tank_mix for z in rx.zones]
+        rows["rate"] += [z.rate for z in rx.zones]
+        rows["rate_units"] += [rx.units] * n
+        rows["crs"] += [rx.crs] * n
+        rows["geometry"] += [z.geometry for z in rx.zones]
+
+    df = pd.DataFrame(rows)
+    area = np.zeros(len(df))
+    for crs, index in df.groupby("crs").indices.items():
+        area[index] = equal_area_m2(shapely.from_wkt(df["geometry"].to_numpy()[index]), crs)
+    df["area_ha"] = area / 10000.0
+    return df.drop(columns=["geometry"])
+
+
+def mix_product_frame(mixes: Iterable[TankMix]) -> pd.DataFrame:
+    """
+    One row per product of every tank mix, keyed by the mix id the zones of a prescription refer to in tank_mix.
+    """
+    rows = []
+    for mix in mixes:
+        for product in mix.mix_content:
+            rows.append({
+                "tank_mix": mix.id,
+                "product_id": product.product_id,
+                "product_name": product.product_name,
+                "amount_units": product.amount_units,
+                "product_rate": product.rate,
+                "product_rate_units": product.rate_units,
+                "ratio": product.ratio,
+            })
+    return pd.DataFrame(rows, columns=["tank_mix", "product_id", "product_name", "amount_units", "product_rate",
+                                       "product_rate_units", "ratio"])
+
+
+def _base_rate_units(units: np.ndarray) -> np.ndarray:
+    lookup = {u: ("kg/ha" if UNIT_DEFINITIONS[normalize_unit(u)][0] == MASS_PER_AREA else "l/ha")
+              for u in pd.unique(units)}
+    return np.array([lookup[u] for u in units], dtype=object)
+
+
+def tank_mix_totals(rxs: Iterable[ApplicatorRx],
+                    mixes: Iterable[TankMix],
+                    densities: Optional[Dict[str, float]] = None,
+                    by: Sequence[str] = ("tank_id",)) -> pd.DataFrame:
+    """
+    The total amount of every product needed to apply the prescriptions, per tank_id (or the columns in by, EX:
+    ['rx_id', 'tank_id'] for every field).
+
+    The zone rate is the rate of the whole mix and a product with a ratio (%) takes that share of it, a product
+    without a ratio is applied at its own rate wherever the mix goes. Amounts are converted to the amount_units of
+    the product, moving between volume and mass needs the product density in kg/l from densities (by product_id).
+    Every zone has to refer to a known mix id, mix ids have to be unique and every product needs a ratio or a rate
+    with its rate_units.
+    """
+    zones = rx_zone_frame(rxs)
+    mixes = list(mixes)
+    ids = pd.Series([mix.id for mix in mixes], dtype=object)
+    if ids.duplicated().any():
+        raise ValueError(f"The tank mix ids {sorted(set(ids[ids.duplicated()]))} are used by more than one mix")
+    products = mix_product_frame(mixes)
+
+    unknown = sorted(set(zones["tank_mix"]) - set(products["tank_mix"]))
+    if len(unknown) > 0:
+        raise ValueError(f"The prescriptions use the unknown tank mixes {unknown}")
+    missing = products.loc[products["ratio"].isna() & products["product_rate"].isna(), "product_id"]
+    if len(missing) > 0:
+        raise ValueError(f"The products {sorted(set(missing))} have neither a ratio nor a rate")
+    missing = products.loc[products["ratio"].isna() & products["product_rate_units"].isna(), "product_id"]
+    if len(missing) > 0:
+        raise ValueError(f"The products {sorted(set(missing))} have a rate but no rate_units")
+
+    df = zones.merge(products, on="tank_mix", how="inner")
+    if len(df) == 0:
+        return pd.DataFrame(columns=list(by) + TANK_TOTAL_COLUMNS[1:])
+
+    from_ratio = df["ratio"].notna().to_numpy()
+    rate = np.where(from_ratio, df["rate"] * df["ratio"].fillna(0.0) / 100.0, df["product_rate"].fillna(0.0))
+    rate_units = np.where(from_ratio, df["rate_units"], df["product_rate_units"])
+
+    # rate -> kg/ha or l/ha -> kg or l over the zone -> the amount units of the product
+    base_rate_units = _base_rate_units(rate_units)
+    base_amount = np.empty(len(df))
+    area_ha = df["area_ha"].to_numpy()
+    for units in ("kg/ha", "l/ha"):
+        mask = base_rate_units == units
+        if np.any(mask):
+            base_amount[mask] = UNITS.convert(rate[mask], rate_units[mask], units) * area_ha[mask]
+    base_amount_units = np.where(base_rate_units == "kg/ha", "kg", "l")
+
+    density = np.full(len(df), np.nan) if densities is None else \
+        df["product_id"].map(densities).to_numpy(dtype=np.float64)
+    amount = np.empty(len(df))
+    for to_units, index in df.groupby("amount_units").indices.items():
+        amount[index] = UNITS.convert(base_amount[index], base_amount_units[index], to_units, density=density[index])
+    if np.isnan(amount).any():
+        products = sorted(set(df.loc[np.isnan(amount), "product_id"]))
+        raise ValueError(f"The products {products} need a density (kg/l) to convert their rate to the amount units")
+    df["amount"] = amount
+
+    keys = list(by) + ["product_id", "product_name", "amount_units"]
+    totals = df.groupby(keys, sort=True).agg(area_ha=("area_ha", "sum"), amount=("amount", "sum"))
+    return totals.reset_index()
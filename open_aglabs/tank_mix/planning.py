@@ -0,0 +1,396 @@
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field, ConfigDict
+
+from open_aglabs.applicator.models import ApplicatorRx
+from open_aglabs.core.units import UNITS, UNIT_DEFINITIONS, MASS_PER_AREA, normalize_unit
+from open_aglabs.tank_mix.ingest import rx_zone_frame, tank_mix_totals
+from open_aglabs.tank_mix.models import TankMix
+
+# Tank volumes within this many liters of a full load do not need another one.
+LOAD_TOLERANCE_L = 1e-6
+
+
+class TankLoad(BaseModel):
+    """
+    One fill of a sprayer tank and the fields it is sprayed on, in spraying order.
+    """
+    sprayer_id: str = Field(
+        ...,
+        description="The sprayer the load is mixed for."
+    )
+    sequence: int = Field(
+        ...,
+        ge=1,
+        description="The position of the load in the day of the sprayer, starting at 1."
+    )
+    volume_l: float = Field(
+        ...,
+        ge=0,
+        description="The volume of mix in the tank in l."
+    )
+    fields: Dict[str, float] = Field(
+        ...,
+        description="The prescriptions (rx id) sprayed with this load and the volume (l) going to each."
+    )
+    mix: TankMix = Field(
+        ...,
+        description="The tank mix with the amount of every product to put in this load."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+
+class LoadPlan(BaseModel):
+    """
+    The loads of every sprayer for a batch of prescriptions.
+    """
+    loads: List[TankLoad] = Field(
+        default_factory=list,
+        description="Every load, by sprayer and in order."
+    )
+    total_loads: int = Field(
+        0,
+        description="The number of tank fills of all the sprayers."
+    )
+    max_sprayer_loads: int = Field(
+        0,
+        description="The number of fills of the busiest sprayer."
+    )
+    unused_capacity_l: float = Field(
+        0.0,
+        description="The tank capacity left empty over all the loads, where the last load of a mix is not full."
+    )
+
+    model_config = ConfigDict(
+        extra="forbid"
+    )
+
+    def sprayer_loads(self, sprayer_id: str) -> List[TankLoad]:
+        return [load for load in self.loads if load.sprayer_id == sprayer_id]
+
+
+def _mix_lookup(mixes: Iterable[TankMix]) -> Dict[str, TankMix]:
+    lookup = {}
+    for mix in mixes:
+        if mix.id in lookup:
+            raise ValueError(f"The tank mix id {mix.id} is used by more than one mix")
+        lookup[mix.id] = mix
+    return lookup
+
+
+def job_volumes(rxs: Iterable[ApplicatorRx],
+                mixes: Iterable[TankMix],
+                mix_densities: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    The volume of mix (l) every prescription needs of every tank mix it uses, one row (job) per rx_id and mix_id.
+    Zones refer to their mix by id. Prescriptions with mass rates need the density (kg/l) of the mix in
+    mix_densities, by mix id.
+    """
+    lookup = _mix_lookup(mixes)
+    zones = rx_zone_frame(rxs)
+    unknown = sorted(set(zones["tank_mix"]) - set(lookup))
+    if len(unknown) > 0:
+        raise ValueError(f"The prescriptions use the unknown tank mixes {unknown}")
+    zones["mix_id"] = zones["tank_mix"]
+
+    volume = np.empty(len(zones))
+    mass = zones["rate_units"].map(lambda u: UNIT_DEFINITIONS[normalize_unit(u)][0] == MASS_PER_AREA).to_numpy(
+        dtype=bool)
+    rates = zones["rate"].to_numpy(dtype=np.float64)
+    area = zones["area_ha"].to_numpy()
+    if np.any(~mass):
+        volume[~mass] = UNITS.convert(rates[~mass], zones["rate_units"].to_numpy()[~mass], "l/ha") * area[~mass]
+    if np.any(mass):
+        density = zones.loc[mass, "mix_id"].map(mix_densities or {}).to_numpy(dtype=np.float64)
+        if np.isnan(density).any():
+            missing = sorted(set(zones.loc[mass, "mix_id"][np.isnan(density)]))
+            raise ValueError(f"The tank mixes {missing} need a density (kg/l) for prescriptions with mass rates")
+        volume[mass] = UNITS.convert(rates[mass], zones["rate_units"].to_numpy()[mass], "l/ha", density=density) \
+            * area[mass]
+
+    zones["volume_l"] = volume
+    jobs = zones.groupby(["rx_id", "mix_id"], sort=False).agg(volume_l=("volume_l", "sum")).reset_index()
+    return jobs[jobs["volume_l"] > 0].reset_index(drop=True)
+
+
+class _Assignment:
+    """
+    The volume of every mix on every sprayer for an assignment of jobs, with the load counts it implies. A sprayer
+    carries on with the rest of a load from one field into the next that uses the same mix, so it needs
+    ceil(volume / capacity) loads of every mix.
+
+    The cost is the total loads plus makespan_weight times the loads of the busiest sprayer, less a small reward
+    for filling the last load of every mix (the squared fill, as in bin packing local search). The reward is too
+    small to outweigh a load and it gives the search a slope to follow where moving a job changes no load count.
+    """
+
+    def __init__(self, job_mix: np.ndarray, job_volume: np.ndarray, capacity: np.ndarray, n_mixes: int,
+                 makespan_weight: float):
+        self.job_mix = job_mix
+        self.job_volume = job_volume
+        self.capacity = capacity
+        self.n_mixes = n_mixes
+        self.weight = makespan_weight
+        self.fill_weight = 1.0 / (len(capacity) * n_mixes + 1)
+
+    def loads(self, volume, capacity):
+        return np.ceil(np.maximum(volume, 0.0) / capacity - LOAD_TOLERANCE_L / capacity)
+
+    def fill(self, volume, capacity):
+        full = np.maximum(volume, 0.0) / capacity
+        return (full - np.floor(full + LOAD_TOLERANCE_L / capacity)) ** 2
+
+    def state(self, job_sprayer):
+        volume = np.zeros((len(self.capacity), self.n_mixes))
+        np.add.at(volume, (job_sprayer, self.job_mix), self.job_volume)
+        sprayer_loads = self.loads(volume, self.capacity[:, None]).sum(axis=1)
+        return volume, sprayer_loads
+
+    def cost(self, volume, sprayer_loads):
+        fill = self.fill(volume, self.capacity[:, None]).sum()
+        return sprayer_loads.sum() + self.weight * sprayer_loads.max() - self.fill_weight * fill
+
+    def change(self, volume, sprayer, mix, delta):
+        """
+        The change in loads of sprayer, and in the fill reward, when delta l of mix are added to it.
+        """
+        capacity = self.capacity[sprayer]
+        current = volume[sprayer, mix]
+        loads = self.loads(current + delta, capacity) - self.loads(current, capacity)
+        fill = self.fill(current + delta, capacity) - self.fill(current, capacity)
+        return loads, fill
+
+    def makespan(self, sprayer_loads, a, b, loads_a, loads_b):
+        """
+        The load count of the busiest sprayer after the sprayers a and b change to loads_a and loads_b.
+        """
+        order = np.argsort(-sprayer_loads)[:3]
+        rest = np.zeros(np.broadcast(a, b).shape)
+        found = np.zeros(rest.shape, dtype=bool)
+        for k in order:
+            use = (~found) & (a != k) & (b != k)
+            rest[use] = sprayer_loads[k]
+            found |= use
+        return np.maximum(np.maximum(loads_a, loads_b), rest)
+
+    def delta(self, sprayer_loads, a, b, da, db, fill):
+        """
+        The cost change of moving loads between the sprayers a and b, da and db being their load changes.
+        """
+        makespan = self.makespan(sprayer_loads, a, b, sprayer_loads[a] + da, sprayer_loads[b] + db)
+        return da + db + self.weight * (makespan - sprayer_loads.max()) - self.fill_weight * fill
+
+
+def _greedy(model: _Assignment, order: np.ndarray) -> np.ndarray:
+    """
+    Best fit decreasing: the biggest jobs first, each to the sprayer where it adds the least cost, ties going to
+    the sprayer with the fewest loads and then the biggest tank.
+    """
+    n_sprayers = len(model.capacity)
+    sprayers = np.arange(n_sprayers)
+    volume = np.zeros((n_sprayers, model.n_mixes))
+    sprayer_loads = np.zeros(n_sprayers)
+    job_sprayer = np.zeros(len(model.job_volume), dtype=np.int64)
+    for job in order:
+        mix = model.job_mix[job]
+        added, fill = model.change(volume, sprayers, mix, model.job_volume[job])
+        makespan = np.maximum(sprayer_loads + added, sprayer_loads.max())
+        cost = added + model.weight * makespan - model.fill_weight * fill
+        best = np.lexsort((-model.capacity, sprayer_loads, cost))[0]
+        job_sprayer[job] = best
+        volume[best, mix] += model.job_volume[job]
+        sprayer_loads[best] += added[best]
+    return job_sprayer
+
+
+def _moves(model: _Assignment, job_sprayer, volume, sprayer_loads) -> np.ndarray:
+    """
+    The (jobs, sprayers) cost changes of moving every job to every other sprayer.
+    """
+    a = job_sprayer[:, None]
+    b = np.arange(len(model.capacity))[None, :]
+    mix = model.job_mix[:, None]
+    v = model.job_volume[:, None]
+
+    da, fill_a = model.change(volume, a, mix, -v)
+    db, fill_b = model.change(volume, b, mix, v)
+    return np.where(a == b, np.inf, model.delta(sprayer_loads, a, b, da, db, fill_a + fill_b))
+
+
+def _swaps(model: _Assignment, job_sprayer, volume, sprayer_loads) -> np.ndarray:
+    """
+    The (jobs, jobs) cost changes of swapping the sprayers of two jobs, only i < j on different sprayers is set.
+    """
+    a = job_sprayer[:, None]
+    b = job_sprayer[None, :]
+    mi = model.job_mix[:, None]
+    mj = model.job_mix[None, :]
+    vi = model.job_volume[:, None]
+    vj = model.job_volume[None, :]
+
+    # with the same mix only one volume changes on each side, otherwise two
+    same = mi == mj
+    da, fill_a = model.change(volume, a, mi, np.where(same, vj - vi, -vi))
+    db, fill_b = model.change(volume, b, mi, np.where(same, vi - vj, vi))
+    da2, fill_a2 = model.change(volume, a, mj, vj)
+    db2, fill_b2 = model.change(volume, b, mj, -vj)
+    da = np.where(same, da, da + da2)
+    db = np.where(same, db, db + db2)
+    fill = np.where(same, fill_a + fill_b, fill_a + fill_b + fill_a2 + fill_b2)
+    return np.where(np.triu(a != b, k=1), model.delta(sprayer_loads, a, b, da, db, fill), np.inf)
+
+
+def _apply_moves(model: _Assignment, job_sprayer, gains: np.ndarray, base_cost: float) -> bool:
+    """
+    Applies the improving moves of a round that touch different sprayers, the best first. Moves on other sprayers
+    only interact through the busiest sprayer, so the combined cost is checked and, if it got worse, only the best
+    move is kept.
+    """
+    best = np.min(gains, axis=1)
+    jobs = np.flatnonzero(best < -1e-9)
+    if len(jobs) == 0:
+        return False
+
+    targets = np.argmin(gains, axis=1)
+    used = np.zeros(len(model.capacity), dtype=bool)
+    moved = job_sprayer.copy()
+    for job in jobs[np.argsort(best[jobs], kind="stable")]:
+        a, b = job_sprayer[job], targets[job]
+        if used[a] or used[b]:
+            continue
+        moved[job] = b
+        used[a] = used[b] = True
+
+    if model.cost(*model.state(moved)) < base_cost - 1e-9:
+        job_sprayer[:] = moved
+    else:
+        job = jobs[np.argmin(best[jobs])]
+        job_sprayer[job] = targets[job]
+    return True
+
+
+def assign_jobs(job_mix: np.ndarray,
+                job_volume: np.ndarray,
+                capacity: np.ndarray,
+                makespan_weight: float = 1.0,
+                time_limit_s: float = 0.5,
+                max_swap_jobs: int = 1000) -> np.ndarray:
+    """
+    Assigns jobs (a mix code and a volume each) to sprayers (tank capacities), minimizing the total number of loads
+    plus makespan_weight times the loads of the busiest sprayer. Returns the sprayer index of every job.
+
+    A best fit decreasing greedy start is improved by local search: every round evaluates all the moves of one job
+    to another sprayer (and, when no move helps, all swaps of two jobs) in one vectorized pass and applies the best
+    ones, until nothing improves or time_limit_s is used up. Swaps are skipped above max_swap_jobs jobs.
+    """
+    job_mix = np.asarray(job_mix, dtype=np.int64)
+    job_volume = np.asarray(job_volume, dtype=np.float64)
+    capacity = np.asarray(capacity, dtype=np.float64)
+    if len(capacity) == 0:
+        raise ValueError("There are no sprayers to plan loads for")
+    if np.any(capacity <= 0):
+        raise ValueError("Every sprayer needs a tank capacity above 0")
+    if len(job_volume) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    model = _Assignment(job_mix, job_volume, capacity, int(job_mix.max()) + 1, makespan_weight)
+    job_sprayer = _greedy(model, np.argsort(-job_volume, kind="stable"))
+    if len(capacity) == 1:
+        return job_sprayer
+
+    deadline = time.perf_counter() + time_limit_s
+    while time.perf_counter() < deadline:
+        volume, sprayer_loads = model.state(job_sprayer)
+        base_cost = model.cost(volume, sprayer_loads)
+        if _apply_moves(model, job_sprayer, _moves(model, job_sprayer, volume, sprayer_loads), base_cost):
+            continue
+        if len(job_volume) > max_swap_jobs:
+            break
+        gains = _swaps(model, job_sprayer, volume, sprayer_loads)
+        i, j = np.unravel_index(np.argmin(gains), gains.shape)
+        if gains[i, j] >= -1e-9:
+            break
+        job_sprayer[i], job_sprayer[j] = job_sprayer[j], job_sprayer[i]
+    return job_sprayer
+
+
+def plan_tank_loads(rxs: Iterable[ApplicatorRx],
+                    mixes: Iterable[TankMix],
+                    sprayers: Dict[str, float],
+                    mix_densities: Optional[Dict[str, float]] = None,
+                    product_densities: Optional[Dict[str, float]] = None,
+                    makespan_weight: float = 1.0,
+                    time_limit_s: float = 0.5) -> LoadPlan:
+    """
+    Plans the tank loads to spray a batch of prescriptions (EX: a day of jobs) with a fleet of sprayers, given as
+    sprayer id -> tank capacity in l.
+
+    Every prescription and mix it uses is one job, sprayed whole by one sprayer (see assign_jobs for the
+    objective). A sprayer works through its mixes one at a time, the biggest first, and through the fields of a
+    mix from the biggest down, starting the next field with what is left in the tank, so only the last load of a
+    mix is not full. Each load comes with its TankMix, the products scaled to the share of every field's product
+    totals it carries (see tank_mix_totals for product_densities).
+    """
+    rxs = list(rxs)
+    mixes = list(mixes)
+    lookup = _mix_lookup(mixes)
+    jobs = job_volumes(rxs, mixes, mix_densities=mix_densities)
+    sprayer_ids = list(sprayers)
+    capacity = np.array([sprayers[s] for s in sprayer_ids], dtype=np.float64)
+
+    mix_codes, _ = pd.factorize(jobs["mix_id"])
+    jobs["sprayer"] = assign_jobs(mix_codes, jobs["volume_l"].to_numpy(), capacity,
+                                  makespan_weight=makespan_weight, time_limit_s=time_limit_s)
+
+    products = tank_mix_totals(rxs, mixes, densities=product_densities, by=["rx_id", "tank_mix"])
+    products = products.groupby(["rx_id", "tank_mix", "product_id"])["amount"].sum()
+
+    plan = LoadPlan()
+    for sprayer, sprayer_jobs in jobs.groupby("sprayer", sort=True):
+        sprayer_id = sprayer_ids[sprayer]
+        size = capacity[sprayer]
+        mix_volume = sprayer_jobs.groupby("mix_id")["volume_l"].sum().sort_values(ascending=False, kind="stable")
+        sequence = 0
+        for mix_id in mix_volume.index:
+            mix = lookup[mix_id]
+            fields = sprayer_jobs[sprayer_jobs["mix_id"] == mix_id].sort_values("volume_l", ascending=False,
+                                                                                  kind="stable")
+            loads: List[Dict[str, float]] = []
+            space = 0.0
+            for rx_id, volume in zip(fields["rx_id"], fields["volume_l"]):
+                while volume > LOAD_TOLERANCE_L:
+                    if space <= LOAD_TOLERANCE_L:
+                        loads.append({})
+                        space = size
+                    part = min(volume, space)
+                    loads[-1][rx_id] = loads[-1].get(rx_id, 0.0) + part
+                    volume -= part
+                    space -= part
+
+            job_volume = dict(zip(fields["rx_id"], fields["volume_l"]))
+            for load in loads:
+                sequence += 1
+                content = []
+                for product in mix.mix_content:
+                    amount = sum(products.get((rx_id, mix_id, product.product_id), 0.0) * part / job_volume[rx_id]
+                                 for rx_id, part in load.items())
+                    content.append(product.model_copy(update={"amount": float(amount)}))
+                plan.loads.append(TankLoad(
+                    sprayer_id=sprayer_id,
+                    sequence=sequence,
+                    volume_l=float(sum(load.values())),
+                    fields={rx_id: float(part) for rx_id, part in load.items()},
+                    mix=TankMix(id=f"{sprayer_id}-load-{sequence}", name=mix.name, mix_content=content),
+                ))
+            plan.unused_capacity_l += float(space)
+
+    per_sprayer = pd.Series([load.sprayer_id for load in plan.loads], dtype=object).value_counts()
+    plan.total_loads = len(plan.loads)
+    plan.max_sprayer_loads = int(per_sprayer.max()) if len(per_sprayer) > 0 else 0
+    return plan
@@ -0,0 +1,51 @@
+import argparse
+import time
+
+import numpy as np
+
+from open_aglabs.applicator.lookup import RxLookup
+from open_aglabs.applicator.prescription import rx_from_array
+from open_aglabs.core.gis import GridSpec, transform_xy
+
+
+def make_rx(size: int, n_classes: int):
+    # a smooth 5 m grid over size x size cells around (-93, 42) classified into rate zones
+    spec = GridSpec(crs="EPSG:32615", x_min=500000.0, y_max=4650000.0, resolution=5.0, width=size, height=size)
+    rows, cols = np.mgrid[0:size, 0:size]
+    values = 3.0 + np.sin(cols / 40.0) + np.cos(rows / 30.0)
+    return rx_from_array(values, spec, rx_id="RX-BENCH", units="kg/ha", n_classes=n_classes, implement_width=10.0,
+                         crs="EPSG:4326"), spec
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures RxLookup point queries per second.")
+    parser.add_argument("--size", type=int, default=400, help="The prescription grid size in 5 m cells.")
+    parser.add_argument("--classes", type=int, default=5, help="The number of rate classes.")
+    parser.add_argument("--batches", type=int, nargs="+", default=[100, 1000, 10000, 100000],
+                        help="The batch sizes to time.")
+    parser.add_argument("--seconds", type=float, default=1.0, help="How long to time every batch size.")
+    args = parser.parse_args()
+
+    rx, spec = make_rx(args.size, args.classes)
+    start = time.perf_counter()
+    lookup = RxLookup(rx)
+    print(f"{len(rx.zones)} zones, lookup built in {time.perf_counter() - start:.3f} s")
+
+    rng = np.random.default_rng(0)
+    extent = args.size * spec.resolution
+    for batch in args.batches:
+        x = spec.x_min + rng.uniform(0, extent, batch)
+        y = spec.y_max - rng.uniform(0, extent, batch)
+        lon, lat = transform_xy(x, y, spec.crs, "EPSG:4326")
+
+        queries = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.seconds:
+            lookup.query(lon, lat)
+            queries += batch
+        rate = queries / (time.perf_counter() - start)
+        print(f"batch {batch:>7}: {rate:,.0f} lookups/s")
+
+
+if __name__ == "__main__":
+    main()
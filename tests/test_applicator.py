@@ -1,6 +1,23 @@
+import xml.etree.ElementTree as ET
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
 import pytest
-from open_aglabs.applicator.models import ApplicatorZone, ApplicationEvent
+import shapely
+from open_aglabs.applicator.ingest import ingest_as_applied, as_applied_product_summary
+from open_aglabs.applicator.prescription import jenks_breaks, rx_from_array, rx_from_grid
+from open_aglabs.applicator.validation import validate_rx
+from open_aglabs.applicator.export import export_fields, write_isoxml, write_rx
+from open_aglabs.applicator.lookup import RxLookup
+from open_aglabs.applicator.models import ApplicatorZone, ApplicationEvent, ApplicatorRx
+from open_aglabs.applicator.zonal import rx_zonal_statistics, rx_zonal_yield
 from open_aglabs.core.base_models import Location
+from open_aglabs.core.constants import AMOUNT_UNITS
+from open_aglabs.core.gis import GridSpec, create_grid, transform_xy
+from open_aglabs.core.points import read_point_store_meta
+from open_aglabs.harvest.ingest import ingest_yield_monitor
+from open_aglabs.harvest.raster import rasterize_harvest_event
 from pydantic import ValidationError
 
 from datetime import datetime
@@ -124,3 +141,321 @@ def test_extra_field_in_application_event():
     with pytest.raises(ValidationError):
         ApplicationEvent(**invalid_data)
 
+
+def make_rx(zones, crs="EPSG:4326", units="l/ha"):
+    return ApplicatorRx(schema_name="ApplicatorRx", eventId="RX-1", crs=crs, units=units, zones=zones)
+
+
+def test_zonal_statistics_per_rx_zone():
+    rx = make_rx([
+        {"id": "zone-1", "geometry": "POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0))", "tank_id": "T1",
+         "tank_mix": "mix-a", "rate": 2.5},
+        {"id": "zone-2", "geometry": "POLYGON ((10 0, 20 0, 20 10, 10 10, 10 0))", "tank_id": "T2",
+         "tank_mix": "mix-b", "rate": 5.0},
+        {"id": "zone-3", "geometry": "POLYGON ((50 50, 60 50, 60 60, 50 60, 50 50))", "tank_id": "T2",
+         "tank_mix": "mix-b", "rate": 1.0},
+    ])
+    lon = np.array([1.0, 2.0, 3.0, 15.0, 16.0, 30.0, 4.0])
+    lat = np.array([1.0, 2.0, 3.0, 5.0, 5.0, 5.0, 4.0])
+    values = np.array([1.0, 2.0, 3.0, 10.0, 20.0, 99.0, np.nan])
+
+    df = rx_zonal_statistics(rx, lon, lat, values, chunk_size=3)
+    assert df.index.tolist() == ["zone-1", "zone-2", "zone-3"]
+    assert df["count"].tolist() == [3, 2, 0]
+    assert df["sum"].tolist() == [6.0, 30.0, 0.0]
+    assert df.loc["zone-2", "mean"] == 15.0
+    assert np.isnan(df.loc["zone-3", "mean"])
+    assert df.loc["zone-1", "tank_id"] == "T1"
+    assert df.loc["zone-2", "rate"] == 5.0
+
+
+def test_zonal_statistics_reprojects_points():
+    # a 100 m square in UTM 15N around (-93, 42)
+    x0, y0 = 500000.0, 4649776.0
+    rx = make_rx([{"id": "zone-1", "tank_id": "T1", "tank_mix": "mix-a", "rate": 1.0,
+                   "geometry": f"POLYGON (({x0} {y0}, {x0 + 100} {y0}, {x0 + 100} {y0 + 100}, {x0} {y0 + 100}, "
+                               f"{x0} {y0}))"}], crs="EPSG:32615")
+    df = rx_zonal_statistics(rx, np.array([-92.9995, -92.99]), np.array([42.0004, 42.0004]), np.array([1.0, 1.0]))
+    assert df.loc["zone-1", "count"] == 1
+
+
+def test_rx_zonal_yield_cleans_points(tmp_path):
+    # five 120 m passes, 10 m apart, over two 60 m wide zones in UTM 15N
+    x0, y0 = 500000.0, 4650000.0
+    along = np.arange(60) * 2.0
+    x = x0 + np.concatenate([along if p % 2 == 0 else along[::-1] for p in range(5)])
+    y = y0 + np.repeat(np.arange(5) * 10.0, 60)
+    lon, lat = transform_xy(x, y, "EPSG:32615", "EPSG:4326")
+    rng = np.random.default_rng(0)
+    log = pd.DataFrame({"lat": lat, "lon": lon, "mass_flow": rng.normal(10.0, 0.5, len(x)),
+                        "moisture": np.full(len(x), 18.0), "speed": np.full(len(x), 2.0),
+                        "swath": np.full(len(x), 10.0)})
+    log.loc[75, "mass_flow"] = 500.0
+    log.to_csv(tmp_path / "yield.csv", index=False)
+    event = ingest_yield_monitor(tmp_path / "yield.csv", event_id="HARV-1", timestamp=datetime(2025, 10, 1))
+
+    zones = [{"id": f"zone-{i}", "tank_id": "T1", "tank_mix": "m", "rate": 1.0,
+              "geometry": f"POLYGON (({x0 + d} {y0 - 5}, {x0 + d + 60} {y0 - 5}, {x0 + d + 60} {y0 + 45}, "
+                          f"{x0 + d} {y0 + 45}, {x0 + d} {y0 - 5}))"} for i, d in enumerate((-1.0, 59.0))]
+    rx = make_rx(zones, crs="EPSG:32615")
+
+    raw = rx_zonal_yield(rx, event, keep=np.ones(len(x), dtype=bool))
+    assert raw["count"].sum() == len(x)
+    assert raw.loc["zone-1", "mean"] > 5500.0
+
+    cleaned = rx_zonal_yield(rx, event)
+    assert 0 < cleaned["count"].sum() < len(x)
+    # 10 kg/s over 2 m/s * 10 m is 5000 kg/ha once the spike is trimmed
+    assert cleaned["mean"].tolist() == pytest.approx([5000.0, 5000.0], rel=0.02)
+
+    with pytest.raises(ValueError, match="keep mask"):
+        rx_zonal_yield(rx, event, keep=np.ones(10, dtype=bool))
+    with pytest.raises(ValueError, match="point store"):
+        rx_zonal_yield(rx, rasterize_harvest_event(event, resolution=20.0))
+
+
+def make_applied_log(n=300):
+    # a sprayer putting 20 gal/ac of two products over a 30 m swath at 4 m/s
+    return pd.DataFrame({
+        "lat": 42.0 + np.arange(n) * 4e-5,
+        "lon": np.full(n, -93.0),
+        "rate": np.full(n, 20.0),
+        "product": ["UAN-28"] * (2 * n // 3) + ["Glyphosate"] * (n - 2 * n // 3),
+        "speed": np.full(n, 4.0),
+        "swath": np.full(n, 30.0),
+    })
+
+
+def test_ingest_as_applied(tmp_path):
+    path = tmp_path / "applied.csv"
+    make_applied_log().to_csv(path, index=False)
+
+    event = ingest_as_applied(path, event_id="APP-1", timestamp=datetime(2025, 6, 1), log_rate_unit="gal/acre",
+                              chunk_size=64, rate_unit_out="L/ha")
+    area_ha = 300 * 4.0 * 30.0 / 10000.0
+    assert event.rate_unit == "l/ha"
+    assert event.rate == pytest.approx(20.0 * 3.785411784 / 0.40468564224)
+    assert event.area == pytest.approx(area_ha)
+    assert event.amount == pytest.approx(event.rate * area_ha)
+    assert event.amount_units == "l"
+    assert event.mix_name == "UAN-28"
+    assert event.file_path == str(tmp_path / "applied.points")
+
+    summary = as_applied_product_summary(event, rate_unit_out="gal/ac").set_index("product")
+    assert summary.loc["Glyphosate", "rate"] == pytest.approx(20.0)
+    assert summary.loc["UAN-28", "points"] == 200
+
+
+def test_ingest_as_applied_mass_amount_units(tmp_path):
+    path = tmp_path / "applied.csv"
+    make_applied_log(30).to_csv(path, index=False)
+
+    event = ingest_as_applied(path, event_id="APP-3", timestamp=datetime(2025, 6, 1), log_rate_unit="lbs/ac")
+    assert event.amount_units == "Kg"
+    assert event.amount_units in AMOUNT_UNITS
+    summary = as_applied_product_summary(event).set_index("product")
+    assert summary.loc["UAN-28", "rate"] == pytest.approx(20.0)
+
+
+def test_ingest_as_applied_closes_store_on_error(tmp_path):
+    path = tmp_path / "applied.csv"
+    df = make_applied_log(100)
+    df["speed"] = df["speed"].astype(object)
+    df.loc[70, "speed"] = "broken"
+    df.to_csv(path, index=False)
+
+    with pytest.raises(ValueError):
+        ingest_as_applied(path, event_id="APP-4", timestamp=datetime(2025, 6, 1), log_rate_unit="gal/ac",
+                          chunk_size=32)
+    meta = read_point_store_meta(tmp_path / "applied.points")
+    assert meta["count"] == 64
+    assert meta["complete"] is False
+
+    # a log that fails before its first chunk leaves no store behind
+    make_applied_log(10).drop(columns=["swath"]).to_csv(tmp_path / "noswath.csv", index=False)
+    with pytest.raises(ValueError, match="missing the columns"):
+        ingest_as_applied(tmp_path / "noswath.csv", event_id="APP-5", timestamp=datetime(2025, 6, 1),
+                          log_rate_unit="gal/ac")
+    assert not (tmp_path / "noswath.points").exists()
+
+
+def test_ingest_as_applied_rejects_non_rate_units(tmp_path):
+    path = tmp_path / "applied.csv"
+    make_applied_log(10).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        ingest_as_applied(path, event_id="APP-2", timestamp=datetime(2025, 6, 1), log_rate_unit="bu/ac")
+
+
+def test_jenks_breaks_finds_natural_groups():
+    values = np.r_[np.full(10, 1.0), np.full(10, 5.0), np.full(10, 9.0)]
+    assert jenks_breaks(values, 3).tolist() == [5.0, 9.0]
+
+
+def test_rx_from_array_zones():
+    spec = GridSpec(crs="EPSG:32615", x_min=500000.0, y_max=4650000.0, resolution=10.0, width=20, height=10)
+    values = np.tile(np.r_[np.full(10, 100.0), np.full(10, 200.0)], (10, 1))
+    values[0, 0] = np.nan
+
+    rx = rx_from_array(values, spec, rx_id="RX-2", units="kg/ha", n_classes=2, method="jenks",
+                       implement_width=1.0, tank_id=["T1", "T2"], tank_mix="urea")
+    assert [z.id for z in rx.zones] == ["zone-1", "zone-2"]
+    assert [z.rate for z in rx.zones] == [100.0, 200.0]
+    assert [z.tank_id for z in rx.zones] == ["T1", "T2"]
+
+    geometries = shapely.from_wkt([z.geometry for z in rx.zones])
+    assert shapely.area(geometries).tolist() == pytest.approx([99 * 100.0, 100 * 100.0])
+    assert shapely.area(shapely.intersection(*geometries)) == 0.0
+
+
+def test_rx_from_grid_reprojects(tmp_path):
+    spec = GridSpec(crs="EPSG:32615", x_min=500000.0, y_max=4650000.0, resolution=10.0, width=4, height=4)
+    grid = create_grid(tmp_path / "yield.grid.npy", spec, ["mean", "count"])
+    grid[0] = np.arange(16, dtype=np.float32).reshape(4, 4)
+    grid.flush()
+
+    rx = rx_from_grid(tmp_path / "yield.grid.npy", rx_id="RX-3", units="L/ha", band="mean", n_classes=4,
+                      rates=[1.0, 2.0, 3.0, 4.0], crs="EPSG:4326")
+    assert rx.crs == "EPSG:4326"
+    assert rx.units == "l/ha"
+    assert len(rx.zones) == 4
+    assert shapely.from_wkt(rx.zones[0].geometry).bounds[0] == pytest.approx(-93.0, abs=1e-3)
+    with pytest.raises(ValueError):
+        rx_from_grid(tmp_path / "yield.grid.npy", rx_id="RX-3", units="l/ha", band="median")
+
+
+def test_validate_rx_reports_offending_zones():
+    rx = make_rx([
+        {"id": "a", "geometry": "POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0))", "tank_id": "T1", "tank_mix": "m",
+         "rate": 1.0},
+        {"id": "b", "geometry": "POLYGON ((8 0, 20 0, 20 10, 8 10, 8 0))", "tank_id": "T1", "tank_mix": "m",
+         "rate": 2.0},
+        {"id": "c", "geometry": "POLYGON ((0 10, 10 10, 10 15, 0 15, 0 10))", "tank_id": "T1", "tank_mix": "m",
+         "rate": 3.0},
+        {"id": "d", "geometry": "POLYGON ((0 0, 1 1", "tank_id": "T1", "tank_mix": "m", "rate": 1.0},
+        {"id": "e", "geometry": "POLYGON ((0 0, 1 1, 1 0, 0 1, 0 0))", "tank_id": "T1", "tank_mix": "m",
+         "rate": 1.0},
+        {"id": "c", "geometry": "POINT (1 1)", "tank_id": "T1", "tank_mix": "m", "rate": 1.0},
+    ], crs="EPSG:32615")
+
+    report = validate_rx(rx, boundary="POLYGON ((0 0, 20 0, 20 20, 0 20, 0 0))")
+    assert report.duplicate_ids == ["c"]
+    assert report.invalid_wkt == ["d", "c"]
+    assert report.invalid_geometry == ["e"]
+    assert [(o.zone_id, o.other_zone_id, o.area_m2) for o in report.overlaps] == [("a", "b", 20.0)]
+    assert report.gap_area_m2 == pytest.approx(20 * 20 - 200 - 50)
+    assert report.outside_zones == []
+    assert not report.is_valid()
+
+
+def test_validate_rx_reports_nested_zones():
+    rx = make_rx([
+        {"id": "outer", "geometry": "POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0))", "tank_id": "T1", "tank_mix": "m",
+         "rate": 1.0},
+        {"id": "inner", "geometry": "POLYGON ((4 4, 6 4, 6 6, 4 6, 4 4))", "tank_id": "T1", "tank_mix": "m",
+         "rate": 2.0},
+        {"id": "next", "geometry": "POLYGON ((10 0, 20 0, 20 10, 10 10, 10 0))", "tank_id": "T1", "tank_mix": "m",
+         "rate": 3.0},
+    ], crs="EPSG:32615")
+
+    report = validate_rx(rx, boundary="POLYGON ((0 0, 20 0, 20 10, 0 10, 0 0))")
+    assert [(o.zone_id, o.other_zone_id, o.area_m2) for o in report.overlaps] == [("outer", "inner", 4.0)]
+    assert report.gap_area_m2 == pytest.approx(0.0)
+    assert not report.is_valid()
+
+
+def test_validate_rx_accepts_generated_prescription():
+    spec = GridSpec(crs="EPSG:32615", x_min=500000.0, y_max=4650000.0, resolution=10.0, width=30, height=30)
+    rng = np.random.default_rng(0)
+    rx = rx_from_array(rng.uniform(50, 150, size=(30, 30)), spec, rx_id="RX-4", units="kg/ha", n_classes=4,
+                       implement_width=20.0, crs="EPSG:4326")
+    boundary = "POLYGON ((500000 4649700, 500300 4649700, 500300 4650000, 500000 4650000, 500000 4649700))"
+
+    report = validate_rx(rx, boundary=boundary, boundary_crs="EPSG:32615", tolerance_m2=1.0)
+    assert report.overlaps == []
+    assert report.gap_area_m2 < 1.0
+    assert report.is_valid(max_gap_m2=1.0)
+
+
+def test_rx_lookup_matches_point_in_polygon():
+    rx = make_rx([
+        {"id": "zone-1", "geometry": "POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0))", "tank_id": "T1",
+         "tank_mix": "mix-a", "rate": 2.5},
+        {"id": "zone-2", "geometry": "POLYGON ((10 0, 20 0, 15 10, 10 10, 10 0))", "tank_id": "T2",
+         "tank_mix": "mix-b", "rate": 5.0},
+        {"id": "zone-3", "geometry": "POLYGON ((5 5, 8 5, 8 8, 5 8, 5 5))", "tank_id": "T3",
+         "tank_mix": "mix-c", "rate": 1.0},
+    ])
+    lookup = RxLookup(rx, cells=16)
+
+    rng = np.random.default_rng(0)
+    lon, lat = rng.uniform(-2, 22, 5000), rng.uniform(-2, 12, 5000)
+    df = lookup.query(lon, lat)
+
+    geometries = shapely.from_wkt([z.geometry for z in rx.zones])
+    expected = np.full(len(lon), "", dtype=object)
+    for zone, geometry in zip(reversed(rx.zones), reversed(geometries)):
+        expected[shapely.contains_xy(geometry, lon, lat)] = zone.id
+    assert df["zone_id"].fillna("").tolist() == expected.tolist()
+
+    row = lookup.query(np.array([6.0, 15.0, 30.0]), np.array([6.0, 2.0, 2.0]))
+    assert row["zone_id"].fillna("").tolist() == ["zone-1", "zone-2", ""]
+    assert row["tank_mix"].tolist()[:2] == ["mix-a", "mix-b"]
+    assert np.isnan(row.loc[2, "rate"])
+
+
+def make_utm_rx(rx_id="RX-5"):
+    x0, y0 = 500000.0, 4650000.0
+    return ApplicatorRx(schema_name="ApplicatorRx", eventId=rx_id, crs="EPSG:32615", units="lbs/ac", zones=[
+        {"id": "zone-1", "geometry": f"POLYGON (({x0} {y0}, {x0 + 50} {y0}, {x0 + 50} {y0 + 100}, {x0} {y0 + 100}, "
+                                     f"{x0} {y0}))", "tank_id": "T1", "tank_mix": "urea", "rate": 100.0},
+        {"id": "zone-2", "geometry": f"POLYGON (({x0 + 50} {y0}, {x0 + 100} {y0}, {x0 + 100} {y0 + 100}, "
+                                     f"{x0 + 50} {y0 + 100}, {x0 + 50} {y0}))", "tank_id": "T1", "tank_mix": "urea",
+         "rate": 200.0},
+    ])
+
+
+@pytest.mark.parametrize("suffix", [".gpkg", ".shp"])
+def test_write_rx_streams_batches(tmp_path, suffix):
+    rxs = (make_utm_rx(f"RX-{i}") for i in range(5))
+    written = write_rx(rxs, tmp_path / f"rx{suffix}", batch_size=2)
+    assert written == 10
+
+    frame = gpd.read_file(tmp_path / f"rx{suffix}")
+    assert len(frame) == 10
+    assert frame.crs.to_epsg() == 4326
+    assert sorted(frame["rx_id"].unique()) == [f"RX-{i}" for i in range(5)]
+    assert frame.loc[frame["zone_id"] == "zone-2", "rate"].tolist() == [200.0] * 5
+
+
+def test_write_isoxml_rate_grid(tmp_path):
+    path = write_isoxml([make_utm_rx()], tmp_path / "TASKDATA", cell_size_m=10.0)
+    root = ET.parse(path).getroot()
+    assert root.tag == "ISO11783_TaskData"
+    assert root.find("PDT").get("B") == "urea"
+    assert root.find("TSK/TZN/PDV").get("A") == "0006"
+
+    grid = root.find("TSK/GRD")
+    assert grid.get("I") == "2"
+    rows, cols = int(grid.get("F")), int(grid.get("E"))
+    values = np.fromfile(tmp_path / "TASKDATA" / f"{grid.get('G')}.BIN", dtype="<i4").reshape(rows, cols)
+    # lbs/ac to mg/m2
+    expected = np.round(np.array([100.0, 200.0]) * 0.45359237 / 0.40468564224 * 100.0)
+    assert values[rows // 2, 1] == expected[0]
+    assert values[rows // 2, cols - 2] == expected[1]
+
+
+def test_export_fields(tmp_path):
+    paths = export_fields([make_utm_rx("RX-6"), make_utm_rx("RX-7")], tmp_path, fmt="gpkg", processes=1)
+    assert paths == [tmp_path / "RX-6.gpkg", tmp_path / "RX-7.gpkg"]
+    assert len(gpd.read_file(paths[1])) == 2
+    with pytest.raises(ValueError):
+        export_fields([make_utm_rx()], tmp_path, fmt="kml")
+
+
+def test_export_fields_rejects_duplicate_ids(tmp_path):
+    with pytest.raises(ValueError, match="RX-8"):
+        export_fields([make_utm_rx("RX-8"), make_utm_rx("RX-9"), make_utm_rx("RX-8")], tmp_path, processes=1)
+    assert list(tmp_path.iterdir()) == []
+
+    with pytest.raises(ValueError, match="RX-8"):
+        write_rx((make_utm_rx("RX-8") for _ in range(3)), tmp_path / "rx.gpkg", batch_size=2)
@@ -0,0 +1,424 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from open_aglabs.core.constants import CROP_NUTRIENT_REMOVAL
+from open_aglabs.core.units import HA_PER_AC, KG_PER_LB
+from open_aglabs.field_management.ingest import FieldManagementBuilder, read_event_file
+from open_aglabs.field_management.lazy import LazyFieldManagement
+from open_aglabs.field_management.models import FieldManagement, TillageEvent
+from open_aglabs.field_management.runner import run_field_pipeline
+from open_aglabs.field_management.seasons import SeasonIndex, parse_season_key, parse_season_keys
+from open_aglabs.field_management.timeline import EventTimeline
+from open_aglabs.field_management.nutrients import nutrient_budget
+from open_aglabs.harvest.models import HarvestEvent
+from open_aglabs.planting.models import PlantingEvent
+from open_aglabs.products.models import Product
+from open_aglabs.tank_mix.models import TankMix
+
+
+def make_field(field_id="FIELD-A", seasons=("2025:us:corn:spring",)):
+    return FieldManagement(fieldId=field_id, seasons=list(seasons), application_events=[
+        {"Id": f"{field_id}-APP-1", "timestamp": "2025-05-01T00:00:00Z", "mixName": "Starter", "mixId": "MIX-1",
+         "applicationRate": 200.0, "rateUnit": "kg/ha"},
+        {"Id": f"{field_id}-APP-2", "timestamp": "2025-06-01T00:00:00Z", "mixName": "UAN", "mixId": None,
+         "applicationRate": 100.0, "rateUnit": "lbs/ac"},
+        {"Id": f"{field_id}-APP-3", "timestamp": "2025-06-15T00:00:00Z", "mixName": "Mystery", "mixId": None,
+         "applicationRate": 10.0, "rateUnit": "l/ha"},
+    ], harvest_events=[
+        {"Id": f"{field_id}-H-1", "timestamp": "2025-10-01T00:00:00Z", "harvestType": "Destructive",
+         "mass": 10000.0, "mass_units": "kg", "area": 1.0, "area_units": "ha", "cropNominalMoisture": 15.5,
+         "nominal_mass_units": "lbs"},
+    ])
+
+
+def make_products():
+    return [
+        Product(name="Urea", productId="urea", company="Co", registrationId="R-1",
+                nutrientComposition={"nitrogen": 46.0, "phosphorous": 0.0, "potassium": 0.0}),
+        Product(name="MAP", productId="map", company="Co", registrationId="R-2",
+                nutrientComposition={"nitrogen": 11.0, "phosphorous": 52.0, "potassium": 0.0}),
+        Product(name="UAN", productId="uan", company="Co", registrationId="R-3",
+                nutrientComposition={"nitrogen": 28.0, "phosphorous": 0.0, "potassium": 0.0}),
+    ]
+
+
+def make_mix():
+    return TankMix(id="MIX-1", name="Starter", mix_content=[
+        {"product_id": "urea", "product_name": "Urea", "amount": 0.0, "amount_units": "Kg", "ratio": 50.0},
+        {"product_id": "map", "product_name": "MAP", "amount": 0.0, "amount_units": "Kg", "ratio": 50.0},
+    ])
+
+
+def test_nutrient_budget_per_field_and_season():
+    budget = nutrient_budget([make_field()], mixes=[make_mix()], products=make_products())
+    assert len(budget) == 1
+    row = budget.iloc[0]
+    assert row["season"] == "2025:us:corn:spring"
+    assert row["crop"] == "corn"
+
+    uan_n = 100.0 * KG_PER_LB / HA_PER_AC * 0.28
+    assert row["n_applied"] == pytest.approx(100.0 * 0.46 + 100.0 * 0.11 + uan_n)
+    assert row["p_applied"] == pytest.approx(100.0 * 0.52)
+    assert row["k_applied"] == pytest.approx(0.0)
+    # the l/ha application has neither a known mix nor a density
+    assert row["unresolved_applications"] == 1
+
+    removal = CROP_NUTRIENT_REMOVAL["corn"]
+    assert row["n_removed"] == pytest.approx(10000.0 * removal[0])
+    assert row["k_balance"] == pytest.approx(-10000.0 * removal[2])
+    assert row["n_balance"] == pytest.approx(row["n_applied"] - row["n_removed"])
+
+
+def test_nutrient_budget_density_and_seasons():
+    fields = [make_field("FIELD-A"), make_field("FIELD-B", seasons=("2024:us:soybean:spring",))]
+    products = make_products() + [
+        Product(name="Mystery", productId="mystery", company="Co", registrationId="R-4",
+                nutrientComposition={"nitrogen": 10.0, "phosphorous": 10.0, "potassium": 10.0}),
+    ]
+    budget = nutrient_budget(fields, mixes=[make_mix()], products=products, densities={"Mystery": 1.2})
+    assert budget["unresolved_applications"].tolist() == [0, 0, 0]
+
+    budget = budget.set_index(["field_id", "season"])
+    assert budget.loc[("FIELD-A", "2025:us:corn:spring"), "k_applied"] == pytest.approx(10.0 * 1.2 * 0.1)
+    # FIELD-B has no season in 2025, its events go to the year and its 2024 season stays empty
+    assert budget.loc[("FIELD-B", "2025"), "crop"] == "unknown"
+    assert np.isnan(budget.loc[("FIELD-B", "2025"), "n_removed"])
+    assert budget.loc[("FIELD-B", "2024:us:soybean:spring"), "n_applied"] == pytest.approx(0.0)
+
+
+def test_nutrient_budget_without_events():
+    budget = nutrient_budget([FieldManagement(fieldId="FIELD-C", seasons=["2025:us:wheat:fall"])])
+    assert budget["field_id"].tolist() == ["FIELD-C"]
+    assert budget["crop"].tolist() == ["wheat"]
+    assert budget["n_balance"].tolist() == [0.0]
+
+
+def test_nutrient_budget_two_seasons_a_year():
+    def application(event_id, timestamp, rate):
+        return {"Id": event_id, "timestamp": timestamp, "mixName": "Urea", "mixId": None, "applicationRate": rate,
+                "rateUnit": "kg/ha"}
+
+    def maize_harvest(event_id, timestamp, mass):
+        return {"Id": event_id, "timestamp": timestamp, "harvestType": "Destructive", "mass": mass,
+                "mass_units": "kg", "area": 1.0, "area_units": "ha", "nominal_mass_units": "lbs"}
+
+    field = FieldManagement(fieldId="FIELD-K", seasons=["2025:ke:maize:short_rains", "2025:ke:maize:long_rains"],
+                            application_events=[application("A-1", "2025-02-20T00:00:00Z", 50.0),
+                                                application("A-2", "2025-04-01T00:00:00Z", 100.0),
+                                                application("A-3", "2025-11-01T00:00:00Z", 20.0)],
+                            harvest_events=[maize_harvest("H-1", "2025-08-01T00:00:00Z", 3000.0),
+                                            maize_harvest("H-2", "2025-12-20T00:00:00Z", 2000.0)])
+    budget = nutrient_budget([field], products=make_products()).set_index("season")
+    # the pre-plant application of February goes to the first season of the year
+    assert budget.loc["2025:ke:maize:long_rains", "n_applied"] == pytest.approx(150.0 * 0.46)
+    assert budget.loc["2025:ke:maize:short_rains", "n_applied"] == pytest.approx(20.0 * 0.46)
+    removal = CROP_NUTRIENT_REMOVAL["maize"]
+    assert budget.loc["2025:ke:maize:long_rains", "n_removed"] == pytest.approx(3000.0 * removal[0], rel=0.05)
+    assert budget.loc["2025:ke:maize:short_rains", "n_removed"] == pytest.approx(2000.0 * removal[0], rel=0.05)
+
+    # seasons of an unknown time of year are told apart by their plantings, or not at all
+    seasons = ["2025:ke:maize:unknown", "2025:ke:bush_bean:unknown"]
+    with pytest.raises(ValueError, match="distinct start"):
+        nutrient_budget([field.model_copy(update={"seasons": seasons})], products=make_products())
+    plantings = [PlantingEvent.model_validate({**planting("P-1", "maize"), "timestamp": "2025-03-10T00:00:00Z"}),
+                 PlantingEvent.model_validate({**planting("P-2", "bush_bean"), "timestamp": "2025-10-05T00:00:00Z"})]
+    budget = nutrient_budget([field.model_copy(update={"seasons": seasons, "planting_events": plantings})],
+                             products=make_products()).set_index("season")
+    assert budget.loc["2025:ke:maize:unknown", "n_applied"] == pytest.approx(150.0 * 0.46)
+    assert budget.loc["2025:ke:bush_bean:unknown", "n_applied"] == pytest.approx(20.0 * 0.46)
+
+
+def test_nutrient_budget_fall_sown_crop():
+    field = FieldManagement(fieldId="FIELD-W", seasons=["2025:us:wheat:fall"], application_events=[
+        {"Id": "A-1", "timestamp": "2025-09-20T00:00:00Z", "mixName": "MAP", "mixId": None, "applicationRate": 100.0,
+         "rateUnit": "kg/ha"},
+        {"Id": "A-2", "timestamp": "2026-03-15T00:00:00Z", "mixName": "Urea", "mixId": None, "applicationRate": 50.0,
+         "rateUnit": "kg/ha"},
+    ], harvest_events=[
+        {"Id": "H-1", "timestamp": "2026-07-10T00:00:00Z", "harvestType": "Destructive", "mass": 4000.0,
+         "mass_units": "kg", "area": 1.0, "area_units": "ha", "nominal_mass_units": "lbs"},
+    ])
+    budget = nutrient_budget([field], products=make_products())
+    # the spring top dress and the summer harvest of the next year stay in the season the crop was sown in
+    assert budget["season"].tolist() == ["2025:us:wheat:fall"]
+    row = budget.iloc[0]
+    assert row["n_applied"] == pytest.approx(100.0 * 0.11 + 50.0 * 0.46)
+    assert row["n_removed"] > 0.0
+
+    # the next season of the field ends it
+    field = field.model_copy(update={"seasons": ["2025:us:wheat:fall", "2026:us:soybean:summer"]})
+    budget = nutrient_budget([field], products=make_products()).set_index("season")
+    assert budget.loc["2025:us:wheat:fall", "n_applied"] == pytest.approx(100.0 * 0.11 + 50.0 * 0.46)
+    assert budget.loc["2026:us:soybean:summer", "n_removed"] > 0.0
+    assert budget.loc["2025:us:wheat:fall", "n_removed"] == 0.0
+
+
+def write_events(path, events):
+    path.write_text(json.dumps(events))
+    return path.name
+
+
+def planting(event_id, crop="corn"):
+    return {"Id": event_id, "timestamp": "2025-04-20T00:00:00Z", "cropType": crop, "seedingRate": 34000.0,
+            "seedingUnit": "seeds/acre"}
+
+
+def harvest(event_id):
+    return {"Id": event_id, "timestamp": "2025-10-01T00:00:00Z", "harvestType": "Destructive", "mass": 1000.0,
+            "mass_units": "kg", "nominal_mass_units": "lbs"}
+
+
+def test_field_management_builder_incremental(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    keys = {"planting": [write_events(source / "plant_a.json", [planting("P-1"), planting("P-2")])],
+            "harvest": [write_events(source / "harvest_a.json", [harvest("H-1")])],
+            "application": [write_events(source / "application_a.json", [
+                {"Id": "APP-1", "timestamp": "2025-05-01T00:00:00Z", "mixName": "UAN", "mixId": None,
+                 "applicationRate": 100.0, "rateUnit": "lbs/ac"}])]}
+    calls = []
+
+    def parser(path, model):
+        calls.append(path.name)
+        return read_event_file(path, model)
+
+    builder = FieldManagementBuilder(tmp_path / "state", parsers={"planting": parser, "harvest": parser},
+                                     base_dir=source)
+    field, report = builder.build("FIELD-A", keys, seasons=["2025:us:corn:spring"])
+    assert sorted(report.parsed) == ["application_a.json", "harvest_a.json", "plant_a.json"]
+    assert [e.id for e in field.planting_events] == ["P-1", "P-2"]
+    # the persisted field reloads, required nullable fields (mixId) included
+    reloaded = FieldManagement.model_validate_json((tmp_path / "state" / "FIELD-A.json").read_text())
+    assert reloaded.model_dump() == field.model_dump()
+
+    # nothing changed, a touched file with the same content is hashed but not parsed
+    os.utime(source / "harvest_a.json", ns=(1, 1))
+    field, report = builder.build("FIELD-A", keys)
+    assert report.parsed == [] and sorted(report.unchanged) == ["application_a.json", "harvest_a.json", "plant_a.json"]
+    assert len(calls) == 2
+
+    # a changed file replaces its events, a new file adds its own, the rest is left alone
+    write_events(source / "plant_a.json", [planting("P-1", crop="soybean")])
+    keys["planting"].append(write_events(source / "plant_b.json", [planting("P-3")]))
+    field, report = builder.build("FIELD-A", keys)
+    assert sorted(report.parsed) == ["plant_a.json", "plant_b.json"]
+    assert report.events_removed == 2 and report.events_added == 2
+    assert {e.id: e.crop_type for e in field.planting_events} == {"P-1": "soybean", "P-3": "corn"}
+
+    # the merged history persists, an unlisted file drops its events
+    field, report = FieldManagementBuilder(tmp_path / "state", base_dir=source).build(
+        "FIELD-A", {"planting": keys["planting"]})
+    assert sorted(report.removed) == ["application_a.json", "harvest_a.json"]
+    assert field.harvest_events == []
+    assert field.seasons == ["2025:us:corn:spring"]
+    persisted, manifest = builder.load("FIELD-A")
+    assert [e.id for e in persisted.planting_events] == ["P-1", "P-3"]
+    assert sorted(manifest.sources) == ["plant_a.json", "plant_b.json"]
+
+
+def tissue(event_id, nitrogen_pct):
+    return {"schema_name": "TissueAggregate", "eventId": event_id, "filePath": None,
+            "timestamp": "2025-07-01T00:00:00Z", "growthStage": "V8", "plantFraction": "Leaf",
+            "analysisResults": {"nitrogenPct": nitrogen_pct}}
+
+
+def test_field_management_builder_tissue_events(tmp_path):
+    # tissue aggregates may have no event id, or share one across files
+    source = tmp_path / "source"
+    source.mkdir()
+    keys = {"tissue": [write_events(source / "tissue_a.json", [tissue(None, 3.0), tissue("T-1", 3.1)]),
+                       write_events(source / "tissue_b.json", [tissue(None, 2.0), tissue("T-1", 2.1)])]}
+    builder = FieldManagementBuilder(tmp_path / "state", base_dir=source)
+    field, report = builder.build("FIELD-A", keys)
+    assert report.events_added == 4
+    assert [e.analysis_results.nitrogen_pct for e in field.tissue_events] == [3.0, 3.1, 2.0, 2.1]
+
+    # a changed file only replaces its own events
+    write_events(source / "tissue_a.json", [tissue(None, 3.5)])
+    field, report = builder.build("FIELD-A", keys)
+    assert report.parsed == ["tissue_a.json"]
+    assert report.events_removed == 2 and report.events_added == 1
+    assert [e.analysis_results.nitrogen_pct for e in field.tissue_events] == [3.5, 2.0, 2.1]
+
+    field, report = builder.build("FIELD-A", {"tissue": keys["tissue"][1:]})
+    assert report.removed == ["tissue_a.json"] and report.events_removed == 1
+    persisted, manifest = builder.load("FIELD-A")
+    assert [e.event_id for e in persisted.tissue_events] == [None, "T-1"]
+    assert manifest.sources["tissue_b.json"].events == 2
+
+
+def test_field_management_builder_unknown_activity(tmp_path):
+    with pytest.raises(ValueError, match="Unknown activities"):
+        FieldManagementBuilder(tmp_path).build("FIELD-A", {"spraying": []})
+
+
+def test_lazy_field_management(tmp_path):
+    field = make_field().model_copy(update={"planting_events": [PlantingEvent(**planting("P-1"))]})
+    path = tmp_path / "FIELD-A.json"
+    path.write_text(field.model_dump_json(by_alias=True))
+
+    lazy = LazyFieldManagement.from_file(path)
+    assert lazy.seasons == ["2025:us:corn:spring"]
+    assert lazy.event_count("application_events") == 3
+    assert not lazy.is_loaded("harvest_events")
+
+    budget = nutrient_budget([lazy], mixes=[make_mix()], products=make_products())
+    assert budget["n_applied"].tolist() == nutrient_budget([field], mixes=[make_mix()],
+                                                           products=make_products())["n_applied"].tolist()
+    assert lazy.is_loaded("harvest_events") and not lazy.is_loaded("soil_events")
+    assert lazy.harvest_events is lazy.harvest_events
+
+    materialized = lazy.materialize()
+    assert isinstance(materialized, FieldManagement)
+    assert materialized.model_dump() == field.model_dump()
+
+
+def test_lazy_field_management_from_sources(tmp_path):
+    write_events(tmp_path / "plant_a.json", [planting("P-1")])
+    write_events(tmp_path / "plant_b.json", [{"Id": "P-2", "cropType": "corn"}])
+    lazy = LazyFieldManagement.from_sources("FIELD-A", ["2025:us:corn:spring"],
+                                            {"planting": ["plant_a.json", "plant_b.json"]}, base_dir=tmp_path)
+    assert lazy.event_count("planting_events") is None
+    assert lazy.harvest_events == []
+    # the broken file only fails once its events are used, and keeps failing until it is fixed
+    with pytest.raises(ValidationError):
+        lazy.planting_events
+    with pytest.raises(ValidationError):
+        lazy.planting_events
+    assert not lazy.is_loaded("planting_events")
+    assert lazy.event_count("planting_events") is None
+
+
+def test_lazy_field_management_keeps_raw_events_on_error():
+    lazy = LazyFieldManagement("FIELD-A", ["2025:us:corn:spring"],
+                               raw_events={"planting_events": [planting("P-1"), {"Id": "P-2"}]})
+    with pytest.raises(ValidationError):
+        lazy.planting_events
+    with pytest.raises(ValidationError):
+        lazy.planting_events
+    assert lazy.event_count("planting_events") == 2
+    assert not lazy.is_loaded("planting_events")
+
+
+def test_event_timeline_queries():
+    field = make_field().model_copy(update={"planting_events": [PlantingEvent(**planting("P-1"))]})
+    timeline = EventTimeline(field)
+    assert len(timeline) == 5
+    assert np.all(np.diff(timeline.times) >= np.timedelta64(0))
+
+    season = timeline.between("2025-04-20", "2025-10-01")
+    assert season["event_id"].tolist() == ["P-1", "FIELD-A-APP-1", "FIELD-A-APP-2", "FIELD-A-APP-3", "FIELD-A-H-1"]
+    assert timeline.between("2025-05-15", activities=["application"])["row"].tolist() == [1, 2]
+
+    harvested = field.harvest_events[0].timestamp
+    when, activity, row = timeline.last_before(harvested, "application", where=lambda e: e.mix_name == "UAN")
+    assert (activity, row) == ("application", 1)
+    assert (np.datetime64(harvested.replace(tzinfo=None)) - when) // np.timedelta64(1, "D") == 122
+    assert timeline.last_before(harvested, "harvest", strict=True) is None
+    assert timeline.first_after("2025-05-01", strict=True)[1:] == ("application", 1)
+    assert timeline.first_after("2026-01-01") is None
+
+
+def test_event_timeline_appends():
+    field = make_field()
+    timeline = EventTimeline(field)
+    assert timeline.between(activities="planting").empty
+
+    timeline.append("harvest", HarvestEvent(**harvest("H-2")).model_copy(
+        update={"timestamp": datetime(2025, 11, 1, tzinfo=timezone.utc)}))
+    timeline.append("planting", PlantingEvent(**planting("P-1")))
+    field.tillage_events.append(TillageEvent(Id="T-1", timestamp="2025-03-01T00:00:00Z", tillageType="Disc"))
+    assert timeline.refresh() == 1
+
+    assert timeline.counts()[:4] == [1, 3, 1, 2]
+    assert timeline.between()["event_id"].tolist()[:2] == ["T-1", "P-1"]
+    assert timeline.between()["event_id"].tolist()[-1] == "H-2"
+    assert timeline.first_after("2025-01-01", activities="planting")[2] == 0
+
+
+def test_parse_season_key():
+    key = parse_season_key("2025:US:Corn:spring")
+    assert (key.year, key.country, key.crop, key.time_of_year) == (2025, "USA", "corn", "spring")
+    assert str(key) == "2025:us:corn:spring"
+    assert parse_season_key("2024:KEN:maize:long_rains").country == "KEN"
+
+    for bad in ("2025:us:corn", "1800:us:corn:spring", "2025:xx:corn:spring", "2025:us:kale:spring",
+                "2025:us:corn:monsoon"):
+        with pytest.raises(ValueError):
+            parse_season_key(bad)
+
+    df = parse_season_keys(["2025:us:corn:spring", "2024:ke:maize:1", "2025:us:corn:spring"])
+    assert df["country"].tolist() == ["USA", "KEN", "USA"]
+    assert df["year"].tolist() == [2025, 2024, 2025]
+
+
+def test_season_index():
+    fields = [
+        LazyFieldManagement("FIELD-A", ["2024:us:soybean:spring", "2025:us:corn:spring"]),
+        LazyFieldManagement("FIELD-B", ["2025:ke:maize:long_rains", "2025:ke:bush_bean:short_rains"]),
+        LazyFieldManagement("FIELD-C", ["2023:us:corn:spring", "2025:us:wheat:fall"], raw_events={
+            "planting_events": [{"broken": True}]}),
+    ]
+    index = SeasonIndex.from_fields(fields)
+    assert len(index) == 6
+    assert index.fields(crop="corn") == ["FIELD-A", "FIELD-C"]
+    assert index.fields(year=2025, country="us") == ["FIELD-A", "FIELD-C"]
+    assert index.fields(year=(None, 2024)) == ["FIELD-A", "FIELD-C"]
+    assert index.fields(crop=["maize", "wheat"], year=(2025, 2025)) == ["FIELD-B", "FIELD-C"]
+    assert index.fields(country="KEN", time_of_year="spring") == []
+    assert index.seasons(country="ke")["season"].tolist() == ["2025:ke:maize:long_rains",
+                                                              "2025:ke:bush_bean:short_rains"]
+    # no event was read
+    assert not any(f.is_loaded("planting_events") for f in fields)
+
+    with pytest.raises(ValueError, match="FIELD-D"):
+        index.add("FIELD-D", ["2025:us:corn"])
+    index.add("FIELD-D", ["2025:us:corn", "2025:us:corn:summer"], errors="skip")
+    assert index.invalid == {"FIELD-D": ["2025:us:corn"]}
+    assert index.fields(time_of_year="summer") == ["FIELD-D"]
+
+
+def budget_task(path):
+    field = LazyFieldManagement.from_file(path)
+    if field.field_id == "FIELD-BAD":
+        raise ValueError("broken field")
+    return nutrient_budget([field], mixes=[make_mix()], products=make_products())
+
+
+def rebuild_task(path):
+    return LazyFieldManagement.from_file(path).materialize()
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_run_field_pipeline(tmp_path, processes):
+    paths = []
+    for field_id in ("FIELD-A", "FIELD-B", "FIELD-BAD"):
+        path = tmp_path / f"{field_id}.json"
+        path.write_text(make_field(field_id).model_dump_json(by_alias=True))
+        paths.append(path)
+
+    run = run_field_pipeline(paths, budget_task, processes=processes, key=lambda p: p.stem,
+                             size=lambda p: p.stat().st_size)
+    assert sorted(run.results) == ["FIELD-A", "FIELD-B"]
+    assert run.results["FIELD-A"]["n_applied"].tolist() == run.results["FIELD-B"]["n_applied"].tolist()
+    assert [r.key for r in run.report.failed] == ["FIELD-BAD"]
+    assert "broken field" in run.report.failed[0].error
+    assert len(run.report.frame()) == 3 and run.report.fields_per_second > 0
+
+    run = run_field_pipeline(paths[:1], rebuild_task, processes=processes, key=lambda p: p.stem)
+    field = run.results["FIELD-A"]
+    assert isinstance(field, LazyFieldManagement) and not field.is_loaded("application_events")
+    assert field.materialize().model_dump() == make_field("FIELD-A").model_dump()
+
+    run = run_field_pipeline(paths, budget_task, processes=processes, key=lambda p: p.stem, keep_results=False)
+    assert run.results == {} and [r.result_bytes for r in run.report.runs] == [0, 0, 0]
+    assert [r.key for r in run.report.failed] == ["FIELD-BAD"]
+
+
+def test_run_field_pipeline_duplicate_keys():
+    with pytest.raises(ValueError, match="own key"):
+        run_field_pipeline(["a", "a"], str, processes=0)
@@ -0,0 +1,119 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from open_aglabs.core.gis import transform_xy
+from open_aglabs.core.points import read_point_store, read_point_store_meta
+from open_aglabs.planting.ingest import ingest_as_planted, as_planted_variety_summary, AsPlantedAccumulator
+from open_aglabs.planting.varieties import extract_variety_geometries, swath_geometries, variety_cache_path
+
+
+def make_planter_log(n=600):
+    # the first two thirds of the log is one hybrid planted at 80000 seeds/ha, the rest another at 70000
+    split = 2 * n // 3
+    return pd.DataFrame({
+        "lat": 42.0 + np.arange(n) * 1e-5,
+        "lon": np.full(n, -93.0),
+        "seeding_rate": np.r_[np.full(split, 80000.0), np.full(n - split, 70000.0)],
+        "variety": ["P1197AM"] * split + ["DKC67-44"] * (n - split),
+        "depth": np.r_[np.full(split, 5.0), np.full(n - split, 4.0)],
+        "speed": np.full(n, 2.5),
+        "width": np.full(n, 0.76),
+    })
+
+
+def test_accumulator_weights_rates_by_area():
+    acc = AsPlantedAccumulator()
+    acc.update({"variety": np.array(["a", "a", "b"], dtype=object),
+                "seeding_rate": np.array([100.0, 200.0, 50.0]),
+                "speed": np.array([1.0, 3.0, 1.0]),
+                "width": np.array([1.0, 1.0, 1.0])})
+    acc.update({"variety": np.array(["b", None], dtype=object),
+                "seeding_rate": np.array([150.0, 10.0]),
+                "speed": np.array([1.0, 1.0]),
+                "width": np.array([1.0, 1.0])})
+
+    summary = acc.summary().set_index("variety")
+    assert summary.loc["a", "seeding_rate"] == pytest.approx((100.0 + 600.0) / 4.0)
+    assert summary.loc["b", "seeding_rate"] == pytest.approx(100.0)
+    assert summary.loc["unknown", "points"] == 1
+    assert summary.index[0] == "a"
+
+
+def test_ingest_as_planted_csv(tmp_path):
+    log = make_planter_log()
+    path = tmp_path / "planting.csv"
+    log.to_csv(path, index=False)
+
+    event = ingest_as_planted(path, event_id="PLANT-1", timestamp=datetime(2025, 4, 20), crop_type="corn",
+                              chunk_size=128, seeding_unit="seeds/ha")
+    assert event.variety == ["P1197AM", "DKC67-44"]
+    assert event.seeding_rate == pytest.approx((2 * 80000.0 + 70000.0) / 3.0)
+    assert event.depth_cm == pytest.approx((2 * 5.0 + 4.0) / 3.0)
+    assert event.file_path == str(tmp_path / "planting.points")
+
+    summary = as_planted_variety_summary(event).set_index("variety")
+    assert summary.loc["DKC67-44", "seeding_rate"] == pytest.approx(70000.0)
+    assert summary.loc["P1197AM", "area_ha"] == pytest.approx(400 * 2.5 * 0.76 / 10000.0)
+
+    points = read_point_store(event.file_path)
+    assert points["variety"].dtype == np.int16
+    assert len(np.unique(points["variety"])) == 2
+
+
+def test_ingest_as_planted_units_and_missing_columns(tmp_path):
+    path = tmp_path / "planting.csv"
+    make_planter_log(30).to_csv(path, index=False)
+    event = ingest_as_planted(path, event_id="PLANT-2", timestamp=datetime(2025, 4, 20), crop_type="corn")
+    assert event.seeding_unit == "seeds/acre"
+    assert event.seeding_rate == pytest.approx((2 * 80000.0 + 70000.0) / 3.0 * 0.40468564224)
+
+    bad = tmp_path / "bad.csv"
+    make_planter_log(30).drop(columns=["width"]).to_csv(bad, index=False)
+    with pytest.raises(ValueError):
+        ingest_as_planted(bad, event_id="PLANT-3", timestamp=datetime(2025, 4, 20), crop_type="corn")
+
+
+def test_ingest_as_planted_closes_store_on_error(tmp_path):
+    log = make_planter_log(60)
+    log["speed"] = log["speed"].astype(object)
+    log.loc[50, "speed"] = "broken"
+    path = tmp_path / "planting.csv"
+    log.to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        ingest_as_planted(path, event_id="PLANT-5", timestamp=datetime(2025, 4, 20), crop_type="corn", chunk_size=20)
+
+    meta = read_point_store_meta(tmp_path / "planting.points")
+    assert meta["complete"] is False
+    assert meta["count"] == 40
+
+
+def test_swath_geometries_split_runs():
+    x = np.array([0.0, 1.0, 2.0, 50.0, 51.0, 52.0, 100.0])
+    codes = np.array([0, 0, 0, 0, 1, 1, 1])
+    geometries, geometry_codes = swath_geometries(x, np.zeros(7), np.ones(7), codes)
+    # a run per variety, the gap to x=50 and x=100 leaves two single points
+    assert list(geometry_codes) == [0, 1, 0, 1]
+    assert shapely.area(geometries) == pytest.approx([2.0, 1.0, 1.0, 1.0])
+
+
+def test_extract_variety_geometries(tmp_path):
+    path = tmp_path / "planting.csv"
+    make_planter_log().to_csv(path, index=False)
+    event = ingest_as_planted(path, event_id="PLANT-4", timestamp=datetime(2025, 4, 20), crop_type="corn")
+
+    event = extract_variety_geometries(event)
+    assert set(event.variety_geometries) == {"P1197AM", "DKC67-44"}
+
+    geometry = shapely.from_wkt(event.variety_geometries["P1197AM"])
+    x, y = transform_xy(*shapely.get_coordinates(geometry).T, "EPSG:4326", "EPSG:32615")
+    area = shapely.area(shapely.polygons(np.column_stack([x, y])))
+    assert area == pytest.approx(399 * 1.113 * 0.76, rel=0.02)
+
+    cache_path = variety_cache_path(event)
+    assert cache_path.exists()
+    cached = extract_variety_geometries(event.model_copy(update={"variety_geometries": None}))
+    assert cached.variety_geometries == event.variety_geometries
+    assert cached.model_dump(by_alias=True)["varietyGeometries"] == event.variety_geometries
@@ -0,0 +1,143 @@
+import json
+
+import pandas as pd
+import pytest
+from open_aglabs.applicator.models import ApplicationEvent
+from open_aglabs.products.catalog import ProductCatalog
+from open_aglabs.products.ingest import read_product_records, validate_product_batch
+from open_aglabs.products.matching import ProductMatcher
+from open_aglabs.products.models import PesticideProduct, Product
+
+
+def write_products_csv(path):
+    path.write_text(
+        "name,regId,company,active_ingredient,approved_crop\n"
+        "WeedAway,HERB-1,PestControl Corp.,\"Glyphosate:41;2,4-D:15\",Corn;Soybeans\n"
+        "BugOff,INS-1,pestcontrol  corp.,Bifenthrin:25,Corn\n"
+        "Broken,FUN-1,Other Co,Azoxystrobin:lots,Wheat\n"
+    )
+    return path
+
+
+def make_product_record():
+    return {
+        "name": "SuperGrow",
+        "productId": "FG-IH-002",
+        "company": "AgriSolutions Inc.",
+        "registrationId": "REG-1",
+        "nutrientComposition": {"nitrogen": 10.0, "phosphorous": 20.0, "potassium": 10.0},
+        "herbicideComposition": {
+            "name": "WeedAway Herbicide",
+            "regId": "HERB-2",
+            "company": "PestControl Corp.",
+            "active_ingredient": [{"name": "Glyphosate", "percentage": 41.0}],
+            "approved_crop": ["Wheat"],
+        },
+    }
+
+
+def test_read_product_records_csv(tmp_path):
+    records = list(read_product_records(write_products_csv(tmp_path / "products.csv")))
+    assert records[0]["approved_crop"] == ["Corn", "Soybeans"]
+    assert records[0]["active_ingredient"] == [{"name": "Glyphosate", "percentage": "41"},
+                                               {"name": "2,4-D", "percentage": "15"}]
+
+    valid, errors = validate_product_batch(records + [make_product_record()])
+    assert [type(v) for v in valid] == [PesticideProduct, PesticideProduct, Product]
+    assert list(errors) == [2]
+    assert "percentage" in errors[2]
+
+
+def test_product_catalog_queries(tmp_path):
+    catalog = ProductCatalog()
+    with pytest.raises(ValueError, match="record 2"):
+        catalog.load(write_products_csv(tmp_path / "products.csv"))
+    assert len(catalog) == 0
+
+    report = catalog.load(tmp_path / "products.csv", errors="skip", batch_size=2)
+    assert report.added == 2
+    assert list(report.rejected) == [2]
+    catalog.load_records([make_product_record()])
+
+    assert [p.name for p in catalog.get("HERB-1")] == ["WeedAway"]
+    assert [p.name for p in catalog.by_company("PESTCONTROL CORP.")] == ["WeedAway", "BugOff"]
+    assert [p.name for p in catalog.by_ingredient("glyphosate")] == ["WeedAway", "SuperGrow"]
+    assert [p.name for p in catalog.by_crop("corn")] == ["WeedAway", "BugOff"]
+    assert [p.name for p in catalog.search(ingredient="Glyphosate", crop="Wheat")] == ["SuperGrow"]
+    assert catalog.get("REG-1")[0].herbicides.regId == "HERB-2"
+    assert catalog.search(crop="rice") == []
+
+
+def test_product_catalog_persists(tmp_path):
+    path = tmp_path / "products.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in [make_product_record()]))
+    with ProductCatalog(tmp_path / "catalog.sqlite") as catalog:
+        catalog.load(path)
+
+    with ProductCatalog(tmp_path / "catalog.sqlite") as catalog:
+        assert len(catalog) == 1
+        assert catalog.ingredients() == ["glyphosate"]
+        assert catalog.crops() == ["wheat"]
+
+
+def test_product_catalog_replaces_reloaded_entries(tmp_path):
+    path = write_products_csv(tmp_path / "products.csv")
+    with ProductCatalog(tmp_path / "catalog.sqlite") as catalog:
+        assert catalog.load(path, errors="skip").added == 2
+
+    with ProductCatalog(tmp_path / "catalog.sqlite") as catalog:
+        report = catalog.load(path, errors="skip")
+        assert (report.added, report.replaced) == (0, 2)
+        assert len(catalog) == 2
+        assert [p.name for p in catalog.get("HERB-1")] == ["WeedAway"]
+
+        # the new version of an entry brings its own ingredients and keeps its place
+        catalog.load_records([{"name": "WeedAway 2", "regId": "HERB-1", "company": "PestControl Corp.",
+                               "active_ingredient": [{"name": "Dicamba", "percentage": 20.0}],
+                               "approved_crop": ["Corn"]}])
+        assert catalog.names() == [("HERB-1", "WeedAway 2"), ("INS-1", "BugOff")]
+        assert catalog.by_ingredient("glyphosate") == []
+        assert [p.name for p in catalog.by_ingredient("dicamba")] == ["WeedAway 2"]
+        assert [p.name for p in catalog.by_crop("corn")] == ["WeedAway 2", "BugOff"]
+
+
+def make_matcher():
+    catalog = ProductCatalog()
+    catalog.load_records([
+        {"name": name, "regId": reg_id, "company": "Co", "active_ingredient": [], "approved_crop": []}
+        for name, reg_id in [("Roundup PowerMAX", "524-549"), ("Roundup WeatherMAX", "524-537"),
+                             ("Atrazine 4L", "100-497"), ("Liberty 280 SL", "264-829")]
+    ])
+    return ProductMatcher.from_catalog(catalog, aliases={"524-549": ["RU PMax"]})
+
+
+def test_product_matcher_resolves_names():
+    matcher = make_matcher()
+    df = matcher.match(["Roundup PowerMAX", "roundup  power max", "Atrazin 4 L", "RU PMax 2", "Dicamba",
+                        "Roundup PowerMAX"])
+    assert df["key"].tolist()[:4] == ["524-549", "524-549", "100-497", "524-549"]
+    assert df["score"][0] == pytest.approx(1.0)
+    assert pd.isna(df["key"][4])
+    assert df["matched_name"][3] == "RU PMax"
+    # the repeated name is scored once
+    assert len(matcher.cache) == 5
+
+
+def test_product_matcher_missing_names():
+    df = make_matcher().match(["Roundup PowerMAX", None, "liberty", float("nan")])
+    assert df["key"].tolist()[::2] == ["524-549", "264-829"]
+    assert df["key"].isna().tolist() == [False, True, False, True]
+    assert df["matched_name"].isna().tolist() == [False, True, False, True]
+    assert df["score"].tolist()[1::2] == [0.0, 0.0]
+
+    df = make_matcher().match([None])
+    assert len(df) == 1 and pd.isna(df["key"][0])
+
+
+def test_product_matcher_events():
+    events = [ApplicationEvent(schema_name="ApplicationEvent", Id=f"APP-{i}", timestamp="2025-10-01T12:00:00Z",
+                               mixName=name, mixId=None, applicationRate=1.0, rateUnit="l/ha")
+              for i, name in enumerate(["Liberty 280", "liberty"])]
+    df = make_matcher().match_events(events)
+    assert df["event_id"].tolist() == ["APP-0", "APP-1"]
+    assert df["key"].tolist() == ["264-829", "264-829"]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from open_aglabs.core.qa import AnalysisQA, analysis_frame
+from open_aglabs.tissue.models import TissueSample
+
+
+def make_batch(n, seed, lab="lab-a", region="Iowa"):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "sample_id": [f"{lab}-{seed}-{i}" for i in range(n)],
+        "lab_id": lab,
+        "region": region,
+        "nitrogen_pct": rng.lognormal(np.log(3.5), 0.1, n),
+        "zinc_ppm": rng.lognormal(np.log(40.0), 0.2, n),
+    })
+
+
+def test_robust_statistics_match_numpy():
+    batch = make_batch(2000, seed=1)
+    qa = AnalysisQA(columns=["nitrogen_pct", "zinc_ppm"])
+    qa.update(batch)
+
+    count, median, mad = qa.statistics("global")
+    logs = np.log10(batch["zinc_ppm"].to_numpy())
+    assert count[0, 1] == 2000
+    assert median[0, 1] == pytest.approx(np.median(logs), abs=qa.bin_width)
+    assert mad[0, 1] == pytest.approx(np.median(np.abs(logs - np.median(logs))), abs=qa.bin_width)
+
+
+def test_flags_unit_slips_and_outliers():
+    qa = AnalysisQA(columns=["nitrogen_pct", "zinc_ppm"])
+    qa.update(make_batch(500, seed=1))
+
+    batch = make_batch(50, seed=2)
+    batch.loc[3, "nitrogen_pct"] = 35000.0  # pct typed in as ppm
+    batch.loc[7, "zinc_ppm"] = 400.0
+    report = qa.process(batch)
+
+    slips = report[report["flag"] == "unit_slip"]
+    assert slips["sample_id"].tolist() == [batch.loc[3, "sample_id"]]
+    assert slips["suspected_factor"].iloc[0] == pytest.approx(10000.0)
+
+    outliers = report[report["flag"] == "outlier"]
+    assert batch.loc[7, "sample_id"] in outliers["sample_id"].tolist()
+
+
+def test_incremental_updates_are_equal_to_one_batch():
+    first, second = make_batch(300, seed=1), make_batch(300, seed=2, lab="lab-b")
+    incremental = AnalysisQA(columns=["nitrogen_pct", "zinc_ppm"])
+    incremental.update(first)
+    incremental.update(second)
+
+    single = AnalysisQA(columns=["nitrogen_pct", "zinc_ppm"])
+    single.update(pd.concat([first, second], ignore_index=True))
+
+    for scope in ("lab", "region", "global"):
+        np.testing.assert_array_equal(incremental._hist[scope], single._hist[scope])
+    assert set(incremental._groups["lab"]) == {"lab-a", "lab-b"}
+
+
+def test_analysis_frame_from_samples():
+    sample = TissueSample(**{
+        "sampleId": "TS-1",
+        "timestamp": "2025-08-21T10:30:00Z",
+        "labId": "TissueLab-A",
+        "sampleRadiusM": 0.2,
+        "growthStage": "Flowering",
+        "plantFraction": "Leaf",
+        "plantSamples": 10,
+        "location": {"id": "loc-1", "admin_level_0": "USA", "admin_level_1": "Iowa"},
+        "analysisResults": {"nitrogenPct": 3.8, "zincPpm": 40.0}
+    })
+    df = analysis_frame([sample])
+    assert df.loc[0, "lab_id"] == "TissueLab-A"
+    assert df.loc[0, "region"] == "Iowa"
+    assert df.loc[0, "nitrogen_pct"] == 3.8
+    assert np.isnan(df.loc[0, "boron_ppm"])
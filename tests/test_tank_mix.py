@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+from open_aglabs.applicator.models import ApplicatorRx
+from open_aglabs.core.units import HA_PER_AC, KG_PER_LB, L_PER_GAL
+from open_aglabs.tank_mix.ingest import tank_mix_totals
+from open_aglabs.tank_mix.models import TankMix
+from open_aglabs.tank_mix.planning import assign_jobs, plan_tank_loads
+
+
+def make_rx(rx_id="RX-1", tank_mix="mix-1"):
+    x0, y0 = 500000.0, 4650000.0
+    return ApplicatorRx(schema_name="ApplicatorRx", eventId=rx_id, crs="EPSG:32615", units="lbs/ac", zones=[
+        {"id": "zone-1", "geometry": f"POLYGON (({x0} {y0}, {x0 + 50} {y0}, {x0 + 50} {y0 + 100}, {x0} {y0 + 100}, "
+                                     f"{x0} {y0}))", "tank_id": "T1", "tank_mix": tank_mix, "rate": 100.0},
+        {"id": "zone-2", "geometry": f"POLYGON (({x0 + 50} {y0}, {x0 + 100} {y0}, {x0 + 100} {y0 + 100}, "
+                                     f"{x0 + 50} {y0 + 100}, {x0 + 50} {y0}))", "tank_id": "T2",
+         "tank_mix": tank_mix, "rate": 200.0},
+    ])
+
+
+def make_mix(amount_units="lbs"):
+    return TankMix(id="mix-1", name="Urea + adjuvant", mix_content=[
+        {"product_id": "urea", "product_name": "Urea", "amount": 0.0, "amount_units": amount_units, "ratio": 50.0},
+        {"product_id": "adj", "product_name": "Adjuvant", "amount": 0.0, "amount_units": "gal", "rate": 1.0,
+         "rate_units": "l/ha"},
+    ])
+
+
+def test_tank_mix_totals_per_tank():
+    totals = tank_mix_totals([make_rx()], [make_mix()])
+    assert totals["tank_id"].tolist() == ["T1", "T1", "T2", "T2"]
+
+    urea = totals[totals["product_id"] == "urea"].set_index("tank_id")
+    # half of the mix rate over 0.5 ha, in lbs
+    assert urea.loc["T1", "amount"] == pytest.approx(50.0 * 0.5 / HA_PER_AC, rel=1e-3)
+    assert urea.loc["T2", "amount"] == pytest.approx(100.0 * 0.5 / HA_PER_AC, rel=1e-3)
+    assert urea.loc["T1", "area_ha"] == pytest.approx(0.5, rel=1e-3)
+
+    adjuvant = totals[totals["product_id"] == "adj"]
+    assert adjuvant["amount"].sum() == pytest.approx(1.0 / L_PER_GAL, rel=1e-3)
+    assert set(adjuvant["amount_units"]) == {"gal"}
+
+
+def test_tank_mix_totals_by_field():
+    rxs = [make_rx("RX-1"), make_rx("RX-2")]
+    totals = tank_mix_totals(rxs, [make_mix()], by=["rx_id"])
+    assert len(totals) == 4
+    assert totals.groupby("rx_id")["area_ha"].sum().tolist() == pytest.approx([2.0, 2.0], rel=1e-3)
+
+
+def test_tank_mix_totals_keys_mixes_by_id():
+    # the name of the second mix is the id of the first, the zones only get the products of mix-1
+    other = TankMix(id="mix-2", name="mix-1", mix_content=[
+        {"product_id": "urea", "product_name": "Urea", "amount": 0.0, "amount_units": "lbs", "ratio": 100.0},
+    ])
+    totals = tank_mix_totals([make_rx()], [make_mix(), other])
+    assert totals.loc[totals["product_id"] == "urea", "amount"].sum() == pytest.approx(150.0 * 0.5 / HA_PER_AC,
+                                                                                        rel=1e-3)
+
+    with pytest.raises(ValueError, match="unknown tank mixes"):
+        tank_mix_totals([make_rx(tank_mix="Urea + adjuvant")], [make_mix()])
+    with pytest.raises(ValueError, match="more than one mix"):
+        tank_mix_totals([make_rx()], [make_mix(), make_mix()])
+
+
+def test_tank_mix_totals_requires_rate_units():
+    mix = TankMix(id="mix-1", name="Urea", mix_content=[
+        {"product_id": "urea", "product_name": "Urea", "amount": 0.0, "amount_units": "lbs", "rate": 10.0},
+    ])
+    with pytest.raises(ValueError, match="no rate_units"):
+        tank_mix_totals([make_rx()], [mix])
+
+
+def test_tank_mix_totals_density():
+    with pytest.raises(ValueError, match="density"):
+        tank_mix_totals([make_rx()], [make_mix(amount_units="l")])
+
+    totals = tank_mix_totals([make_rx()], [make_mix(amount_units="l")], densities={"urea": 0.75})
+    urea = totals.loc[totals["product_id"] == "urea", "amount"].sum()
+    assert urea == pytest.approx(75.0 / HA_PER_AC * KG_PER_LB / 0.75, rel=1e-3)
+
+
+def test_tank_mix_totals_unknown_mix():
+    with pytest.raises(ValueError, match="unknown tank mixes"):
+        tank_mix_totals([make_rx(tank_mix="other")], [make_mix()])
+
+
+def make_spray_rx(rx_id, width_m, tank_mix="mix-1", rate=100.0):
+    x0, y0 = 500000.0, 4650000.0
+    geometry = f"POLYGON (({x0} {y0}, {x0 + width_m} {y0}, {x0 + width_m} {y0 + 100}, {x0} {y0 + 100}, {x0} {y0}))"
+    return ApplicatorRx(schema_name="ApplicatorRx", eventId=rx_id, crs="EPSG:32615", units="l/ha", zones=[
+        {"id": "zone-1", "geometry": geometry, "tank_id": "T1", "tank_mix": tank_mix, "rate": rate},
+    ])
+
+
+def make_spray_mix(mix_id):
+    return TankMix(id=mix_id, name=f"Mix {mix_id}", mix_content=[
+        {"product_id": "herbicide", "product_name": "Herbicide", "amount": 0.0, "amount_units": "l", "ratio": 2.0},
+        {"product_id": "water", "product_name": "Water", "amount": 0.0, "amount_units": "l", "ratio": 98.0},
+    ])
+
+
+def test_assign_jobs_keeps_mixes_together():
+    # two sprayers each finishing one mix in a single load beats splitting the mixes
+    sprayers = assign_jobs(np.array([0, 1, 0, 1]), np.array([600.0, 600.0, 300.0, 300.0]), np.array([1000.0, 1000.0]))
+    assert sprayers[0] == sprayers[2]
+    assert sprayers[1] == sprayers[3]
+    assert sprayers[0] != sprayers[1]
+
+
+def test_plan_tank_loads():
+    # 100 l/ha over 1, 2 and 0.5 ha
+    rxs = [make_spray_rx("RX-1", 100), make_spray_rx("RX-2", 200), make_spray_rx("RX-3", 50, tank_mix="mix-2")]
+    plan = plan_tank_loads(rxs, [make_spray_mix("mix-1"), make_spray_mix("mix-2")], {"S1": 150.0, "S2": 120.0})
+
+    assert plan.total_loads == len(plan.loads)
+    for sprayer in ["S1", "S2"]:
+        loads = plan.sprayer_loads(sprayer)
+        assert [load.sequence for load in loads] == list(range(1, len(loads) + 1))
+
+    sprayed = {}
+    for load in plan.loads:
+        assert load.volume_l <= {"S1": 150.0, "S2": 120.0}[load.sprayer_id] + 1e-6
+        for rx_id, volume in load.fields.items():
+            sprayed[rx_id] = sprayed.get(rx_id, 0.0) + volume
+        amounts = {p.product_id: p.amount for p in load.mix.mix_content}
+        assert amounts["herbicide"] == pytest.approx(0.02 * load.volume_l, rel=1e-6)
+        assert amounts["water"] == pytest.approx(0.98 * load.volume_l, rel=1e-6)
+    assert sprayed == pytest.approx({"RX-1": 100.0, "RX-2": 200.0, "RX-3": 50.0}, rel=1e-3)
+    assert {load.mix.name for load in plan.loads if "RX-3" in load.fields} == {"Mix mix-2"}
+
+
+def test_plan_tank_loads_mass_rates_need_density():
+    rxs = [make_rx()]
+    with pytest.raises(ValueError, match="density"):
+        plan_tank_loads(rxs, [make_mix()], {"S1": 1000.0})
+
+    plan = plan_tank_loads(rxs, [make_mix()], {"S1": 1000.0}, mix_densities={"mix-1": 1.2})
+    assert sum(load.volume_l for load in plan.loads) == pytest.approx(150.0 / HA_PER_AC * KG_PER_LB / 1.2, rel=1e-3)
+
+
+def test_plan_tank_loads_keys_mixes_by_id():
+    rxs = [make_spray_rx("RX-1", 100, tank_mix="Mix mix-1")]
+    with pytest.raises(ValueError, match="unknown tank mixes"):
+        plan_tank_loads(rxs, [make_spray_mix("mix-1")], {"S1": 150.0})
+    with pytest.raises(ValueError, match="more than one mix"):
+        plan_tank_loads([make_spray_rx("RX-1", 100)], [make_spray_mix("mix-1"), make_spray_mix("mix-1")],
+                        {"S1": 150.0})
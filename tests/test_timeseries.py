@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from open_aglabs.core.gis import geohash_encode
+from open_aglabs.core.timeseries import AnalysisTimeSeriesStore
+from open_aglabs.soil.models import SoilSample
+from open_aglabs.tissue.models import TissueSample
+
+
+def make_soil_sample(sample_id, timestamp, phosphorus, location_id="loc-1", latitude=40.7128, longitude=-74.0060):
+    return SoilSample(**{
+        "sampleId": sample_id,
+        "timestamp": timestamp,
+        "sampleRadiusM": 2.5,
+        "startDepthCm": 0.0,
+        "endDepthCm": 15.0,
+        "extractionType": "Mehlich-3",
+        "location": {"id": location_id, "latitude": latitude, "longitude": longitude},
+        "analysisResults": {
+            "ph": 6.5,
+            "organicMatterPercent": 3.2,
+            "phosphorusPpm": phosphorus,
+            "potassiumPpm": 150.0,
+            "calciumPpm": 1500.0
+        },
+        "notes": []
+    })
+
+
+def test_geohash_encode_known_values():
+    assert geohash_encode(57.64911, 10.40744, precision=11) == "u4pruydqqvj"
+    hashes = geohash_encode([40.7128, 57.64911], [-74.0060, 10.40744], precision=5)
+    assert hashes.tolist() == ["dr5re", "u4pru"]
+
+
+def test_store_query_is_sorted_and_ranged():
+    samples = [
+        make_soil_sample("s-3", "2020-05-01T00:00:00Z", 40.0),
+        make_soil_sample("s-1", "2015-05-01T00:00:00Z", 60.0),
+        make_soil_sample("s-2", "2018-05-01T00:00:00Z", 50.0),
+        make_soil_sample("s-4", "2018-05-01T00:00:00Z", 99.0, location_id="loc-2"),
+    ]
+    store = AnalysisTimeSeriesStore.from_samples(samples)
+
+    assert len(store) == 4
+    assert sorted(store.keys) == ["loc-1", "loc-2"]
+    assert store._values.dtype == np.float32
+
+    df = store.query("loc-1", columns=["phosphorus_ppm"])
+    assert df["sample_id"].tolist() == ["s-1", "s-2", "s-3"]
+    assert df["phosphorus_ppm"].tolist() == [60.0, 50.0, 40.0]
+
+    df = store.query("loc-1", start="2016-01-01", end="2020-05-01")
+    assert df["sample_id"].tolist() == ["s-2"]
+    assert np.isnan(df["nitrogen_ppm"].iloc[0])
+
+
+def test_store_resample_and_incremental_add():
+    store = AnalysisTimeSeriesStore.from_samples([make_soil_sample("s-1", "2015-03-01T00:00:00Z", 60.0)])
+    store.add_samples([make_soil_sample("s-2", "2015-09-01T00:00:00Z", 40.0),
+                       make_soil_sample("s-3", "2017-05-01T00:00:00Z", 30.0)])
+
+    yearly = store.resample("loc-1", "YS", columns=["phosphorus_ppm"])
+    assert yearly["phosphorus_ppm"].iloc[0] == 50.0
+    assert np.isnan(yearly["phosphorus_ppm"].iloc[1])
+    assert yearly["phosphorus_ppm"].iloc[2] == 30.0
+
+
+def test_store_geohash_keys_and_round_trip(tmp_path):
+    samples = [make_soil_sample("s-1", "2015-03-01T00:00:00Z", 60.0),
+               make_soil_sample("s-2", "2016-03-01T00:00:00Z", 55.0)]
+    store = AnalysisTimeSeriesStore.from_samples(samples, key_by="geohash", geohash_precision=7)
+    key = store.key_for(40.7128, -74.0060)
+    assert store.keys == [key]
+
+    path = tmp_path / "soil_store.npz"
+    store.save(path)
+    loaded = AnalysisTimeSeriesStore.load(path)
+    assert loaded.columns == store.columns
+    assert loaded.query(key)["phosphorus_ppm"].tolist() == [60.0, 55.0]
+
+
+def test_store_rejects_mixed_analysis_types():
+    store = AnalysisTimeSeriesStore.from_samples([make_soil_sample("s-1", "2015-03-01T00:00:00Z", 60.0)])
+    tissue = TissueSample(**{
+        "sampleId": "TS-1",
+        "timestamp": "2025-08-21T10:30:00Z",
+        "sampleRadiusM": 0.2,
+        "growthStage": "Flowering",
+        "plantFraction": "Leaf",
+        "plantSamples": 10,
+        "location": {"id": "loc-1"},
+        "analysisResults": {"nitrogenPct": 3.8}
+    })
+    with pytest.raises(ValueError):
+        store.add_samples([tissue])
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from open_aglabs.core.constants import RATE_UNITS, AMOUNT_UNITS
+from open_aglabs.core.units import UNITS, convert, normalize_unit
+
+
+def test_vocabularies_are_known_units():
+    for unit in list(RATE_UNITS) + list(AMOUNT_UNITS) + ["bu/acre", "L/ha", "acres", "pct", "ppm"]:
+        assert normalize_unit(unit) in UNITS.unit_index
+
+
+def test_rate_conversions():
+    assert convert(1.0, "lbs/ac", "kg/ha") == pytest.approx(1.12085, rel=1e-5)
+    assert convert(1.0, "g/m2", "kg/ha") == pytest.approx(10.0)
+    assert convert(10.0, "gal/ac", "l/ha") == pytest.approx(93.5396, rel=1e-5)
+    assert convert(2.5, "pct", "ppm") == pytest.approx(25000.0)
+
+
+def test_column_conversion_with_mixed_units_and_series():
+    values = pd.Series([1.0, 2.0, 3.0], index=["a", "b", "c"])
+    result = convert(values, ["kg", "lbs", "Kg"], "g")
+    assert isinstance(result, pd.Series)
+    assert result.index.tolist() == ["a", "b", "c"]
+    np.testing.assert_allclose(result.to_numpy(), [1000.0, 2000.0 * 0.45359237, 3000.0])
+
+
+def test_density_aware_conversion():
+    # 10 l/ha of a product at 1.2 kg/l is 12 kg/ha and back again.
+    assert convert(10.0, "l/ha", "kg/ha", density=1.2) == pytest.approx(12.0)
+    assert convert(12.0, "kg/ha", "l/ha", density=1.2) == pytest.approx(10.0)
+    np.testing.assert_allclose(convert(np.array([1.0, 1.0]), "gal", "kg", density=np.array([1.0, 2.0])),
+                               [3.785411784, 7.570823568])
+    with pytest.raises(ValueError):
+        convert(10.0, "l/ha", "kg/ha")
+
+
+def test_incompatible_units_raise():
+    with pytest.raises(ValueError):
+        convert(1.0, "kg/ha", "ppm")
+    with pytest.raises(ValueError):
+        convert(1.0, "furlongs", "kg")
@@ -0,0 +1,232 @@
+from datetime import datetime
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from open_aglabs.core.gis import GridSpec, open_grid
+from open_aglabs.core.points import read_point_store, read_point_store_meta
+from open_aglabs.harvest.cleaning import YieldCleaner, YieldCleaningConfig, clean_yield_points, pass_ids
+from open_aglabs.harvest.ingest import ingest_yield_monitor, YieldAccumulator
+from open_aglabs.harvest.raster import rasterize_points, rasterize_harvest_event
+from open_aglabs.harvest.models import HarvestEvent
+from open_aglabs.harvest.standardize import standardize_yield, standardize_harvest_events
+
+
+def make_yield_points(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "lat": 42.0 + rng.uniform(0, 0.001, n),
+        "lon": -93.0 + rng.uniform(0, 0.001, n),
+        "mass_flow": np.full(n, 10.0),
+        "moisture": np.full(n, 20.0),
+        "speed": np.full(n, 2.0),
+        "swath": np.full(n, 10.0),
+    })
+
+
+def test_yield_accumulator_matches_one_pass():
+    df = make_yield_points()
+    chunked = YieldAccumulator()
+    for start in range(0, len(df), 300):
+        chunked.update({c: df[c].to_numpy()[start:start + 300] for c in df.columns})
+
+    # 1000 points * 2 m/s * 1 s * 10 m = 20000 m2, 1000 * 10 kg wet at 20 % moisture
+    assert chunked.points == 1000
+    assert chunked.area_ha == pytest.approx(2.0)
+    assert chunked.wet_mass_kg == pytest.approx(10000.0)
+    assert chunked.moisture_pct == pytest.approx(20.0)
+    assert chunked.standard_mass_kg(15.5) == pytest.approx(8000.0 / 0.845)
+
+
+def test_ingest_yield_csv(tmp_path):
+    df = make_yield_points()
+    csv_path = tmp_path / "yield.csv"
+    df.to_csv(csv_path, index=False)
+
+    event = ingest_yield_monitor(csv_path, event_id="HARV-1", timestamp=datetime(2025, 10, 1), chunk_size=256)
+    assert event.file_path == str(tmp_path / "yield.points")
+    assert event.area == pytest.approx(2.0)
+    assert event.mass == pytest.approx(8000.0 / 0.845)
+    assert event.crop_yield == pytest.approx(8000.0 / 0.845 / 2.0)
+    assert event.crop_yield_units == "kg/ha"
+
+    points = read_point_store(event.file_path)
+    assert len(points["lat"]) == 1000
+    assert points["lat"].dtype == np.float64
+    assert points["mass_flow"].dtype == np.float32
+    np.testing.assert_allclose(points["lon"], df["lon"].to_numpy())
+
+
+def test_ingest_yield_geojson_in_bushels(tmp_path):
+    df = make_yield_points(200)
+    gdf = gpd.GeoDataFrame(df.drop(columns=["lat", "lon"]),
+                           geometry=gpd.points_from_xy(df["lon"], df["lat"]), crs="EPSG:4326")
+    path = tmp_path / "yield.geojson"
+    gdf.to_file(path, driver="GeoJSON")
+
+    event = ingest_yield_monitor(path, event_id="HARV-2", timestamp=datetime(2025, 10, 1), chunk_size=64,
+                                 nominal_volume=56.0, nominal_mass_units="lbs", crop_yield_units="bu/acre")
+    kg_per_ha = (1600.0 / 0.845) / 0.4
+    assert event.crop_yield == pytest.approx(kg_per_ha * 0.40468564224 / (56.0 * 0.45359237), rel=1e-6)
+    points = read_point_store(event.file_path)
+    np.testing.assert_allclose(points["lat"], df["lat"].to_numpy())
+
+
+def test_ingest_yield_closes_store_on_error(tmp_path):
+    df = make_yield_points(100)
+    df["mass_flow"] = df["mass_flow"].astype(object)
+    df.loc[80, "mass_flow"] = "broken"
+    csv_path = tmp_path / "yield.csv"
+    df.to_csv(csv_path, index=False)
+    with pytest.raises(ValueError):
+        ingest_yield_monitor(csv_path, event_id="HARV-5", timestamp=datetime(2025, 10, 1), chunk_size=32)
+
+    meta = read_point_store_meta(tmp_path / "yield.points")
+    assert meta["complete"] is False
+    assert meta["count"] == 64
+    assert len(read_point_store(tmp_path / "yield.points")["mass_flow"]) == 64
+
+
+def test_ingest_yield_missing_columns(tmp_path):
+    csv_path = tmp_path / "bad.csv"
+    make_yield_points(10).drop(columns=["swath"]).to_csv(csv_path, index=False)
+    with pytest.raises(ValueError):
+        ingest_yield_monitor(csv_path, event_id="HARV-3", timestamp=datetime(2025, 10, 1))
+
+
+def make_serpentine_points(n_passes=6, points_per_pass=100, seed=0):
+    rng = np.random.default_rng(seed)
+    along = np.arange(points_per_pass) * 2.0
+    x = np.concatenate([along if p % 2 == 0 else along[::-1] for p in range(n_passes)])
+    y = np.repeat(np.arange(n_passes) * 10.0, points_per_pass)
+    n = len(x)
+    return {
+        "lat": 42.0 + y / 111_320.0,
+        "lon": -93.0 + x / (111_320.0 * np.cos(np.radians(42.0))),
+        "mass_flow": rng.normal(10.0, 0.5, n).astype(np.float32),
+        "moisture": np.full(n, 18.0, dtype=np.float32),
+        "speed": np.full(n, 2.0, dtype=np.float32),
+        "swath": np.full(n, 10.0, dtype=np.float32),
+    }
+
+
+def test_pass_ids_split_serpentine_passes():
+    points = make_serpentine_points()
+    passes = pass_ids(points["lat"], points["lon"], heading_change_deg=60.0, gap_m=30.0)
+    assert np.all(np.diff(passes) >= 0)
+    # each turn is two 90 degree heading changes, only the first one starts a pass
+    assert len(np.unique(passes)) == 6
+    assert np.bincount(passes).min() > 1
+
+
+def test_cleaning_report_counts_each_stage():
+    points = make_serpentine_points()
+    points["speed"][50] = 10.0
+    points["swath"][150] = 3.0
+    points["mass_flow"][250] = 500.0
+
+    config = YieldCleaningConfig(flow_delay_points=0, start_pass_points=2, end_pass_points=1, max_speed_change=5.0)
+    cleaned, report = clean_yield_points(points, config)
+
+    assert report["flow_delay"] == 0
+    assert report["pass_delay"] > 0
+    assert report["speed"] == 1
+    assert report["swath"] == 1
+    assert report["overlap"] == 0
+    assert report["outliers"] >= 1
+    assert report["kept"] == len(cleaned["lat"])
+    assert sum(v for k, v in report.items() if k != "kept") + report["kept"] == 600
+    assert cleaned["mass_flow"].max() < 500.0
+
+
+def test_cleaning_flow_delay_and_overlap():
+    points = make_serpentine_points(n_passes=2)
+    # drive the first pass again
+    points = {k: np.concatenate([v, v[:100]]) for k, v in points.items()}
+    points["mass_flow"] = np.arange(300, dtype=np.float32) + 1.0
+
+    config = YieldCleaningConfig(stages=["flow_delay", "overlap"], flow_delay_points=3)
+    cleaned, report = clean_yield_points(points, config)
+
+    assert cleaned["mass_flow"][0] == 4.0
+    assert report["overlap"] > 0
+    assert report["kept"] < 200
+
+    with pytest.raises(ValueError):
+        YieldCleaner(YieldCleaningConfig(stages=["not_a_stage"]))
+
+
+def test_rasterize_points_mean_median_count(tmp_path):
+    spec = GridSpec(crs="EPSG:32615", x_min=0.0, y_max=20.0, resolution=10.0, width=2, height=2)
+    x = np.array([1.0, 2.0, 3.0, 15.0, 15.0, 5.0, 50.0])
+    y = np.array([15.0, 15.0, 15.0, 15.0, 15.0, 5.0, 5.0])
+    values = np.array([1.0, 2.0, 10.0, 4.0, 6.0, 7.0, 100.0])
+
+    grid = rasterize_points(x, y, values, spec, tmp_path / "grid.npy", chunk_size=2)
+    mean, median, count = grid
+    assert mean[0, 0] == pytest.approx(13.0 / 3.0)
+    assert median[0, 0] == 2.0
+    assert median[0, 1] == 5.0
+    assert count.tolist() == [[3.0, 2.0], [1.0, 0.0]]
+    assert np.isnan(mean[1, 1]) and np.isnan(median[1, 1])
+
+    opened, opened_spec, bands, _ = open_grid(tmp_path / "grid.npy")
+    assert bands == ["mean", "median", "count"]
+    assert opened_spec == spec
+    assert isinstance(opened, np.memmap)
+
+
+def test_rasterize_harvest_event(tmp_path):
+    df = make_yield_points(500)
+    csv_path = tmp_path / "yield.csv"
+    df.to_csv(csv_path, index=False)
+    event = ingest_yield_monitor(csv_path, event_id="HARV-4", timestamp=datetime(2025, 10, 1))
+
+    gridded = rasterize_harvest_event(event, resolution=20.0)
+    assert gridded.file_path == str(tmp_path / "yield.grid.npy")
+    grid, spec, bands, metadata = open_grid(gridded.file_path)
+    assert spec.crs == "EPSG:32615"
+    assert metadata["points"] == event.file_path
+    assert np.nansum(grid[bands.index("count")]) == 500
+    # 10 kg/s over 2 m/s * 10 m is 0.5 kg/m2
+    assert np.nanmax(grid[bands.index("mean")]) == pytest.approx(5000.0)
+
+    # streaming the store in small chunks gives the same grid
+    chunked = rasterize_harvest_event(event, resolution=20.0, out_path=tmp_path / "chunked.npy", chunk_size=64)
+    chunked_grid, chunked_spec, _, _ = open_grid(chunked.file_path)
+    assert chunked_spec == spec
+    np.testing.assert_array_equal(np.asarray(chunked_grid), np.asarray(grid))
+
+
+def test_standardize_yield_arrays():
+    # 10000 kg at 20 % moisture on 1 ha, brought to 15.5 %
+    df = standardize_yield(mass=[10000.0, 22046.2262], area=[1.0, 2.47105381], moisture=20.0,
+                           nominal_moisture=15.5, crop="corn", mass_units=["kg", "lbs"], area_units=["ha", "acres"])
+    expected_mass = 10000.0 * 80.0 / 84.5
+    np.testing.assert_allclose(df["mass_kg"], [expected_mass, expected_mass], rtol=1e-6)
+    np.testing.assert_allclose(df["dry_mass_kg"], [8000.0, 8000.0], rtol=1e-6)
+    np.testing.assert_allclose(df["yield_kg_ha"], [expected_mass, expected_mass], rtol=1e-6)
+    bushels = expected_mass / (56.0 * 0.45359237)
+    np.testing.assert_allclose(df["bushels"], [bushels, bushels], rtol=1e-6)
+    np.testing.assert_allclose(df["yield_bu_ac"], [bushels / 2.47105381] * 2, rtol=1e-6)
+
+
+def test_standardize_harvest_events():
+    base = {"timestamp": "2025-10-01T00:00:00Z", "harvestType": "Destructive", "nominal_mass_units": "lbs"}
+    events = [
+        HarvestEvent(Id="H-1", mass=56000.0, mass_units="lbs", area=10.0, area_units="acres",
+                     cropNominalMoisture=15.5, nominal_volume=56.0, **base),
+        HarvestEvent(Id="H-2", cropYield=200.0, cropYieldUnits="bu/acre", area=10.0, area_units="acres",
+                     cropNominalMoisture=15.5, nominal_volume=56.0, **base),
+        HarvestEvent(Id="H-3", mass=1000.0, mass_units="kg", area=1.0, area_units="ha",
+                     cropNominalMoisture=13.0, **base),
+    ]
+    df = standardize_harvest_events(events, crop="corn", nominal_moisture=15.5)
+
+    assert df.index.tolist() == ["H-1", "H-2", "H-3"]
+    assert df.loc["H-1", "bushels"] == pytest.approx(1000.0)
+    assert df.loc["H-1", "yield_bu_ac"] == pytest.approx(100.0)
+    assert df.loc["H-2", "yield_bu_ac"] == pytest.approx(200.0)
+    assert df.loc["H-3", "mass_kg"] == pytest.approx(1000.0 * 87.0 / 84.5)
+    assert df["nominal_moisture"].tolist() == [15.5, 15.5, 15.5]